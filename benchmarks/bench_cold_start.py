@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+lambda_eye_tracking 콜드 스타트 측정 (매 회 새 파이썬 프로세스에서 핸들러 모듈을 처음부터 import)
+
+- init: 모듈 import 전체 시간(INIT_MS)과 단계별 소요(INIT_TIMINGS_MS: cv2/eye_engine/boto3/mediapipe/FaceMesh 등)
+- first_invoke: 첫 호출(cache_stats, AWS 호출 없음) 시간 — EYE_PREWARM=0 이면 lazy 초기화가 여기에 섞인다
+- first_inference: 첫 FaceMesh 추론(실제 요청의 첫 프레임에 해당) 시간
+각 항목의 p50/p99 를 낸다. AWS 자격 증명이나 네트워크는 필요 없다(클라이언트 생성만 한다).
+
+사용법:
+    python benchmarks/bench_cold_start.py [--runs 20] [--prewarm 1 0] [--json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 자식 프로세스에서 실행: import → 첫 호출 → 첫 추론, 결과를 JSON 한 줄로
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import lambda_eye_tracking as h
+import_ms = (time.perf_counter() - t0) * 1000.0
+t1 = time.perf_counter()
+h.lambda_handler({"action": "cache_stats"}, None)
+first_invoke_ms = (time.perf_counter() - t1) * 1000.0
+import numpy as np
+t2 = time.perf_counter()
+fm = h.get_face_mesh()
+if fm is not None:
+    fm.process(np.zeros((256, 256, 3), dtype=np.uint8))
+first_inference_ms = (time.perf_counter() - t2) * 1000.0
+sys.stdout.write("BENCH " + json.dumps({
+    "import_ms": import_ms,
+    "init_ms": h.INIT_MS,
+    "first_invoke_ms": first_invoke_ms,
+    "first_inference_ms": first_inference_ms,
+    "timings_ms": h.INIT_PHASE_TIMINGS_MS,
+}) + "\n")
+"""
+
+
+def run_once(prewarm: bool) -> Dict:
+    env = dict(os.environ)
+    env["EYE_PREWARM"] = "1" if prewarm else "0"
+    env.setdefault("AWS_DEFAULT_REGION", "ap-northeast-2")
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    line = next(l for l in out.splitlines() if l.startswith("BENCH "))
+    return json.loads(line[len("BENCH "):])
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    a = np.asarray(values, dtype=np.float64)
+    return {"p50": float(np.percentile(a, 50)), "p99": float(np.percentile(a, 99)), "max": float(a.max())}
+
+
+def run(runs: int, prewarm: bool) -> Dict:
+    samples = [run_once(prewarm) for _ in range(runs)]
+    report = {"prewarm": prewarm, "runs": runs}
+    for key in ("import_ms", "init_ms", "first_invoke_ms", "first_inference_ms"):
+        report[key] = percentiles([s[key] for s in samples])
+    components = sorted({c for s in samples for c in s["timings_ms"]})
+    report["components_ms"] = {
+        c: percentiles([s["timings_ms"].get(c, 0.0) for s in samples]) for c in components
+    }
+    return report
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Lambda 핸들러 콜드 스타트 벤치마크")
+    ap.add_argument("--runs", type=int, default=20)
+    ap.add_argument("--prewarm", type=int, nargs="+", default=[1, 0], help="EYE_PREWARM 값(1/0)별로 측정")
+    ap.add_argument("--json", action="store_true", help="JSON 으로 출력")
+    args = ap.parse_args()
+
+    reports = [run(args.runs, bool(p)) for p in args.prewarm]
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+    for r in reports:
+        print(f"EYE_PREWARM={int(r['prewarm'])} runs={r['runs']}")
+        for key in ("init_ms", "first_invoke_ms", "first_inference_ms"):
+            p = r[key]
+            print(f"  {key:<20} p50={p['p50']:8.1f}ms p99={p['p99']:8.1f}ms")
+        for c, p in r["components_ms"].items():
+            print(f"    {c:<18} p50={p['p50']:8.1f}ms p99={p['p99']:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+랜드마크 → 눈 지표 계산 벤치마크 (기존 스칼라 구현 vs eye_engine.EyeMetricsEngine)
+
+- 합성 FaceMesh 랜드마크(478점)로 프레임을 만들고, 얼굴 미검출 프레임(NaN)도 섞는다.
+- 기존 `_px` / `_iris_center` / `_eye_metrics` 결과와 비트 단위로 같은지 먼저 확인한 뒤
+  프레임당 계산 시간(µs)을 비교한다.
+
+사용법:
+    python benchmarks/bench_eye_metrics.py [--frames 3000] [--repeat 5] [--json]
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from eye_engine import EyeMetricsEngine, trace_columns  # noqa: E402
+from eye_engine.metrics import (  # noqa: E402
+    L_CORNER_IN, L_CORNER_OUT, L_LID_BOT, L_LID_TOP, LEFT_IRIS_IDXS,
+    R_CORNER_IN, R_CORNER_OUT, R_LID_BOT, R_LID_TOP, RIGHT_IRIS_IDXS,
+)
+
+N_LANDMARKS = 478  # refine_landmarks=True
+
+
+class _Landmark(NamedTuple):
+    x: float
+    y: float
+    z: float
+
+
+# ── 기존 스칼라 구현 (eye.py 에서 옮겨 온 기준값) ─────────────────────────────
+def _px(landmark, w, h) -> Tuple[float, float]:
+    return landmark.x * w, landmark.y * h
+
+
+def _iris_center(landmarks, idxs, w, h) -> Tuple[float, float]:
+    xs, ys = [], []
+    for i in idxs:
+        x, y = _px(landmarks[i], w, h)
+        xs.append(x); ys.append(y)
+    if not xs:
+        return np.nan, np.nan
+    return float(np.mean(xs)), float(np.mean(ys))
+
+
+def _eye_metrics(landmarks, w, h, is_left=True) -> Dict[str, float]:
+    if is_left:
+        c_out, c_in = L_CORNER_OUT, L_CORNER_IN
+        lid_top, lid_bot = L_LID_TOP, L_LID_BOT
+        iris_idxs = LEFT_IRIS_IDXS
+    else:
+        c_out, c_in = R_CORNER_OUT, R_CORNER_IN
+        lid_top, lid_bot = R_LID_TOP, R_LID_BOT
+        iris_idxs = RIGHT_IRIS_IDXS
+
+    x_out, y_out = _px(landmarks[c_out], w, h)
+    x_in, y_in = _px(landmarks[c_in], w, h)
+    eye_width = max(1e-6, math.hypot(x_out - x_in, y_out - y_in))
+
+    x_t, y_t = _px(landmarks[lid_top], w, h)
+    x_b, y_b = _px(landmarks[lid_bot], w, h)
+    eye_open = math.hypot(x_t - x_b, y_t - y_b) / eye_width
+
+    ix, iy = _iris_center(landmarks, iris_idxs, w, h)
+    cx, cy = (x_out + x_in) / 2.0, (y_out + y_in) / 2.0
+    eye_height = max(1e-6, math.hypot(x_t - x_b, y_t - y_b))
+    v_offset = (iy - cy) / eye_height
+
+    return {
+        "eye_width": eye_width, "eye_open": eye_open,
+        "iris_cx": ix, "iris_cy": iy, "eye_cx": cx, "eye_cy": cy,
+        "v_offset": v_offset,
+    }
+
+
+def _scalar_rows(frames, w, h) -> List[Dict[str, float]]:
+    """기존 루프: 프레임마다 좌/우 지표 dict 를 만들고 np.nanmean 으로 대표값 계산."""
+    rows = []
+    for fidx, lm in enumerate(frames):
+        if lm is None:
+            rows.append({"frame_idx": fidx, "L_eye_open": np.nan, "R_eye_open": np.nan,
+                         "L_v_offset": np.nan, "R_v_offset": np.nan,
+                         "eye_open": np.nan, "v_offset": np.nan})
+            continue
+        L = _eye_metrics(lm, w, h, is_left=True)
+        R = _eye_metrics(lm, w, h, is_left=False)
+        rows.append({
+            "frame_idx": fidx,
+            "L_eye_open": L["eye_open"], "R_eye_open": R["eye_open"],
+            "L_v_offset": L["v_offset"], "R_v_offset": R["v_offset"],
+            "eye_open": np.nanmean([L["eye_open"], R["eye_open"]]),
+            "v_offset": np.nanmean([L["v_offset"], R["v_offset"]]),
+        })
+    return rows
+
+
+# ── 입력 생성 ────────────────────────────────────────────────────────────────
+def make_frames(n: int, miss_every: int, seed: int = 0):
+    """무작위 흔들림을 준 합성 랜드마크 목록. miss_every 마다 None(얼굴 미검출)."""
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(0.3, 0.7, size=(N_LANDMARKS, 3))
+    frames = []
+    for i in range(n):
+        if miss_every and i % miss_every == miss_every - 1:
+            frames.append(None)
+            continue
+        pts = base + rng.normal(0, 0.01, size=base.shape)
+        frames.append([_Landmark(*map(float, p)) for p in pts])
+    return frames
+
+
+def _same(a: float, b: float) -> bool:
+    return (math.isnan(a) and math.isnan(b)) or a == b
+
+
+def check_identical(engine: EyeMetricsEngine, frames, w: int, h: int) -> int:
+    """기존 구현과 비트 단위 비교. 불일치 개수 반환."""
+    ref = _scalar_rows(frames, w, h)
+    pts = np.stack([engine.to_array(lm) if lm is not None else engine.empty() for lm in frames])
+    cols = trace_columns(np.arange(len(frames)), engine.compute(pts, w, h), 30.0)
+    mismatches = 0
+    for i, row in enumerate(ref):
+        for k, v in row.items():
+            if k != "frame_idx" and not _same(float(v), float(cols[k][i])):
+                mismatches += 1
+        lm = frames[i]
+        if lm is not None:
+            L, R = engine.frame_metrics(lm, w, h)
+            for side, got in (("L", L), ("R", R)):
+                want = _eye_metrics(lm, w, h, is_left=(side == "L"))
+                mismatches += sum(not _same(want[k], got[k]) for k in got)
+    return mismatches
+
+
+# ── 측정 ─────────────────────────────────────────────────────────────────────
+def _best_us_per_frame(fn, n_frames: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best / n_frames * 1e6
+
+
+def run(n_frames: int, repeat: int, w: int, h: int, miss_every: int) -> Dict:
+    engine = EyeMetricsEngine(LEFT_IRIS_IDXS, RIGHT_IRIS_IDXS)
+    frames = make_frames(n_frames, miss_every)
+    mismatches = check_identical(engine, frames, w, h)
+
+    def scalar():
+        _scalar_rows(frames, w, h)
+
+    def batched():
+        pts = np.stack([engine.to_array(lm) if lm is not None else engine.empty() for lm in frames])
+        trace_columns(np.arange(len(frames)), engine.compute(pts, w, h), 30.0)
+
+    pts_all = np.stack([engine.to_array(lm) if lm is not None else engine.empty() for lm in frames])
+
+    def extract_only():
+        for lm in frames:
+            if lm is not None:
+                engine.to_array(lm)
+
+    def compute_only():
+        engine.compute(pts_all, w, h)
+
+    def per_frame():
+        for lm in frames:
+            if lm is not None:
+                engine.frame_metrics(lm, w, h)
+
+    timings = {
+        "scalar_us": _best_us_per_frame(scalar, n_frames, repeat),
+        "batched_us": _best_us_per_frame(batched, n_frames, repeat),
+        "batched_extract_us": _best_us_per_frame(extract_only, n_frames, repeat),
+        "batched_compute_us": _best_us_per_frame(compute_only, n_frames, repeat),
+        "frame_metrics_us": _best_us_per_frame(per_frame, n_frames, repeat),
+    }
+    return {
+        "frames": n_frames,
+        "missing_every": miss_every,
+        "landmarks_used": engine.n_points,
+        "identical": mismatches == 0,
+        "mismatches": mismatches,
+        "per_frame": timings,
+        "speedup_batched": timings["scalar_us"] / timings["batched_us"],
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="눈 지표 계산 벤치마크")
+    ap.add_argument("--frames", type=int, default=3000)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--width", type=int, default=1920)
+    ap.add_argument("--height", type=int, default=1080)
+    ap.add_argument("--miss-every", type=int, default=10, help="N 프레임마다 얼굴 미검출(0=없음)")
+    ap.add_argument("--json", action="store_true", help="JSON 으로 출력")
+    args = ap.parse_args()
+
+    report = run(args.frames, args.repeat, args.width, args.height, args.miss_every)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"frames={report['frames']} landmarks_used={report['landmarks_used']} "
+              f"identical={report['identical']} (mismatches={report['mismatches']})")
+        for k, v in report["per_frame"].items():
+            print(f"  {k:<20} {v:8.2f} µs/frame")
+        print(f"  batched speedup      x{report['speedup_batched']:.2f}")
+    if not report["identical"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
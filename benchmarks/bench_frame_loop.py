@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+프레임 루프 벤치마크: 매 프레임 새 배열(cap.read() + cv2.cvtColor) vs 버퍼 재사용(eye_engine.FrameBuffers)
+vs PyAV 디코더(eye_engine.decoder — 멀티스레드 디코딩 + RGB 직접 출력, cvtColor 없음)
+
+- 변형마다 별도 프로세스에서 돌려 최대 RSS(ru_maxrss)를 따로 잰다.
+- 새로 잡은 배열: 기본 루프는 프레임마다 BGR/RGB 두 개, 재사용은 FrameBuffers.allocs (첫 프레임에만 생긴다).
+- --facemesh 면 FaceLandmarkTracker(FaceMesh 추적 모드)까지 포함한다 (mediapipe 필요).
+- pyav 변형은 av 패키지가 있을 때만 돈다. --threads 는 reuse/pyav 의 디코더 스레드 수(0=라이브러리 기본).
+  pyav 의 새 배열 수는 numpy 배열만 센다(RGB 변환 결과 AVFrame 은 PyAV 가 프레임마다 잡는다).
+- 합성 영상은 benchmarks/bench_pipeline.make_video (노이즈 배경 + 움직이는 타원).
+
+사용법:
+    python benchmarks/bench_frame_loop.py [--frames 300] [--size 1920x1080] [--video real.mp4]
+        [--repeat 3] [--threads 0] [--facemesh] [--json]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from eye_engine import (  # noqa: E402
+    FaceLandmarkTracker, FrameBuffers, decoder_info, frames_are_rgb, iter_sampled_frames, open_video,
+)
+
+VARIANTS = ("alloc", "reuse", "pyav")
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+def _new_face_mesh():
+    try:
+        from mediapipe.solutions import face_mesh as mp_face_mesh
+    except ModuleNotFoundError:
+        from mediapipe.python.solutions import face_mesh as mp_face_mesh
+    return mp_face_mesh.FaceMesh(
+        static_image_mode=False, max_num_faces=1, refine_landmarks=True,
+        min_detection_confidence=0.5, min_tracking_confidence=0.5,
+    )
+
+
+def run_variant(variant: str, video_path: str, frames: int, facemesh: bool, threads: int = 0) -> Dict[str, Any]:
+    """한 변형을 현재 프로세스에서 실행 (자식 프로세스 진입점)."""
+    fm = _new_face_mesh() if facemesh else None
+    rss_start = _rss_mb()
+    if variant == "alloc":
+        cap = cv2.VideoCapture(video_path)
+    else:
+        cap = open_video(video_path, backend="pyav" if variant == "pyav" else "opencv", threads=threads)
+    if not cap.isOpened():
+        raise RuntimeError(f"cannot open {video_path}")
+    decoder = decoder_info(cap)
+    if variant == "pyav" and decoder["backend"] != "pyav":
+        raise RuntimeError("av 패키지가 없어 pyav 변형을 돌릴 수 없습니다")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    buffers = FrameBuffers(rgb=frames_are_rgb(cap)) if variant != "alloc" else None
+    tracker = FaceLandmarkTracker(fm, buffers=buffers) if fm is not None else None
+
+    n = 0
+    new_arrays = 0
+    new_bytes = 0
+    prev = None
+    t0 = time.perf_counter()
+    for _, frame in iter_sampled_frames(cap, fps, max_frames=frames, buffers=buffers):
+        if tracker is not None:
+            tracker.process(frame)
+        elif buffers is not None:
+            buffers.to_rgb(frame)
+        else:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        if buffers is None:
+            # cap.read() 는 매번 새 BGR 배열, cvtColor(dst 없음) 도 매번 새 RGB 배열
+            assert frame is not prev
+            new_arrays += 2
+            new_bytes += 2 * frame.nbytes
+        prev = frame
+        n += 1
+    elapsed = time.perf_counter() - t0
+    cap.release()
+    if buffers is not None:
+        # 재사용: 첫 프레임(과 크기 변경)에만 잡은 배열
+        new_arrays, new_bytes = buffers.allocs, buffers.nbytes()
+    return {
+        "variant": variant,
+        "decoder": decoder,
+        "frames": n,
+        "fps": n / elapsed if elapsed > 0 else 0.0,
+        "ms_per_frame": elapsed * 1000.0 / max(1, n),
+        "new_arrays": new_arrays,
+        "new_mb": new_bytes / 1e6,
+        "alloc_mb_per_s": new_bytes / 1e6 / elapsed if elapsed > 0 else 0.0,
+        "rss_start_mb": rss_start,
+        "rss_end_mb": _rss_mb(),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+    }
+
+
+def run_child(variant: str, video_path: str, frames: int, facemesh: bool, threads: int) -> Dict[str, Any]:
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", variant, "--video", video_path,
+           "--frames", str(frames), "--threads", str(threads)] + (["--facemesh"] if facemesh else [])
+    out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="프레임 루프 버퍼 재사용 벤치마크")
+    ap.add_argument("--frames", type=int, default=300)
+    ap.add_argument("--size", default="1920x1080", help="합성 영상 해상도 WxH")
+    ap.add_argument("--video", help="합성 영상 대신 쓸 실제 영상 경로")
+    ap.add_argument("--repeat", type=int, default=3, help="변형별 반복(프로세스) 수, fps 는 최고값")
+    ap.add_argument("--threads", type=int, default=0, help="reuse/pyav 디코더 스레드 수 (0=라이브러리 기본)")
+    ap.add_argument("--facemesh", action="store_true", help="FaceMesh 추론까지 포함")
+    ap.add_argument("--json", action="store_true")
+    ap.add_argument("--child", choices=VARIANTS, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(run_variant(args.child, args.video, args.frames, args.facemesh, args.threads)))
+        return
+
+    variants = [v for v in VARIANTS if v != "pyav" or importlib.util.find_spec("av") is not None]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        video_path = args.video
+        if not video_path:
+            from bench_pipeline import make_video
+            width, height = (int(x) for x in args.size.lower().split("x"))
+            video_path = os.path.join(tmpdir, "synthetic.mp4")
+            make_video(video_path, args.frames, width, height)
+        results: Dict[str, Dict[str, Any]] = {}
+        for _ in range(args.repeat):
+            for variant in variants:  # 번갈아 실행해 기계 상태 변화의 영향을 나눈다
+                r = run_child(variant, video_path, args.frames, args.facemesh, args.threads)
+                best = results.get(variant)
+                if best is None or r["fps"] > best["fps"]:
+                    r["peak_rss_mb"] = min(r["peak_rss_mb"], best["peak_rss_mb"]) if best else r["peak_rss_mb"]
+                    results[variant] = r
+                else:
+                    best["peak_rss_mb"] = min(best["peak_rss_mb"], r["peak_rss_mb"])
+
+    report = {
+        "source": args.video or f"synthetic {args.size}",
+        "facemesh": args.facemesh,
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "results": results,
+        "threads": args.threads,
+        "speedup": results["reuse"]["fps"] / results["alloc"]["fps"] if results["alloc"]["fps"] else None,
+        "peak_rss_saved_mb": results["alloc"]["peak_rss_mb"] - results["reuse"]["peak_rss_mb"],
+        "pyav_speedup": (
+            results["pyav"]["fps"] / results["reuse"]["fps"] if "pyav" in results and results["reuse"]["fps"] else None
+        ),
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"source={report['source']} frames={args.frames} facemesh={args.facemesh} opencv={report['opencv']}")
+    for name, r in results.items():
+        print(f"  {name:<6} {r['fps']:8.1f} fps  {r['ms_per_frame']:7.3f} ms/frame  "
+              f"new arrays={r['new_arrays']:5d} ({r['alloc_mb_per_s']:8.1f} MB/s)  peak RSS={r['peak_rss_mb']:7.1f} MB")
+    print(f"  speedup x{report['speedup']:.3f}, peak RSS saved {report['peak_rss_saved_mb']:.1f} MB")
+    if report["pyav_speedup"] is not None:
+        print(f"  pyav vs reuse(opencv) x{report['pyav_speedup']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+눈 분석 파이프라인 단계별 벤치마크 (합성 영상/이미지를 로컬에서 만들어 측정, 네트워크/클라우드 불필요)
+
+단계(stages):
+    decode          cv2.VideoCapture.read
+    cvtColor        BGR → RGB
+    facemesh_video  FaceMesh.process (추적 모드, 영상 프레임)
+    facemesh_image  FaceMesh.process (정지 영상 모드, 이미지 디코딩 포함하지 않음)
+    metrics         EyeMetricsEngine.frame_metrics (이미지 엔드포인트 경로, 프레임 하나씩)
+    trace           TraceBuffer.append + finalize (배치 지표 + StreamingSummary 포함)
+    summary         StreamingSummary.update_many + result (robust_ptp / count_blinks 대체)
+    encode_csv/npz  trace 직렬화
+    upload_bucket   eye.upload_bytes_to_storage → 가짜 Firebase bucket (메모리)
+    upload_s3       lambda_eye_tracking.upload_to_s3 → 가짜 S3 (메모리)
+엔드포인트(endpoints, end-to-end):
+    eye.process         eye._analyze_video_bytes + trace 업로드 (가짜 Firebase)
+    lambda.analyze_video lambda_handler(action=analyze_video) (가짜 S3, EYE_TABLE=memory)
+    server.eye_tracking  python_server.main._analyze_video_job (워커 함수를 현재 프로세스에서)
+
+합성 영상에는 얼굴이 없으므로 FaceMesh 는 검출(미검출) 경로만 잰다. 실제 얼굴 영상은 --video 로 준다.
+지표/trace/요약은 합성 랜드마크(검출 프레임)로 잰다. 없는 의존성(mediapipe/fastapi 등)이 필요한 항목은
+skipped 에 이유와 함께 남긴다.
+
+리포트(JSON): 단계마다 ms_per_frame / p50_ms / p99_ms / fps. --compare 로 이전 리포트와의 차이를 보고
+--fail-on-regression 이면 tolerance 를 넘는 느려짐이 있을 때 종료 코드 1.
+
+사용법:
+    python benchmarks/bench_pipeline.py [--frames 300] [--size 1280x720] [--video real.mp4]
+        [--out report.json] [--compare old.json] [--tolerance 0.10] [--fail-on-regression]
+"""
+import argparse
+import base64
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from eye_engine import EyeMetricsEngine, StreamingSummary, TraceBuffer  # noqa: E402
+from eye_engine.metrics import LEFT_IRIS_IDXS, RIGHT_IRIS_IDXS  # noqa: E402
+
+N_LANDMARKS = 478  # refine_landmarks=True
+
+
+class _Landmark(NamedTuple):
+    x: float
+    y: float
+    z: float
+
+
+# ── 입력 생성 ────────────────────────────────────────────────────────────────
+def make_video(path: str, frames: int, width: int, height: int, fps: float = 30.0, seed: int = 0) -> None:
+    """움직이는 타원(얼굴 대용) + 노이즈 배경 mp4 (코덱 부담이 실제 카메라 영상과 비슷하도록 노이즈 포함)."""
+    rng = np.random.default_rng(seed)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError("cv2.VideoWriter(mp4v) 를 열 수 없습니다")
+    base = rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+    try:
+        for i in range(frames):
+            frame = np.roll(base, i * 3, axis=1)
+            cx = int(width / 2 + width / 8 * np.sin(i / 15.0))
+            cv2.ellipse(frame, (cx, height // 2), (width // 8, height // 4), 0, 0, 360, (160, 180, 210), -1)
+            writer.write(frame)
+    finally:
+        writer.release()
+
+
+def make_image(width: int, height: int, seed: int = 1) -> bytes:
+    rng = np.random.default_rng(seed)
+    img = rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+    cv2.ellipse(img, (width // 2, height // 2), (width // 6, height // 3), 0, 0, 360, (160, 180, 210), -1)
+    ok, buf = cv2.imencode(".jpg", img, [int(cv2.IMWRITE_JPEG_QUALITY), 90])
+    return buf.tobytes()
+
+
+def make_landmarks(n: int, miss_every: int = 10, seed: int = 0) -> List[Optional[List[_Landmark]]]:
+    """흔들림을 준 합성 FaceMesh 랜드마크. miss_every 마다 None(얼굴 미검출)."""
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(0.3, 0.7, size=(N_LANDMARKS, 3))
+    out: List[Optional[List[_Landmark]]] = []
+    for i in range(n):
+        if miss_every and i % miss_every == miss_every - 1:
+            out.append(None)
+            continue
+        pts = base + rng.normal(0, 0.01, size=base.shape)
+        out.append([_Landmark(*map(float, p)) for p in pts])
+    return out
+
+
+# ── 가짜 저장소 ──────────────────────────────────────────────────────────────
+class FakeBlob:
+    def __init__(self, store: Dict[str, bytes], name: str, latency: float):
+        self.store, self.name, self.latency = store, name, latency
+        self.metadata = None
+
+    def upload_from_string(self, data, content_type=None) -> None:
+        time.sleep(self.latency)
+        self.store[self.name] = data.encode("utf-8") if isinstance(data, str) else bytes(data)
+
+    def download_as_bytes(self) -> bytes:
+        return self.store[self.name]
+
+    def delete(self) -> None:
+        self.store.pop(self.name, None)
+
+
+class FakeBucket:
+    """google.cloud.storage.Bucket 대역 (메모리, latency 초만큼 업로드 지연 흉내)."""
+
+    name = "bench-bucket"
+
+    def __init__(self, latency: float = 0.0):
+        self.store: Dict[str, bytes] = {}
+        self.latency = latency
+
+    def blob(self, path: str) -> FakeBlob:
+        return FakeBlob(self.store, path, self.latency)
+
+
+class _FakeDoc:
+    def set(self, *a, **k):
+        pass
+
+    def update(self, *a, **k):
+        pass
+
+    def collection(self, name):
+        return _FakeCollection()
+
+
+class _FakeCollection:
+    def document(self, name=None):
+        return _FakeDoc()
+
+
+class FakeFirestore:
+    def collection(self, name):
+        return _FakeCollection()
+
+
+class FakeS3:
+    """boto3 S3 client 대역 (메모리)."""
+
+    def __init__(self, latency: float = 0.0):
+        self.objects: Dict[str, bytes] = {}
+        self.latency = latency
+
+    def put_object(self, Bucket, Key, Body, ContentType=None, **kw):
+        time.sleep(self.latency)
+        self.objects[f"{Bucket}/{Key}"] = Body if isinstance(Body, bytes) else Body.read()
+        return {}
+
+    def upload_fileobj(self, fileobj, bucket, key, ExtraArgs=None):
+        self.put_object(bucket, key, fileobj.read())
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[f"{Bucket}/{Key}"])}
+
+    def download_file(self, bucket, key, path):
+        with open(path, "wb") as f:
+            f.write(self.objects[f"{bucket}/{key}"])
+
+    def download_fileobj(self, bucket, key, fileobj):
+        data, chunk = self.objects[f"{bucket}/{key}"], 8 << 20
+        for i in range(0, len(data), chunk):  # 전송 관리자처럼 조각 단위로 순서대로 쓴다
+            fileobj.write(data[i:i + chunk])
+
+    def copy(self, src, bucket, key):
+        self.objects[f"{bucket}/{key}"] = self.objects[f"{src['Bucket']}/{src['Key']}"]
+
+
+def install_fake_firebase(bucket: FakeBucket) -> None:
+    """eye.py 가 import 하는 app.core.* / firebase_admin 을 가짜로 (이 프로세스 안에서만)."""
+    auth = types.ModuleType("app.core.auth")
+    auth.get_current_user = lambda: {"uid": "bench"}
+    fb = types.ModuleType("app.core.firebase")
+    fb.db, fb.bucket = FakeFirestore(), bucket
+    app, core = types.ModuleType("app"), types.ModuleType("app.core")
+    app.core, core.auth, core.firebase = core, auth, fb
+    sys.modules.update({"app": app, "app.core": core, "app.core.auth": auth, "app.core.firebase": fb})
+    # 이미 import 됐거나(가짜 포함 — __spec__ 이 없어 find_spec 이 ValueError) 설치돼 있으면 그대로 쓴다
+    if "firebase_admin" not in sys.modules and importlib.util.find_spec("firebase_admin") is None:
+        fa = types.ModuleType("firebase_admin")
+        fs = types.ModuleType("firebase_admin.firestore")
+        fs.SERVER_TIMESTAMP = object()
+        fa.firestore = fs
+        sys.modules.update({"firebase_admin": fa, "firebase_admin.firestore": fs})
+
+
+# ── 측정 ────────────────────────────────────────────────────────────────────
+def stage_stats(samples_ms: List[float], items: int, unit: str = "frame") -> Dict[str, Any]:
+    """samples_ms: 반복마다(또는 프레임마다) 걸린 ms, items: 샘플 하나가 처리한 단위(프레임/호출) 수.
+
+    ms_per_frame/fps 는 unit 하나당 값 (unit=call 이면 호출 1회당 ms, 초당 호출 수).
+    """
+    a = np.asarray(samples_ms, dtype=np.float64)
+    per_item = a / max(1, items)
+    mean = float(per_item.mean())
+    return {
+        "samples": int(len(a)),
+        "items_per_sample": int(items),
+        "unit": unit,
+        "ms_per_frame": mean,
+        "p50_ms": float(np.percentile(per_item, 50)),
+        "p99_ms": float(np.percentile(per_item, 99)),
+        "fps": (1000.0 / mean) if mean > 0 else float("inf"),
+    }
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> List[float]:
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000.0)
+    return out
+
+
+def read_frames(path: str, limit: int) -> List[np.ndarray]:
+    cap = cv2.VideoCapture(path)
+    frames = []
+    try:
+        while len(frames) < limit:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            frames.append(frame)
+    finally:
+        cap.release()
+    return frames
+
+
+def bench_stages(args, video_path: str, report: Dict[str, Any]) -> None:
+    stages, skipped = report["stages"], report["skipped"]
+
+    # decode: 프레임마다 read() 시간
+    cap = cv2.VideoCapture(video_path)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    per_frame = []
+    try:
+        while len(per_frame) < args.frames:
+            t0 = time.perf_counter()
+            ok, _ = cap.read()
+            if not ok:
+                break
+            per_frame.append((time.perf_counter() - t0) * 1000.0)
+    finally:
+        cap.release()
+    stages["decode"] = stage_stats(per_frame, 1)
+    report["meta"].update({"width": width, "height": height, "video_fps": fps, "frames": len(per_frame)})
+
+    frames = read_frames(video_path, min(args.frames, args.keep_frames))
+    stages["cvtColor"] = stage_stats(
+        [ms for f in frames for ms in timed(lambda f=f: cv2.cvtColor(f, cv2.COLOR_BGR2RGB), 1)], 1,
+    )
+
+    try:
+        import mediapipe as mp
+        fm_mod = mp.solutions.face_mesh
+    except (ImportError, AttributeError) as e:
+        skipped["facemesh_video"] = skipped["facemesh_image"] = f"mediapipe unavailable: {e}"
+    else:
+        rgbs = [cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in frames]
+        for name, static in (("facemesh_video", False), ("facemesh_image", True)):
+            fm = fm_mod.FaceMesh(static_image_mode=static, max_num_faces=1, refine_landmarks=True,
+                                 min_detection_confidence=0.5, min_tracking_confidence=0.5)
+            try:
+                fm.process(rgbs[0])  # 그래프/모델 로드는 제외
+                stages[name] = stage_stats([ms for r in rgbs for ms in timed(lambda r=r: fm.process(r), 1)], 1)
+            finally:
+                fm.close()
+
+    engine = EyeMetricsEngine(LEFT_IRIS_IDXS, RIGHT_IRIS_IDXS)
+    lms = make_landmarks(args.frames)
+    detected = [lm for lm in lms if lm is not None]
+    stages["metrics"] = stage_stats(
+        timed(lambda: [engine.frame_metrics(lm, width, height) for lm in detected], args.repeat), len(detected),
+    )
+
+    def build_trace() -> TraceBuffer:
+        trace = TraceBuffer(engine, width, height, fps, capacity=len(lms), summary=StreamingSummary())
+        for i, lm in enumerate(lms):
+            trace.append(i, lm)
+        trace.finalize()
+        return trace
+
+    stages["trace"] = stage_stats(timed(build_trace, args.repeat), len(lms))
+    trace = build_trace()
+
+    t = trace.column("time_sec")
+    v, o = trace.column("v_offset"), trace.column("eye_open")
+
+    def summarize():
+        s = StreamingSummary()
+        for a in range(0, len(t), 256):
+            s.update_many(t[a:a + 256], v[a:a + 256], o[a:a + 256])
+        return s.result()
+
+    stages["summary"] = stage_stats(timed(summarize, args.repeat), len(t))
+    for fmt in ("csv", "npz"):
+        stages[f"encode_{fmt}"] = stage_stats(timed(lambda fmt=fmt: trace.encode(fmt), args.repeat), len(trace))
+    report["meta"]["trace_bytes"] = {fmt: len(trace.encode(fmt)) for fmt in ("csv", "npz")}
+    report["_trace_csv"] = trace.encode("csv")
+
+
+def bench_uploads(args, report: Dict[str, Any], eye_mod, lambda_mod) -> None:
+    stages = report["stages"]
+    data = report.pop("_trace_csv")
+    if eye_mod is not None:
+        stages["upload_bucket"] = stage_stats(
+            timed(lambda: eye_mod.upload_bytes_to_storage(data, "bench/trace.csv", "text/csv"), args.repeat), 1, "call",
+        )
+    if lambda_mod is not None:
+        stages["upload_s3"] = stage_stats(
+            timed(lambda: lambda_mod.upload_to_s3(data, "bench/trace.csv", "text/csv"), args.repeat), 1, "call",
+        )
+
+
+# ── 엔드포인트 ──────────────────────────────────────────────────────────────
+def load_eye(bucket: FakeBucket, skipped: Dict[str, str]):
+    install_fake_firebase(bucket)
+    try:
+        import eye
+    except Exception as e:  # fastapi/mediapipe 미설치 등
+        skipped["eye"] = f"import failed: {e!r}"
+        return None
+    eye.storage_bucket = bucket
+    return eye
+
+
+def load_lambda(s3: FakeS3, skipped: Dict[str, str]):
+    os.environ.setdefault("EYE_TABLE", "memory")
+    os.environ.setdefault("EYE_PREWARM", "0")
+    os.environ["EYE_CACHE_MAX_ENTRIES"] = "0"  # 반복 측정이 캐시에 맞지 않게
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):  # init_metrics 로그
+            import lambda_eye_tracking as h
+    except Exception as e:
+        skipped["lambda"] = f"import failed: {e!r}"
+        return None
+    h._s3_client = s3
+    h.result_cache.max_entries = 0
+    return h
+
+
+def load_server(skipped: Dict[str, str]):
+    try:
+        from python_server import main as server
+    except Exception as e:
+        skipped["server"] = f"import failed: {e!r}"
+        return None
+    return server
+
+
+def bench_endpoints(args, video_path: str, report: Dict[str, Any], eye_mod, lambda_mod, server_mod) -> None:
+    endpoints = report["endpoints"]
+    with open(video_path, "rb") as f:
+        raw = f.read()
+    n = report["meta"]["frames"]
+
+    if eye_mod is not None:
+        def eye_process():
+            trace, *_ = eye_mod._analyze_video_bytes(raw, ".mp4", 1, args.frames, False)
+            if trace is not None:
+                eye_mod.upload_bytes_to_storage(trace.encode("csv"), "bench/eye/trace.csv", "text/csv")
+        endpoints["eye.process"] = stage_stats(timed(eye_process, args.endpoint_repeat), n)
+
+    if lambda_mod is not None:
+        event = {
+            "action": "analyze_video", "user_id": "bench",
+            "file_data": base64.b64encode(raw).decode("ascii"),
+            "parameters": {"max_frames": args.frames},
+        }
+
+        def lambda_analyze():
+            with contextlib.redirect_stdout(io.StringIO()):  # invocation_metrics 로그
+                res = lambda_mod.lambda_handler(event, None)
+            if res["statusCode"] != 200:
+                raise RuntimeError(res["body"])
+        endpoints["lambda.analyze_video"] = stage_stats(timed(lambda_analyze, args.endpoint_repeat), n)
+
+    if server_mod is not None:
+        def server_job():
+            job = server_mod._analyze_video_job(video_path, 1, args.frames)
+            if not job.get("ok"):
+                raise RuntimeError(job.get("error"))
+        endpoints["server.eye_tracking"] = stage_stats(timed(server_job, args.endpoint_repeat), n)
+
+
+# ── 리포트 ──────────────────────────────────────────────────────────────────
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """두 리포트의 ms_per_frame 비교. delta > tolerance 면 regression."""
+    rows = []
+    for section in ("stages", "endpoints"):
+        for name, cur in new.get(section, {}).items():
+            prev = old.get(section, {}).get(name)
+            if not prev or not prev.get("ms_per_frame"):
+                continue
+            delta = cur["ms_per_frame"] / prev["ms_per_frame"] - 1.0
+            rows.append({
+                "name": f"{section}.{name}", "old_ms": prev["ms_per_frame"], "new_ms": cur["ms_per_frame"],
+                "delta": delta, "regression": delta > tolerance,
+            })
+    return rows
+
+
+def main():
+    ap = argparse.ArgumentParser(description="눈 분석 파이프라인 단계별 벤치마크")
+    ap.add_argument("--frames", type=int, default=300, help="합성 영상 프레임 수(또는 --video 에서 읽을 최대 프레임)")
+    ap.add_argument("--size", default="1280x720", help="합성 영상/이미지 해상도 WxH")
+    ap.add_argument("--video", help="합성 영상 대신 쓸 실제 영상 경로")
+    ap.add_argument("--keep-frames", type=int, default=120, help="cvtColor/FaceMesh 측정용으로 메모리에 둘 프레임 수")
+    ap.add_argument("--repeat", type=int, default=5, help="배치 단계 반복 횟수")
+    ap.add_argument("--endpoint-repeat", type=int, default=3, help="엔드포인트 반복 횟수")
+    ap.add_argument("--upload-latency-ms", type=float, default=0.0, help="가짜 bucket/S3 업로드 지연")
+    ap.add_argument("--no-endpoints", action="store_true", help="엔드포인트 end-to-end 측정 생략")
+    ap.add_argument("--out", help="JSON 리포트 저장 경로")
+    ap.add_argument("--compare", help="비교할 이전 JSON 리포트")
+    ap.add_argument("--tolerance", type=float, default=0.10, help="느려짐 허용 비율(0.10=10%%)")
+    ap.add_argument("--fail-on-regression", action="store_true")
+    args = ap.parse_args()
+
+    width, height = (int(x) for x in args.size.lower().split("x"))
+    report: Dict[str, Any] = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "source": args.video or f"synthetic {width}x{height}",
+        },
+        "stages": {},
+        "endpoints": {},
+        "skipped": {},
+    }
+
+    latency = args.upload_latency_ms / 1000.0
+    bucket, s3 = FakeBucket(latency), FakeS3(latency)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        video_path = args.video
+        if not video_path:
+            video_path = os.path.join(tmpdir, "synthetic.mp4")
+            make_video(video_path, args.frames, width, height)
+        image = make_image(width, height)
+        report["meta"]["image_bytes"] = len(image)
+
+        bench_stages(args, video_path, report)
+        eye_mod = load_eye(bucket, report["skipped"])
+        lambda_mod = load_lambda(s3, report["skipped"])
+        server_mod = None if args.no_endpoints else load_server(report["skipped"])
+        if eye_mod is not None:
+            # 이미지 경로 (디코딩 + 정지 영상 FaceMesh 풀 + 지표), 풀 인스턴스 생성은 제외
+            analyze_image = lambda: eye_mod.analyze_frame(eye_mod._decode_image(image))  # noqa: E731
+            analyze_image()
+            report["stages"]["image_analyze"] = stage_stats(timed(analyze_image, args.repeat), 1, "call")
+        bench_uploads(args, report, eye_mod, lambda_mod)
+        if not args.no_endpoints:
+            bench_endpoints(args, video_path, report, eye_mod, lambda_mod, server_mod)
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            report["comparison"] = compare(json.load(f), report, args.tolerance)
+        regressions = [r for r in report["comparison"] if r["regression"]]
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    m = report["meta"]
+    print(f"commit={m['commit']} source={m['source']} frames={m.get('frames')} opencv={m['opencv']}")
+    for section in ("stages", "endpoints"):
+        for name, s in report[section].items():
+            print(f"  {section[:-1]:<9}{name:<22} {s['ms_per_frame']:9.3f} ms/{s['unit']:<5} "
+                  f"p99={s['p99_ms']:9.3f}ms {s['fps']:10.1f}/s")
+    for name, why in report["skipped"].items():
+        print(f"  skipped  {name:<22} {why}")
+    for r in report.get("comparison", []):
+        flag = "  REGRESSION" if r["regression"] else ""
+        print(f"  {r['name']:<32} {r['old_ms']:9.3f} → {r['new_ms']:9.3f} ms ({r['delta']:+.1%}){flag}")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
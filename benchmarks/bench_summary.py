@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+스트리밍 요약(eye_engine.StreamingSummary) vs 전체 trace 정확 계산 비교
+
+- 합성 v_offset / eye_open 시계열(얼굴 미검출 NaN, 블링크 포함)을 chunk 단위로 흘려 넣고
+  기존 방식(np.percentile p5/p95, np.nanstd, count_blinks)과 값/오차 한계/메모리를 비교한다.
+- exact_limit 을 넘는 길이에서는 피크투피크 오차가 문서화된 한계 이내인지 확인한다.
+
+사용법:
+    python benchmarks/bench_summary.py [--frames 20000 200000 2000000] [--json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from eye_engine import StreamingSummary  # noqa: E402
+from eye_engine.summary import DEFAULT_REL_ERR  # noqa: E402
+
+
+def count_blinks(openness_series: List[float], thresh: float = 0.18, min_frames: int = 2) -> int:
+    """기존 엔드포인트의 블링크 카운트 (기준값)."""
+    closed = False
+    hold = 0
+    count = 0
+    for v in openness_series:
+        if np.isnan(v):
+            if closed and hold >= min_frames:
+                count += 1
+            closed, hold = False, 0
+            continue
+        if v < thresh:
+            if closed:
+                hold += 1
+            else:
+                closed = True; hold = 1
+        else:
+            if closed and hold >= min_frames:
+                count += 1
+            closed, hold = False, 0
+    if closed and hold >= min_frames:
+        count += 1
+    return count
+
+
+def make_series(n: int, fps: float = 30.0, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / fps
+    v = -0.2 + 0.05 * np.sin(2 * np.pi * 0.3 * t) + rng.normal(0, 0.02, n)
+    eye_open = 0.35 + rng.normal(0, 0.02, n)
+    # 약 4초마다 3프레임 블링크, 5% 얼굴 미검출
+    eye_open[(np.arange(n) % 120) < 3] = 0.05
+    miss = rng.random(n) < 0.05
+    v[miss] = np.nan
+    eye_open[miss] = np.nan
+    return t, v, eye_open
+
+
+def run(n: int, chunk: int) -> Dict:
+    t, v, eye_open = make_series(n)
+
+    t0 = time.perf_counter()
+    s = StreamingSummary()
+    for i in range(0, n, chunk):
+        s.update_many(t[i:i + chunk], v[i:i + chunk], eye_open[i:i + chunk])
+    got = s.result()
+    streaming_sec = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    v_valid = v[~np.isnan(v)]
+    lo, hi = np.percentile(v_valid, [5, 95])
+    exact_ptp = float(hi - lo)
+    exact_std = float(np.nanstd(v_valid))
+    exact_blinks = count_blinks(eye_open[~np.isnan(eye_open)].tolist())
+    exact_sec = time.perf_counter() - t0
+
+    bound = DEFAULT_REL_ERR * (abs(lo) + abs(hi)) + 2 * s.v_sketch.min_value
+    ptp_err = abs(got["v_ptp"] - exact_ptp)
+    return {
+        "frames": n,
+        "exact_mode": got["exact"],
+        "ptp_exact": exact_ptp,
+        "ptp_streaming": got["v_ptp"],
+        "ptp_abs_err": ptp_err,
+        "ptp_err_bound": bound,
+        "within_bound": ptp_err <= bound,
+        "std_abs_err": abs(got["v_std"] - exact_std),
+        "blinks_equal": got["blink_count"] == exact_blinks,
+        "sketch_buckets": s.v_sketch.n_buckets,
+        "summary_bytes": s.nbytes(),
+        "full_trace_bytes": int(3 * n * 8),  # time/v/eye_open float64 컬럼
+        "streaming_us_per_frame": streaming_sec / n * 1e6,
+        "exact_us_per_frame": exact_sec / n * 1e6,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="스트리밍 요약 정확도/메모리 벤치마크")
+    ap.add_argument("--frames", type=int, nargs="+", default=[12000, 200000, 2000000])
+    ap.add_argument("--chunk", type=int, default=256)
+    ap.add_argument("--json", action="store_true", help="JSON 으로 출력")
+    args = ap.parse_args()
+
+    reports = [run(n, args.chunk) for n in args.frames]
+    if args.json:
+        print(json.dumps(reports, indent=2))
+    else:
+        for r in reports:
+            print(f"frames={r['frames']:>8} exact={r['exact_mode']!s:<5} "
+                  f"ptp_err={r['ptp_abs_err']:.2e} (bound {r['ptp_err_bound']:.2e}) "
+                  f"std_err={r['std_abs_err']:.1e} blinks_equal={r['blinks_equal']} "
+                  f"mem={r['summary_bytes'] / 1024:.0f}KiB vs {r['full_trace_bytes'] / 1024:.0f}KiB "
+                  f"{r['streaming_us_per_frame']:.2f}µs/frame")
+    if not all(r["within_bound"] and r["blinks_equal"] for r in reports):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
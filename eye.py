@@ -1,29 +1,44 @@
 # app/routers/eye.py
 from __future__ import annotations
 
-import io
 import os
 import cv2
 import math
 import time
 import uuid
+import json
 import base64
-import tempfile
+import asyncio
+import io
+import collections
+import zipfile
+import contextlib
 import numpy as np
-import pandas as pd
-from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status, Query
+from fastapi import (
+    APIRouter, Depends, UploadFile, File, HTTPException, status, Query, Response, WebSocket, WebSocketDisconnect,
+)
+from fastapi.responses import JSONResponse
 
 # 프로젝트 의존 (Firebase 클라이언트들)
 from app.core.auth import get_current_user  # Firebase(구글/카카오) 인증
 from app.core.firebase import db, bucket
 from firebase_admin import firestore as fb_fs  # SERVER_TIMESTAMP
 
+# 공용 분석 엔진 (저장소 루트 eye_engine 패키지)
+from eye_engine import (
+    PROFILE_ENABLED, TRACE_FILE_TYPES, AdaptiveConfig, AdaptiveSampler, EyeMetricsEngine, FaceLandmarkTracker,
+    FaceMeshPool, FrameBuffers, FramePipeline, ResultCache, StreamingSummary, TraceBuffer, StageTimer, VideoSpool,
+    cache_key, content_hash, decoder_info, frames_are_rgb, iter_sampled_frames, merge_segments, new_timer, open_video,
+    plan_segments, profile_call, profile_report, run_segments_in_processes,
+)
+
 router = APIRouter(prefix="/eye", tags=["Eye"])
 
 # ──────────────────────────────────────────────────────────────────────────────
-# MediaPipe (solutions 경로 폴백 포함) + 싱글톤 FaceMesh
+# MediaPipe (solutions 경로 폴백 포함) + FaceMesh 풀
 # ──────────────────────────────────────────────────────────────────────────────
 try:
     from mediapipe.solutions import face_mesh as mp_face_mesh
@@ -36,25 +51,24 @@ except ModuleNotFoundError:
         FACEMESH_LEFT_IRIS, FACEMESH_RIGHT_IRIS,
     )
 
-_fm: Optional[mp_face_mesh.FaceMesh] = None
-def _get_fm() -> mp_face_mesh.FaceMesh:
-    global _fm
-    if _fm is None:
-        _fm = mp_face_mesh.FaceMesh(
-            static_image_mode=False,
-            max_num_faces=1,
-            refine_landmarks=True,     # iris landmarks 포함
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5,
-        )
-    return _fm
+def _new_face_mesh(static_image_mode: bool) -> mp_face_mesh.FaceMesh:
+    return mp_face_mesh.FaceMesh(
+        static_image_mode=static_image_mode,
+        max_num_faces=1,
+        refine_landmarks=True,     # iris landmarks 포함
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5,
+    )
+
+# 이미지(/analyze, /save, /load_predict): 정지 영상 모드 풀 — 요청마다 독립 검출, 사용자 간 추적 상태 공유 없음.
+# EYE_IMAGE_FM_POOL_SIZE 개까지 동시에 추론하고, 이미지 분석 스레드도 같은 수만큼 둔다.
+IMAGE_FM_POOL_SIZE = max(1, int(os.environ.get("EYE_IMAGE_FM_POOL_SIZE", "0") or 0) or min(4, os.cpu_count() or 1))
+_image_fm_pool = FaceMeshPool(lambda: _new_face_mesh(True), IMAGE_FM_POOL_SIZE, name="image")
+_image_executor = ThreadPoolExecutor(max_workers=IMAGE_FM_POOL_SIZE, thread_name_prefix="eye-image")
 
 # ──────────────────────────────────────────────────────────────────────────────
 # 분석 유틸
 # ──────────────────────────────────────────────────────────────────────────────
-def _px(lm, w: int, h: int) -> Tuple[float, float]:
-    return lm.x * w, lm.y * h
-
 def _uniq_indices(conns: List[Tuple[int, int]]) -> List[int]:
     s = set()
     for a, b in conns:
@@ -64,51 +78,9 @@ def _uniq_indices(conns: List[Tuple[int, int]]) -> List[int]:
 LEFT_IRIS_IDXS  = _uniq_indices(FACEMESH_LEFT_IRIS)
 RIGHT_IRIS_IDXS = _uniq_indices(FACEMESH_RIGHT_IRIS)
 
-# 대표 랜드마크 인덱스 (안정 쌍)
-L_CORNER_OUT, L_CORNER_IN = 33, 133
-L_LID_TOP,   L_LID_BOT    = 159, 145
-R_CORNER_OUT, R_CORNER_IN = 362, 263
-R_LID_TOP,   R_LID_BOT    = 386, 374
-
-def _iris_center(landmarks, idxs, w, h) -> Tuple[float, float]:
-    xs, ys = [], []
-    for i in idxs:
-        x, y = _px(landmarks[i], w, h)
-        xs.append(x); ys.append(y)
-    if not xs:
-        return float("nan"), float("nan")
-    return float(np.mean(xs)), float(np.mean(ys))
-
-def _eye_metrics(landmarks, w, h, is_left=True) -> Dict[str, float]:
-    if is_left:
-        c_out, c_in = L_CORNER_OUT, L_CORNER_IN
-        lid_top, lid_bot = L_LID_TOP, L_LID_BOT
-        iris_idxs = LEFT_IRIS_IDXS
-    else:
-        c_out, c_in = R_CORNER_OUT, R_CORNER_IN
-        lid_top, lid_bot = R_LID_TOP, R_LID_BOT
-        iris_idxs = RIGHT_IRIS_IDXS
-
-    x_out, y_out = _px(landmarks[c_out], w, h)
-    x_in,  y_in  = _px(landmarks[c_in],  w, h)
-    eye_width = max(1e-6, math.hypot(x_out - x_in, y_out - y_in))
-
-    x_t, y_t = _px(landmarks[lid_top], w, h)
-    x_b, y_b = _px(landmarks[lid_bot], w, h)
-    eyelid_dist = math.hypot(x_t - x_b, y_t - y_b)
-
-    eye_open = eyelid_dist / eye_width  # 정규화 개폐도
-    ix, iy = _iris_center(landmarks, iris_idxs, w, h)
-
-    cx, cy = (x_out + x_in) / 2.0, (y_out + y_in) / 2.0
-    eye_height = max(1e-6, eyelid_dist)
-    v_offset_norm = (iy - cy) / eye_height  # 위 음수, 아래 양수
-
-    return {
-        "iris_cx": ix, "iris_cy": iy,
-        "eye_open": eye_open,
-        "v_offset": v_offset_norm,
-    }
+# 랜드마크 → 좌/우 눈 지표 (눈꼬리/눈꺼풀/홍채 점만 배열로 뽑아 벡터 계산)
+_metrics = EyeMetricsEngine(LEFT_IRIS_IDXS, RIGHT_IRIS_IDXS)
+_EYE_KEYS = ("iris_cx", "iris_cy", "eye_open", "v_offset")
 
 def analyze_frame(frame_bgr: np.ndarray) -> Dict[str, Any]:
     """단일 프레임(BGR) 분석 → 간단 지표 반환."""
@@ -117,13 +89,16 @@ def analyze_frame(frame_bgr: np.ndarray) -> Dict[str, Any]:
 
     h, w = frame_bgr.shape[:2]
     rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
-    res = _get_fm().process(rgb)
+    with _image_fm_pool.checkout() as fm:
+        res = fm.process(rgb)
     if not res.multi_face_landmarks:
         return {"detected": False, "reason": "no_face"}
 
-    lm = res.multi_face_landmarks[0].landmark
-    L = _eye_metrics(lm, w, h, is_left=True)
-    R = _eye_metrics(lm, w, h, is_left=False)
+    return _frame_result(res.multi_face_landmarks[0].landmark, w, h)
+
+def _frame_result(lm, w: int, h: int) -> Dict[str, Any]:
+    """랜드마크 → analyze_frame 응답 형식의 지표 (스트리밍 세션도 같은 형식으로 돌려준다)."""
+    L, R = _metrics.frame_metrics(lm, w, h, keys=_EYE_KEYS)
 
     eye_open = float(np.nanmean([L["eye_open"], R["eye_open"]]))
     v_offset = float(np.nanmean([L["v_offset"], R["v_offset"]]))
@@ -155,46 +130,99 @@ def render_overlay(frame_bgr: np.ndarray, result: Dict[str, Any]) -> np.ndarray:
                 cv2.FONT_HERSHEY_SIMPLEX, 0.75, (50, 220, 50), 2, cv2.LINE_AA)
     return vis
 
-def count_blinks(openness_series: List[float], thresh: float = 0.18, min_frames: int = 2) -> int:
-    """블링크 카운트 (임계치 하강 → 상승 한 사이클 = 1회)."""
-    closed = False
-    hold = 0
-    count = 0
-    for v in openness_series:
-        if np.isnan(v):
-            if closed and hold >= min_frames:
-                count += 1
-            closed, hold = False, 0
-            continue
-        if v < thresh:
-            if closed:
-                hold += 1
-            else:
-                closed = True; hold = 1
-        else:
-            if closed and hold >= min_frames:
-                count += 1
-            closed, hold = False, 0
-    if closed and hold >= min_frames:
-        count += 1
-    return count
+# ──────────────────────────────────────────────────────────────────────────────
+# 분석 결과 캐시 (내용 해시 + 파라미터 + 분석 버전, eye_engine.cache)
+# ──────────────────────────────────────────────────────────────────────────────
+# EYE_CACHE_MAX_ENTRIES: 메모리 LRU 항목 수(0=끔) / EYE_CACHE_DIR: 디스크 계층 경로(미설정 시 메모리만)
+_result_cache = ResultCache.from_env("EYE_CACHE")
+
+async def _hash_bytes(data: bytes) -> str:
+    """큰 업로드의 sha256 은 이벤트 루프 밖에서 (hashlib 은 GIL 을 놓는다)."""
+    if len(data) < (1 << 20):
+        return content_hash(data)
+    return await asyncio.get_running_loop().run_in_executor(None, content_hash, data)
+
+def _image_cache_key(digest: str) -> str:
+    return cache_key("image", digest)
+
+def _analyze_image_cached(img_bytes: bytes, digest: str) -> Tuple[Dict[str, Any], Optional[np.ndarray], bool]:
+    """캐시에 있으면 디코딩/추론 없이 (result, None, True), 없으면 분석 후 저장 (result, frame, False)."""
+    key = _image_cache_key(digest)
+    cached = _result_cache.get(key)
+    if cached is not None:
+        return cached, None, True
+    frame = _decode_image(img_bytes)
+    result = analyze_frame(frame)
+    _result_cache.put(key, result)
+    return result, frame, False
+
+async def _analyze_image_async(img_bytes: bytes, digest: str) -> Tuple[Dict[str, Any], Optional[np.ndarray], bool]:
+    """디코딩/추론은 이미지 분석 스레드에서 (동시 요청은 풀 크기만큼 병렬로)."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_image_executor, _analyze_image_cached, img_bytes, digest)
+
+def _decode_image(img_bytes: bytes) -> np.ndarray:
+    nparr = np.frombuffer(img_bytes, np.uint8)
+    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError("Invalid image data")
+    return frame
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Firebase Storage 유틸
 # ──────────────────────────────────────────────────────────────────────────────
+# 업로드/삭제/다운로드가 쓰는 버킷 (테스트는 이 이름을 로컬 디렉터리 버킷으로 바꿔 낀다)
+storage_bucket = bucket
+
+# 서로 독립인 업로드(원본/시각화/trace)는 전용 스레드에서 동시에 올린다.
+UPLOAD_MAX_CONCURRENCY = max(1, int(os.environ.get("EYE_UPLOAD_MAX_CONCURRENCY", "4")))
+_upload_executor = ThreadPoolExecutor(max_workers=UPLOAD_MAX_CONCURRENCY, thread_name_prefix="eye-upload")
+
+
 def _build_download_url(path: str, token: str) -> str:
     from urllib.parse import quote
-    bucket_name = bucket.name
+    bucket_name = storage_bucket.name
     return f"https://firebasestorage.googleapis.com/v0/b/{bucket_name}/o/{quote(path, safe='')}?alt=media&token={token}"
 
-def upload_bytes_to_storage(data: bytes, path: str, content_type: str) -> Dict[str, str]:
-    """Firebase Storage 업로드 + downloadURL 구성."""
+def upload_bytes_to_storage(data: bytes, path: str, content_type: str) -> Dict[str, Any]:
+    """Firebase Storage 업로드 + downloadURL 구성.
+
+    다운로드 토큰 메타데이터를 업로드 요청에 함께 실어 보낸다(별도 patch() 왕복 없음).
+    """
+    t0 = time.perf_counter()
     token = str(uuid.uuid4())
-    blob = bucket.blob(path)
-    blob.upload_from_string(data, content_type=content_type)
+    blob = storage_bucket.blob(path)
     blob.metadata = {"firebaseStorageDownloadTokens": token}
-    blob.patch()
-    return {"path": path, "token": token, "url": _build_download_url(path, token)}
+    blob.upload_from_string(data, content_type=content_type)
+    return {
+        "path": path, "token": token, "url": _build_download_url(path, token),
+        "elapsed_ms": (time.perf_counter() - t0) * 1000.0,
+    }
+
+def _upload_job(data: Union[bytes, Callable[[], bytes]], path: str, content_type: str) -> Dict[str, Any]:
+    return upload_bytes_to_storage(data() if callable(data) else data, path, content_type)
+
+def upload_in_background(
+    data: Union[bytes, Callable[[], bytes]], path: str, content_type: str,
+) -> "asyncio.Future[Dict[str, Any]]":
+    """업로드 스레드에서 시작하고 future 반환 (await 전까지 다른 작업과 겹쳐 진행).
+
+    data 가 callable 이면 업로드 스레드에서 호출해 바이트를 만든다(CSV/npz 인코딩을 이벤트 루프 밖에서).
+    """
+    loop = asyncio.get_running_loop()
+    return loop.run_in_executor(_upload_executor, _upload_job, data, path, content_type)
+
+async def discard_upload(fut: "asyncio.Future[Dict[str, Any]]") -> None:
+    """요청이 실패해 쓸모없어진 업로드를 끝까지 기다린 뒤 지운다(best-effort)."""
+    with contextlib.suppress(Exception):
+        up = await fut
+        await asyncio.get_running_loop().run_in_executor(
+            _upload_executor, storage_bucket.blob(up["path"]).delete,
+        )
+
+async def discard_uploads(*futs: Optional["asyncio.Future[Dict[str, Any]]"]) -> None:
+    """discard_upload 를 여러 업로드에 동시에 (None 은 건너뛴다)."""
+    await asyncio.gather(*(discard_upload(f) for f in futs if f is not None))
 
 # ──────────────────────────────────────────────────────────────────────────────
 # 이미지 엔드포인트 (분석/저장/재분석)
@@ -206,17 +234,121 @@ async def analyze_eye(file: UploadFile = File(...), user=Depends(get_current_use
         if file.content_type not in {"image/jpeg", "image/png", "image/webp"}:
             raise HTTPException(415, "Use jpg/png/webp")
         img_bytes = await file.read()
-        nparr = np.frombuffer(img_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        if frame is None:
-            raise ValueError("Invalid image data")
-        out = analyze_frame(frame)
-        return {"ok": True, "result": out}
+        # 같은 이미지(재시도 등)는 캐시된 결과를 그대로 반환
+        out, _, cached = await _analyze_image_async(img_bytes, await _hash_bytes(img_bytes))
+        return {"ok": True, "result": out, "cached": cached}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+# 배치 분석 한도: 이미지 수 / 전체 바이트(zip 은 압축 해제 크기 기준)
+BATCH_MAX_IMAGES = max(1, int(os.environ.get("EYE_BATCH_MAX_IMAGES", "32")))
+BATCH_MAX_BYTES = max(1, int(os.environ.get("EYE_BATCH_MAX_BYTES", str(64 << 20))))
+_IMAGE_TYPES = {"image/jpeg", "image/png", "image/webp"}
+_IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".webp"}
+_ZIP_TYPES = {"application/zip", "application/x-zip-compressed"}
+
+def _read_zip_images(data: bytes) -> List[Tuple[str, bytes]]:
+    """zip 안의 jpg/png/webp 를 (이름, 바이트) 로. 항목 수/해제 크기는 읽기 전에 목차로 검사."""
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        infos = [
+            i for i in zf.infolist()
+            if not i.is_dir() and not i.filename.startswith("__MACOSX/")
+            and os.path.splitext(i.filename)[1].lower() in _IMAGE_EXTS
+        ]
+        if len(infos) > BATCH_MAX_IMAGES:
+            raise HTTPException(413, f"Too many images (max {BATCH_MAX_IMAGES})")
+        if sum(i.file_size for i in infos) > BATCH_MAX_BYTES:
+            raise HTTPException(413, f"Batch too large (max {BATCH_MAX_BYTES} bytes)")
+        return [(i.filename, zf.read(i)) for i in infos]
+
+def _batch_aggregate(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """이미지별 결과 → 묶음 요약 (얼굴이 검출된 이미지만으로 지표 계산)."""
+    analyzed = [r["result"] for r in results if r["ok"]]
+    detected = [r for r in analyzed if r.get("detected")]
+    agg: Dict[str, Any] = {
+        "images": len(results),
+        "analyzed": len(analyzed),
+        "detected": len(detected),
+        "detection_rate": (len(detected) / len(analyzed)) if analyzed else float("nan"),
+    }
+    if not detected:
+        return agg
+    eye_open = np.array([r["eye_open"] for r in detected], dtype=np.float64)
+    v_offset = np.array([r["v_offset"] for r in detected], dtype=np.float64)
+    v_valid = v_offset[~np.isnan(v_offset)]
+    with np.errstate(all="ignore"):
+        agg.update({
+            "eye_open_mean": float(np.nanmean(eye_open)) if (~np.isnan(eye_open)).any() else float("nan"),
+            "eye_open_min": float(np.nanmin(eye_open)) if (~np.isnan(eye_open)).any() else float("nan"),
+            "v_offset_mean": float(v_valid.mean()) if len(v_valid) else float("nan"),
+            "vertical_offset_std": float(v_valid.std()) if len(v_valid) else float("nan"),
+            "vertical_peak_to_peak": float(np.percentile(v_valid, 95) - np.percentile(v_valid, 5)) if len(v_valid) else float("nan"),
+            "blink_prob_mean": float(np.mean([r["blink_prob"] for r in detected])),
+        })
+    return agg
+
+@router.post("/analyze_batch")
+async def analyze_eye_batch(
+    files: List[UploadFile] = File(..., description="이미지 여러 장(jpg/png/webp) 또는 이미지를 담은 zip"),
+    user=Depends(get_current_user),
+):
+    """여러 이미지를 한 요청으로 분석(서버 저장 없음). 이미지별 결과 배열 + 묶음 요약.
+
+    인증/업로드 왕복을 한 번으로 줄이고, 디코딩/추론은 이미지 풀 크기만큼 병렬로 돌린다.
+    같은 내용의 이미지는 한 번만 분석한다.
+    """
+    t0 = time.perf_counter()
+    items: List[Tuple[str, bytes]] = []
+    total_bytes = 0
+    for f in files:
+        data = await f.read()
+        name = f.filename or f"image_{len(items)}"
+        if f.content_type in _ZIP_TYPES or name.lower().endswith(".zip"):
+            try:
+                entries = _read_zip_images(data)
+            except zipfile.BadZipFile:
+                raise HTTPException(400, f"Invalid zip: {name}")
+        elif f.content_type in _IMAGE_TYPES:
+            entries = [(name, data)]
+        else:
+            raise HTTPException(415, f"Use jpg/png/webp or zip ({name})")
+        items.extend(entries)
+        total_bytes += sum(len(b) for _, b in entries)
+        if len(items) > BATCH_MAX_IMAGES:
+            raise HTTPException(413, f"Too many images (max {BATCH_MAX_IMAGES})")
+        if total_bytes > BATCH_MAX_BYTES:
+            raise HTTPException(413, f"Batch too large (max {BATCH_MAX_BYTES} bytes)")
+    if not items:
+        raise HTTPException(400, "No images")
+
+    digests = await asyncio.gather(*(_hash_bytes(b) for _, b in items))
+    # 내용이 같은 이미지는 작업 하나를 공유
+    jobs: Dict[str, "asyncio.Future[Tuple[Dict[str, Any], Optional[np.ndarray], bool]]"] = {}
+    for (_, data), digest in zip(items, digests):
+        if digest not in jobs:
+            jobs[digest] = asyncio.ensure_future(_analyze_image_async(data, digest))
+    await asyncio.gather(*jobs.values(), return_exceptions=True)
+
+    results: List[Dict[str, Any]] = []
+    for i, ((name, _), digest) in enumerate(zip(items, digests)):
+        job = jobs[digest]
+        if job.exception() is not None:
+            results.append({"index": i, "filename": name, "ok": False, "error": str(job.exception())})
+            continue
+        result, _, cached = job.result()
+        results.append({"index": i, "filename": name, "ok": True, "result": result, "cached": cached})
+
+    return {
+        "ok": True,
+        "count": len(results),
+        "unique": len(jobs),
+        "results": results,
+        "aggregate": _batch_aggregate(results),
+        "timings": {"total_ms": (time.perf_counter() - t0) * 1000.0},
+    }
+
 @router.post("/save")
 async def save_eye_record(
     file: UploadFile = File(...),
@@ -232,15 +364,14 @@ async def save_eye_record(
             raise HTTPException(415, "Use jpg/png/webp")
 
         img_bytes = await file.read()
-        nparr = np.frombuffer(img_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        # 분석은 캐시 우선 (원본 재인코딩/오버레이에는 디코딩된 프레임이 필요)
+        result, frame, _ = await _analyze_image_async(img_bytes, await _hash_bytes(img_bytes))
         if frame is None:
-            raise ValueError("Invalid image data")
+            frame = _decode_image(img_bytes)
 
         h, w = frame.shape[:2]
 
-        # 분석 + (옵션)오버레이
-        result: Dict[str, Any] = analyze_frame(frame)
+        # (옵션)오버레이
         vis = render_overlay(frame, result) if store_vis else None
 
         # 인코딩
@@ -261,39 +392,55 @@ async def save_eye_record(
         raw_path = f"{base_path}/raw_{ts}.jpg"
         vis_path = f"{base_path}/vis_{ts}.jpg" if store_vis else None
 
-        # Storage 업로드
-        up_raw = upload_bytes_to_storage(raw_buf.tobytes(), raw_path, content_type="image/jpeg")
-        up_vis: Optional[Dict[str, str]] = None
+        # Storage 업로드 (원본/시각화 동시)
+        raw_jpg = raw_buf.tobytes()
+        t_up = time.perf_counter()
+        uploads = [upload_in_background(raw_jpg, raw_path, "image/jpeg")]
         if store_vis and vis_buf is not None:
-            up_vis = upload_bytes_to_storage(vis_buf, vis_path, content_type="image/jpeg")
-
-        # Firestore 메타데이터
-        doc_ref = db.collection("users").document(uid).collection("eye_records").document(record_id)
-        payload = {
-            "record_id": record_id,
-            "user_id": uid,
-            "created_at": fb_fs.SERVER_TIMESTAMP,
-            "width": w,
-            "height": h,
-            "analysis": result,
-            "storage_path_raw": up_raw["path"],
-            "download_token_raw": up_raw["token"],
-            "url_raw": up_raw["url"],
-            "kind": "image",
-        }
-        if up_vis is not None:
-            payload.update({
-                "storage_path_vis": up_vis["path"],
-                "download_token_vis": up_vis["token"],
-                "url_vis": up_vis["url"],
-            })
-        doc_ref.set(payload)
+            uploads.append(upload_in_background(vis_buf, vis_path, "image/jpeg"))
+        try:
+            done = await asyncio.gather(*uploads)
+            up_raw = done[0]
+            up_vis: Optional[Dict[str, Any]] = done[1] if len(done) > 1 else None
+            upload_wall_ms = (time.perf_counter() - t_up) * 1000.0
+
+            # Firestore 메타데이터
+            doc_ref = db.collection("users").document(uid).collection("eye_records").document(record_id)
+            payload = {
+                "record_id": record_id,
+                "user_id": uid,
+                "created_at": fb_fs.SERVER_TIMESTAMP,
+                "width": w,
+                "height": h,
+                "analysis": result,
+                "storage_path_raw": up_raw["path"],
+                "download_token_raw": up_raw["token"],
+                "url_raw": up_raw["url"],
+                "sha256_raw": content_hash(raw_jpg),  # load_predict 가 다운로드 없이 캐시를 찾는 키
+                "kind": "image",
+            }
+            if up_vis is not None:
+                payload.update({
+                    "storage_path_vis": up_vis["path"],
+                    "download_token_vis": up_vis["token"],
+                    "url_vis": up_vis["url"],
+                    "sha256_vis": content_hash(vis_buf),
+                })
+            doc_ref.set(payload)
+        except Exception:
+            # 업로드 하나라도 실패하거나 문서 저장이 실패하면 이미 올라간 blob 을 지운다(저장하지 않은 것으로)
+            await discard_uploads(*uploads)
+            raise
 
         return {
             "ok": True,
             "record_id": record_id,
             "urls": {"raw": up_raw["url"], "vis": up_vis["url"] if up_vis else None},
             "result": result,
+            "timings": {
+                "upload_ms": upload_wall_ms,  # 동시 업로드 전체 대기
+                "upload_serial_ms": sum(u["elapsed_ms"] for u in done),  # 하나씩 올렸다면 걸렸을 시간
+            },
         }
     except HTTPException:
         raise
@@ -323,42 +470,310 @@ async def load_predict(
         if not path:
             raise HTTPException(status_code=400, detail=f"no {source} image for this record")
 
-        blob = bucket.blob(path)
-        img_bytes = blob.download_as_bytes()
+        # 저장 시 기록한 내용 해시로 캐시를 먼저 찾는다 → 적중하면 다운로드/디코딩/추론 모두 생략
+        digest = doc.get(f"sha256_{source}")
+        result = _result_cache.get(_image_cache_key(digest)) if digest else None
+        cached = result is not None
+        if result is None:
+            img_bytes = storage_bucket.blob(path).download_as_bytes()
+            result, _, cached = await _analyze_image_async(img_bytes, digest or await _hash_bytes(img_bytes))
 
-        nparr = np.frombuffer(img_bytes, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        if frame is None:
-            raise ValueError("Invalid stored image data")
-
-        result = analyze_frame(frame)
-
-        # 결과 업데이트(옵션)
-        doc_ref.update({f"analysis_{source}_recomputed": result, "updated_at": fb_fs.SERVER_TIMESTAMP})
+        # 결과 업데이트(옵션) — 이미 같은 결과를 기록했다면 다시 쓰지 않는다
+        if not cached or f"analysis_{source}_recomputed" not in doc:
+            doc_ref.update({f"analysis_{source}_recomputed": result, "updated_at": fb_fs.SERVER_TIMESTAMP})
 
-        return {"ok": True, "record_id": record_id, "source": source, "result": result}
+        return {"ok": True, "record_id": record_id, "source": source, "result": result, "cached": cached}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+# ──────────────────────────────────────────────────────────────────────────────
+# 동영상 작업 입장 제어 (동시 실행 N개 + 유한 대기열, 초과 시 429)
+# ──────────────────────────────────────────────────────────────────────────────
+VIDEO_MAX_CONCURRENCY = max(1, int(os.environ.get("EYE_VIDEO_MAX_CONCURRENCY", "2")))
+VIDEO_MAX_QUEUE = max(0, int(os.environ.get("EYE_VIDEO_MAX_QUEUE", "4")))
+
+class VideoQueueFull(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__("video queue full")
+        self.retry_after = retry_after
+
+class VideoJobGate:
+    """동영상 작업 입장 제어: 동시 실행 슬롯 + 유한 대기열, 대기열이 차면 즉시 거절."""
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.running = 0
+        self.waiting = 0
+        self.admitted_total = 0
+        self.rejected_total = 0
+        self.last_wait_ms = 0.0
+        self.avg_wait_ms = 0.0   # 지수이동평균
+        self.avg_job_ms = 0.0    # 지수이동평균 (Retry-After 추정용)
+        self._sem: Optional[asyncio.Semaphore] = None
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+        return self._sem
+
+    def retry_after(self) -> int:
+        """대기열이 한 칸 빠질 때까지의 대략적인 시간(초)."""
+        job_sec = (self.avg_job_ms or 10_000.0) / 1000.0
+        rounds = (self.waiting + 1) / self.max_concurrency
+        return max(1, int(math.ceil(job_sec * rounds)))
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        if self.running >= self.max_concurrency and self.waiting >= self.max_queue:
+            self.rejected_total += 1
+            raise VideoQueueFull(self.retry_after())
+
+        t_enq = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._semaphore().acquire()
+        finally:
+            self.waiting -= 1
+        wait_ms = (time.perf_counter() - t_enq) * 1000.0
+        self.last_wait_ms = wait_ms
+        self.avg_wait_ms = wait_ms if self.admitted_total == 0 else 0.8 * self.avg_wait_ms + 0.2 * wait_ms
+        self.admitted_total += 1
+        self.running += 1
+
+        t_run = time.perf_counter()
+        try:
+            yield wait_ms
+        finally:
+            job_ms = (time.perf_counter() - t_run) * 1000.0
+            self.avg_job_ms = job_ms if self.avg_job_ms == 0.0 else 0.8 * self.avg_job_ms + 0.2 * job_ms
+            self.running -= 1
+            self._semaphore().release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "saturated": self.running >= self.max_concurrency and self.waiting >= self.max_queue,
+            "last_wait_ms": self.last_wait_ms,
+            "avg_wait_ms": self.avg_wait_ms,
+            "avg_job_ms": self.avg_job_ms,
+            "admitted_total": self.admitted_total,
+            "rejected_total": self.rejected_total,
+        }
+
+# 구간 병렬 분석: 작업 하나가 쓸 수 있는 최대 프로세스 수 (기본: CPU 코어 수)
+VIDEO_MAX_SEGMENTS = max(1, int(os.environ.get("EYE_VIDEO_MAX_SEGMENTS", "0") or 0) or (os.cpu_count() or 1))
+# 작업 스레드/업로드 스레드가 도는 서버 프로세스라 fork 대신 forkserver 로 자식 생성
+SEGMENT_START_METHOD = os.environ.get("EYE_SEGMENT_START_METHOD", "forkserver" if os.name == "posix" else "spawn")
+
+# profile=true 허용: EYE_PROFILE=1 이어야 하고, EYE_PROFILE_UIDS(쉼표 구분)를 주면 그 사용자만
+PROFILE_UIDS = {u.strip() for u in os.environ.get("EYE_PROFILE_UIDS", "").split(",") if u.strip()}
+
+_video_gate = VideoJobGate(VIDEO_MAX_CONCURRENCY, VIDEO_MAX_QUEUE)
+_video_executor = ThreadPoolExecutor(max_workers=VIDEO_MAX_CONCURRENCY, thread_name_prefix="eye-video")
+
+def _cut_tracking(fm: mp_face_mesh.FaceMesh) -> None:
+    """반납 시 빈 프레임 한 장: 이전 영상의 추적 상태가 다음 작업 첫 프레임에 이어지지 않게."""
+    fm.process(np.zeros((64, 64, 3), dtype=np.uint8))
+
+# 동영상(/process 순차 분석): 추적 모드 풀, 작업 하나가 인스턴스 하나를 빌려 끝까지 쓴다 (기본: 동시 실행 수)
+VIDEO_FM_POOL_SIZE = max(1, int(os.environ.get("EYE_VIDEO_FM_POOL_SIZE", "0") or 0) or VIDEO_MAX_CONCURRENCY)
+_video_fm_pool = FaceMeshPool(lambda: _new_face_mesh(False), VIDEO_FM_POOL_SIZE, name="video", reset=_cut_tracking)
+
+@router.get("/queue", summary="동영상 작업 대기열 상태(로드밸런서용)")
+async def video_queue_status():
+    stats = _video_gate.stats()
+    # 포화 상태면 503 → 로드밸런서 헬스체크가 이 인스턴스를 우회하도록
+    return JSONResponse(
+        {"ok": not stats["saturated"], "queue": stats},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE if stats["saturated"] else status.HTTP_200_OK,
+    )
+
+@router.get("/pools", summary="FaceMesh 풀 사용/대기 통계")
+async def face_mesh_pool_status():
+    return {"ok": True, "pools": {"image": _image_fm_pool.stats(), "video": _video_fm_pool.stats()}}
+
+@router.get("/cache", summary="분석 결과 캐시 적중/미스 통계")
+async def result_cache_status():
+    return {"ok": True, "cache": _result_cache.stats()}
+
 # ──────────────────────────────────────────────────────────────────────────────
 # 동영상 엔드포인트 (PSP 스크리닝 + CSV 저장)
 # ──────────────────────────────────────────────────────────────────────────────
+def _render_video_overlay(
+    frame: np.ndarray, p: np.ndarray, width: int, height: int, rgb: bool = False,
+) -> Optional[str]:
+    """대표 프레임 위에 홍채 중심/지표를 그려 PNG(base64)로. rgb=True 면 RGB 프레임(PyAV 디코더)."""
+    L, R = _metrics.frame_metrics(p, width, height, keys=_EYE_KEYS)
+    v_offset = float(np.nanmean([L["v_offset"], R["v_offset"]]))
+    eye_open = float(np.nanmean([L["eye_open"], R["eye_open"]]))
+    vis = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR) if rgb else frame.copy()
+    for (x, y) in [(L["iris_cx"], L["iris_cy"]), (R["iris_cx"], R["iris_cy"])]:
+        if not (np.isnan(x) or np.isnan(y)):
+            cv2.circle(vis, (int(x), int(y)), 3, (0, 255, 0), -1)
+    cv2.putText(vis, f"v_offset(avg): {v_offset:+.3f}", (10, 30),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (50, 220, 50), 2, cv2.LINE_AA)
+    cv2.putText(vis, f"eye_open(avg): {eye_open:.3f}", (10, 60),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (50, 220, 50), 2, cv2.LINE_AA)
+    ok, buf = cv2.imencode(".png", vis)
+    return base64.b64encode(buf.tobytes()).decode("utf-8") if ok else None
+
+def _first_face_overlay(video_path: str, trace: TraceBuffer, width: int, height: int) -> Optional[str]:
+    """구간 병렬 분석 뒤: 얼굴이 처음 검출된 프레임만 다시 읽어 오버레이 생성."""
+    found = np.flatnonzero(~np.isnan(trace.points[: len(trace), 0, 0]))
+    if not len(found):
+        return None
+    i = int(found[0])
+    cap = open_video(video_path)
+    rgb = frames_are_rgb(cap)
+    try:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, int(trace.frame_idx[i]))
+        ok, frame = cap.read()
+    finally:
+        cap.release()
+    return _render_video_overlay(frame, trace.points[i], width, height, rgb=rgb) if ok else None
+
+def _analyze_video_sequential(
+    cap: "cv2.VideoCapture", trace: TraceBuffer, fps: float, width: int, height: int, max_frames: int,
+    return_overlay: bool, step: int, target_fps: Optional[float], sampling: str, roi: bool,
+    timer: StageTimer, adaptive: Optional[AdaptiveConfig] = None, blink_thresh: float = 0.18,
+    vpp_thresh: Optional[float] = None,
+) -> Dict[str, Any]:
+    """풀에서 빌린 FaceMesh 하나로 처음부터 끝까지 분석. tracking 통계(+overlay_png_b64, adaptive) 반환.
+
+    디코딩 → 추론 → trace 기록은 FramePipeline 단계로 겹쳐 돈다(디코딩 스레드가 앞서 읽고 trace 는 별도 스레드).
+    timer 에는 단계별 busy 시간 decode / inference / trace 를 누적하고, 단계 가동률은 tracking["pipeline"].
+    adaptive 를 주면 눈 움직임에 따라 분석 간격을 바꾸고(수렴 시 중단) 그 보고를 "adaptive" 로 돌려준다
+    — 다음 프레임이 직전 결과에 달려 있어 파이프라인은 한 스레드(inline)로 돈다.
+    """
+    overlay_png_b64: Optional[str] = None
+    # PyAV 디코더면 프레임이 이미 RGB 라 FaceMesh 입력 변환이 없다
+    rgb = frames_are_rgb(cap)
+    decoder = decoder_info(cap)
+    pipeline = FramePipeline(depth=0 if adaptive is not None else None, timer=timer, rgb=rgb)
+    # 디코딩 배열은 큐 깊이만큼 돌려 쓰고(오버레이 프레임은 복사), RGB 변환 배열은 추적기 몫
+    buffers = pipeline.decode_buffers()
+    sampler = AdaptiveSampler(
+        adaptive, trace, step=step, target_fps=target_fps, blink_thresh=blink_thresh, vpp_thresh=vpp_thresh,
+    ) if adaptive is not None else None
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    try:
+        with _video_fm_pool.checkout() as fm:
+            # roi=True 면 직전 얼굴 박스 주변만 잘라 축소 입력 (랜드마크는 원본 좌표로 복원)
+            # 얼굴을 놓친 프레임의 재검출은 이미지 풀(정지 영상 모드)에서 그때만 빌린다
+            tracker = FaceLandmarkTracker(fm, roi=roi, buffers=FrameBuffers(rgb=rgb), detector=_image_fm_pool)
+            # 건너뛸 프레임은 grab()만(또는 seek) → 분석 프레임만 retrieve
+            if sampler is not None:
+                frames = sampler.frames(cap, max_frames=max_frames, mode=sampling, buffers=buffers)
+            else:
+                frames = iter_sampled_frames(
+                    cap, fps, step=step, target_fps=target_fps, max_frames=max_frames, mode=sampling,
+                    buffers=buffers,
+                )
+            pipeline.run(frames, tracker, trace, sampler=sampler, keep_first_face=return_overlay)
+    finally:
+        cap.release()
+    if pipeline.first_face is not None:
+        row, frame = pipeline.first_face
+        overlay_png_b64 = _render_video_overlay(frame, trace.points[row], width, height, rgb=rgb)
+    return {
+        **tracker.stats(), "decoder": decoder, "pipeline": pipeline.stats(), "overlay_png_b64": overlay_png_b64,
+        "adaptive": sampler.report(frame_count) if sampler is not None else None,
+    }
+
+def _analyze_video_bytes(
+    raw_bytes: bytes, ext: str, step: int, max_frames: int, return_overlay: bool,
+    target_fps: Optional[float] = None, sampling: str = "grab", roi: bool = False,
+    blink_thresh: float = 0.18, blink_min_frames: int = 2, segments: int = 1,
+    timer: Optional[StageTimer] = None, adaptive: Optional[AdaptiveConfig] = None,
+    vpp_thresh: Optional[float] = None,
+) -> Tuple[Optional[TraceBuffer], float, int, int, Optional[str], Dict[str, Any]]:
+    """작업 스레드에서 실행: 디코딩 → FaceMesh → 프레임별 trace + 누적 요약 (+대표 오버레이).
+
+    segments > 1 이고 영상이 충분히 길면 시간 구간으로 나눠 프로세스별로 분석한다(eye_engine.segments).
+    adaptive 는 다음 분석 프레임을 직전 결과로 정하므로 구간 병렬 없이 순차로만 분석한다.
+    """
+    timer = timer or new_timer(False)
+    # 메모리 파일(memfd, 큰 영상은 임시파일)로 캡처 — eye_engine.spool / 디코더 백엔드는 EYE_DECODER
+    with timer.stage("spool"):
+        spool = VideoSpool.from_bytes(raw_bytes, ext)
+    with spool:
+        with timer.stage("open"):
+            cap = open_video(spool.path)
+        if not cap.isOpened():
+            raise HTTPException(400, detail="동영상을 열 수 없습니다.")
+
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+
+        # 프레임별 랜드마크 점을 미리 잡아 둔 컬럼 배열에 기록 — 지표는 루프 뒤 한 번에 계산
+        trace = TraceBuffer.for_capture(
+            _metrics, cap, fps, step=step, target_fps=target_fps, max_frames=max_frames,
+            summary=StreamingSummary(blink_thresh=blink_thresh, blink_min_frames=blink_min_frames),
+        )
+        overlay_png_b64: Optional[str] = None
+
+        plan = plan_segments(
+            int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0), fps, 1 if adaptive else min(segments, VIDEO_MAX_SEGMENTS),
+            step=step, target_fps=target_fps, max_frames=max_frames,
+        )
+        if len(plan) > 1:
+            # 구간마다 자식 프로세스(자체 FaceMesh)로 병렬 분석 → frame_idx 순으로 이어 붙인다
+            cap.release()
+            with timer.stage("segments"):
+                results = run_segments_in_processes(
+                    spool.path, plan, _metrics, fps, step=step, target_fps=target_fps, sampling=sampling, roi=roi,
+                    start_method=SEGMENT_START_METHOD,
+                )
+            with timer.stage("trace"):
+                tracking = merge_segments(trace, results)
+            if return_overlay:
+                overlay_png_b64 = _first_face_overlay(spool.path, trace, width, height)
+        else:
+            tracking = _analyze_video_sequential(
+                cap, trace, fps, width, height, max_frames, return_overlay, step, target_fps, sampling, roi, timer,
+                adaptive, blink_thresh, vpp_thresh,
+            )
+            overlay_png_b64 = tracking.pop("overlay_png_b64")
+
+    if not len(trace):
+        return None, fps, width, height, overlay_png_b64, tracking
+    # 프레임 배치 지표 계산 → 컬럼 (미검출 프레임은 NaN)
+    with timer.stage("metrics"):
+        trace.finalize()
+    return trace, fps, width, height, overlay_png_b64, tracking
+
 @router.post(
     "/process",
     summary="video→MediaPipe→CSV→rule-based PSP screening",
     status_code=status.HTTP_200_OK,
 )
 async def process_eye_video(
+    http_response: Response,
     file: UploadFile = File(..., description="동영상 파일(mp4/avi/mov/webm 등)"),
     save: bool = Query(True, description="원본 영상/CSV/요약 결과를 Firebase에 저장"),
+    trace_format: str = Query("csv", pattern=r"^(csv|npz)$", description="프레임 trace 저장 포맷: csv | npz(float32 압축 컬럼 + 메타데이터)"),
     return_overlay: bool = Query(False, description="대표 프레임 오버레이 PNG(base64) 포함"),
     step: int = Query(1, ge=1, le=10, description="프레임 샘플링 간격(성능 조절)"),
+    target_fps: Optional[float] = Query(None, gt=0, description="초당 분석 프레임 수(지정 시 step 대신 사용)"),
+    sampling: str = Query("grab", pattern=r"^(grab|seek)$", description="건너뛸 프레임 처리: grab(디코딩만) | seek(키프레임 탐색)"),
+    roi: bool = Query(False, description="얼굴 주변만 잘라 축소 입력으로 추적(고해상도 영상 CPU 절감)"),
     vpp_thresh: float = Query(0.06, gt=0, description="PSP 의심 판정용 수직 피크투피크(정규화) 임계값"),
     blink_thresh: float = Query(0.18, gt=0, description="눈꺼풀 닫힘 판정 임계치(eye_open)"),
     blink_min_frames: int = Query(2, ge=1, description="블링크로 인정할 닫힘 최소 프레임"),
     max_frames: int = Query(12000, ge=10, description="최대 처리 프레임(안전장치)"),
+    segments: int = Query(1, ge=1, le=32, description="구간 병렬 분석 프로세스 수(1=순차, EYE_VIDEO_MAX_SEGMENTS 로 제한)"),
+    adaptive: bool = Query(False, description="적응형 샘플링: 눈 움직임 중에는 촘촘히, 고정 중에는 성기게 분석 (순차 분석)"),
+    early_stop: bool = Query(False, description="adaptive 에서 수직 피크투피크/블링크율 95% 구간이 허용오차 안이면 중단"),
+    vpp_tol: float = Query(0.01, gt=0, description="early_stop: vertical_peak_to_peak 구간 반폭 허용치"),
+    blink_tol: float = Query(3.0, gt=0, description="early_stop: blink_rate_per_min 구간 반폭 허용치"),
+    profile: bool = Query(False, description="분석을 cProfile 로 실행해 상위 함수 반환 (EYE_PROFILE=1 일 때만, 캐시·구간 병렬 미사용)"),
     user=Depends(get_current_user),
 ):
     allowed = {
@@ -374,124 +789,101 @@ async def process_eye_video(
     uid = user.get("uid") if isinstance(user, dict) else getattr(user, "uid", None)
     if not uid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid user")
+    if profile:
+        if not PROFILE_ENABLED or (PROFILE_UIDS and uid not in PROFILE_UIDS):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="profile=true 가 허용되지 않았습니다.")
+        segments = 1  # 자식 프로세스는 재지 않으므로 순차 분석으로 돌린다
     now_ms = int(time.time() * 1000)
     record_id = str(uuid.uuid4())
     base_path = f"users/{uid}/eye/{record_id}"
 
+    # 단계별 소요(ms) → Server-Timing 헤더 + timings.stages (EYE_TIMING=0 이면 끔)
+    timer = new_timer()
+
     # 1) 원본 동영상 확보
-    raw_bytes = await file.read()
+    with timer.stage("read_upload"):
+        raw_bytes = await file.read()
     if not raw_bytes:
         raise HTTPException(400, detail="빈 파일입니다.")
     ext = os.path.splitext(file.filename or "")[1] or ".mp4"
     raw_video_path = f"{base_path}/raw_{now_ms}{ext}"
 
-    # 2) 임시파일로 OpenCV 캡처
-    with tempfile.NamedTemporaryFile(delete=True, suffix=ext) as tmp:
-        tmp.write(raw_bytes); tmp.flush()
-        cap = cv2.VideoCapture(tmp.name)
-        if not cap.isOpened():
-            raise HTTPException(400, detail="동영상을 열 수 없습니다.")
-
-        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
-
-        rows: List[Dict[str, Any]] = []
-        overlay_png_b64: Optional[str] = None
-
-        fidx = 0
-        kept = 0
-        fm = _get_fm()
-        while kept < max_frames:
-            ok, frame = cap.read()
-            if not ok:
-                break
-            if fidx % step != 0:
-                fidx += 1
-                continue
-
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            res = fm.process(rgb)
-            t_sec = fidx / max(1e-6, fps)
-
-            if res.multi_face_landmarks:
-                lm = res.multi_face_landmarks[0].landmark
-                L = _eye_metrics(lm, width, height, is_left=True)
-                R = _eye_metrics(lm, width, height, is_left=False)
-                v_offset = float(np.nanmean([L["v_offset"], R["v_offset"]]))
-                eye_open = float(np.nanmean([L["eye_open"], R["eye_open"]]))
-
-                rows.append({
-                    "frame_idx": fidx,
-                    "time_sec": t_sec,
-                    # 왼쪽
-                    "L_iris_cx": L["iris_cx"], "L_iris_cy": L["iris_cy"],
-                    "L_eye_open": L["eye_open"], "L_v_offset": L["v_offset"],
-                    # 오른쪽
-                    "R_iris_cx": R["iris_cx"], "R_iris_cy": R["iris_cy"],
-                    "R_eye_open": R["eye_open"], "R_v_offset": R["v_offset"],
-                    # 대표
-                    "eye_open": eye_open,
-                    "v_offset": v_offset,
-                })
-
-                if return_overlay and overlay_png_b64 is None:
-                    vis = frame.copy()
-                    for (x, y) in [(L["iris_cx"], L["iris_cy"]), (R["iris_cx"], R["iris_cy"])]:
-                        if not (np.isnan(x) or np.isnan(y)):
-                            cv2.circle(vis, (int(x), int(y)), 3, (0, 255, 0), -1)
-                    cv2.putText(vis, f"v_offset(avg): {v_offset:+.3f}", (10, 30),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (50, 220, 50), 2, cv2.LINE_AA)
-                    cv2.putText(vis, f"eye_open(avg): {eye_open:.3f}", (10, 60),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (50, 220, 50), 2, cv2.LINE_AA)
-                    ok2, buf = cv2.imencode(".png", vis)
-                    if ok2:
-                        overlay_png_b64 = base64.b64encode(buf.tobytes()).decode("utf-8")
+    # 같은 영상을 같은 파라미터로 다시 보낸 경우(클라이언트 재시도 등) 디코딩/추론 없이 이전 결과 반환.
+    # 저장 요청은 사용자 범위로 캐시하고 이전에 만든 레코드/Storage 경로를 그대로 돌려준다(중복 업로드 없음).
+    t_req = time.perf_counter()
+    cache_params = {
+        "step": step, "target_fps": target_fps, "sampling": sampling, "roi": roi,
+        "vpp_thresh": vpp_thresh, "blink_thresh": blink_thresh, "blink_min_frames": blink_min_frames,
+        "max_frames": max_frames, "segments": segments, "return_overlay": return_overlay,
+        "save": save, "uid": uid if save else None, "trace_format": trace_format if save else None,
+        "adaptive": [early_stop, vpp_tol, blink_tol] if adaptive else None,
+    }
+    with timer.stage("hash"):
+        video_key = cache_key("video", await _hash_bytes(raw_bytes), cache_params)
+    cached = None if profile else _result_cache.get(video_key)  # 프로파일 요청은 실제로 분석한다
+    if cached is not None:
+        cached["cached"] = True
+        cached["timings"] = {
+            "queue_wait_ms": 0.0, "analysis_ms": 0.0, "upload_ms": {}, "upload_wait_ms": 0.0,
+            "total_ms": (time.perf_counter() - t_req) * 1000.0, "stages": timer.as_dict(),
+        }
+        if timer.enabled:
+            http_response.headers["Server-Timing"] = timer.server_timing()
+        return cached
+
+    # 2) 입장 제어 후 작업 스레드에서 디코딩/추론 (이벤트 루프 비차단)
+    #    저장 시 원본 업로드는 입장 직후 시작해 분석과 겹쳐 진행한다.
+    loop = asyncio.get_running_loop()
+    raw_upload = None
+    try:
+        async with _video_gate.slot() as queue_wait_ms:
+            timer.add("queue_wait", queue_wait_ms)
+            if save:
+                raw_upload = upload_in_background(raw_bytes, raw_video_path, file.content_type or "video/mp4")
+            t_an = time.perf_counter()
+            analyze_args = (
+                raw_bytes, ext, step, max_frames, return_overlay,
+                target_fps, sampling, roi, blink_thresh, blink_min_frames, segments, timer,
+                AdaptiveConfig(early_stop, vpp_tol, blink_tol) if adaptive else None, vpp_thresh,
+            )
+            profile_stats = None
+            if profile:
+                # cProfile 은 켠 스레드만 재므로 작업 스레드 안에서 감싼다
+                (trace, fps, width, height, overlay_png_b64, tracking), profile_stats = await loop.run_in_executor(
+                    _video_executor, profile_call, _analyze_video_bytes, *analyze_args,
+                )
             else:
-                rows.append({
-                    "frame_idx": fidx,
-                    "time_sec": t_sec,
-                    "L_iris_cx": np.nan, "L_iris_cy": np.nan,
-                    "L_eye_open": np.nan, "L_v_offset": np.nan,
-                    "R_iris_cx": np.nan, "R_iris_cy": np.nan,
-                    "R_eye_open": np.nan, "R_v_offset": np.nan,
-                    "eye_open": np.nan, "v_offset": np.nan,
-                })
-
-            kept += 1
-            fidx += 1
-
-        cap.release()
-
-    if len(rows) == 0:
-        raise HTTPException(400, detail="유효한 프레임을 처리하지 못했습니다.")
-
-    # 3) CSV 생성
-    df = pd.DataFrame(rows).sort_values("frame_idx").reset_index(drop=True)
-
-    # 4) 요약 통계 및 규칙 기반 판정(PSP 스크리닝)
-    v_series = df["v_offset"].to_numpy(dtype=float)
-    eye_open_series = df["eye_open"].to_numpy(dtype=float)
-    v_valid = v_series[~np.isnan(v_series)]
-    open_valid = eye_open_series[~np.isnan(eye_open_series)]
-
-    def robust_ptp(x: np.ndarray) -> float:
-        if x.size == 0:
-            return float("nan")
-        lo, hi = np.percentile(x, [5, 95])
-        return float(hi - lo)
+                trace, fps, width, height, overlay_png_b64, tracking = await loop.run_in_executor(
+                    _video_executor, _analyze_video_bytes, *analyze_args,
+                )
+            analysis_ms = (time.perf_counter() - t_an) * 1000.0
+        if trace is None:
+            raise HTTPException(400, detail="유효한 프레임을 처리하지 못했습니다.")
+    except VideoQueueFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="동영상 분석 대기열이 가득 찼습니다. 잠시 후 다시 시도하세요.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    except Exception:
+        # 분석 실패 → 미리 올린 원본은 저장하지 않은 것으로 되돌린다
+        if raw_upload is not None:
+            await discard_upload(raw_upload)
+        raise
 
-    v_ptp = robust_ptp(v_valid)
-    v_std = float(np.nanstd(v_valid)) if v_valid.size else float("nan")
-    blink_count = count_blinks(open_valid.tolist(), thresh=blink_thresh, min_frames=blink_min_frames)
-    dur_sec = float(df["time_sec"].dropna().max() - df["time_sec"].dropna().min()) if df["time_sec"].notna().any() else float("nan")
+    # 3) 요약 통계 및 규칙 기반 판정(PSP 스크리닝) — 분석 중 누적한 스트리밍 요약을 그대로 쓴다
+    streamed = trace.summary.result()
+    v_ptp = streamed["v_ptp"]
+    v_std = streamed["v_std"]
+    blink_count = streamed["blink_count"]
+    dur_sec = streamed["duration_sec"]
     blink_rate_per_min = (blink_count / dur_sec * 60.0) if (dur_sec and not math.isnan(dur_sec) and dur_sec > 0) else float("nan")
 
     psp_suspected = bool(v_ptp < vpp_thresh) if not math.isnan(v_ptp) else False
     psp_reason = f"vertical_peak_to_peak({v_ptp:.3f}) < threshold({vpp_thresh:.3f})" if psp_suspected else "criteria_not_met"
 
     summary = {
-        "frames_processed": int(len(df)),
+        "frames_processed": len(trace),
         "fps": float(fps),
         "duration_sec_est": dur_sec,
         "vertical_offset_std": v_std,
@@ -500,16 +892,27 @@ async def process_eye_video(
         "blink_rate_per_min": blink_rate_per_min,
         "psp_suspected": psp_suspected,
         "psp_rule_reason": psp_reason,
+        "queue_wait_ms": queue_wait_ms,
+        "tracking": tracking,
+        "trace_buffer": trace.stats(),
+        "summary_exact": streamed["exact"],  # False 면 p5/p95 는 스케치 추정값 (eye_engine.summary 오차 한계)
+        "adaptive_sampling": tracking.pop("adaptive", None),  # adaptive: 분석/건너뛴 프레임 수와 이유, 조기 중단 여부
         "params": {
             "step": step,
+            "target_fps": target_fps,
+            "sampling": sampling,
             "vpp_thresh": vpp_thresh,
             "blink_thresh": blink_thresh,
             "blink_min_frames": blink_min_frames,
             "max_frames": max_frames,
+            "segments": segments,
+            "trace_format": trace_format,
+            "adaptive": adaptive,
+            "early_stop": early_stop if adaptive else None,
         },
     }
 
-    # 5) (옵션) 저장
+    # 4) (옵션) 저장
     storage_info = {
         "raw_video_path": None,
         "csv_path": None,
@@ -517,45 +920,385 @@ async def process_eye_video(
         "raw_video_url": None,
         "csv_url": None,
         "overlay_url": None,
+        "trace_format": trace_format,
+        "trace_path": None,
+        "trace_url": None,
     }
     firestore_doc_id = None
+    upload_ms: Dict[str, float] = {}
+    upload_wait_ms = 0.0
 
     if save:
-        # 동영상 업로드
-        up_raw = upload_bytes_to_storage(raw_bytes, raw_video_path, content_type=file.content_type or "video/mp4")
-        storage_info["raw_video_path"] = up_raw["path"]
-        storage_info["raw_video_url"] = up_raw["url"]
-
-        # CSV 업로드
-        csv_path = f"{base_path}/trace_{now_ms}.csv"
-        csv_buf = io.StringIO()
-        df.to_csv(csv_buf, index=False)
-        up_csv = upload_bytes_to_storage(csv_buf.getvalue().encode("utf-8"), csv_path, content_type="text/csv")
-        storage_info["csv_path"] = up_csv["path"]
-        storage_info["csv_url"] = up_csv["url"]
-
-        # Firestore 문서
-        doc = {
-            "record_id": record_id,
-            "user_id": uid,
-            "created_at": fb_fs.SERVER_TIMESTAMP,
-            "kind": "video",
-            "video_meta": {"width": width, "height": height, "fps": fps},
-            "summary": summary,
-            "storage_path_raw_video": up_raw["path"],
-            "url_raw_video": up_raw["url"],
-            "storage_path_csv": up_csv["path"],
-            "url_csv": up_csv["url"],
-        }
-        ref = db.collection("users").document(uid).collection("eye_records").document(record_id)
-        ref.set(doc)
-        firestore_doc_id = record_id
-
-    return {
+        trace_upload = None
+        try:
+            # trace 업로드 (csv: 기존 CSV 그대로 / npz: float32 압축 컬럼 + 메타데이터)
+            # 인코딩은 업로드 스레드에서, 분석 중 시작한 원본 업로드와 동시에 기다린다.
+            trace_ext, trace_ctype = TRACE_FILE_TYPES[trace_format]
+            trace_meta = {
+                "record_id": record_id,
+                "fps": float(fps),
+                "width": width,
+                "height": height,
+                "params": summary["params"],
+            }
+            def encode_trace() -> bytes:
+                with timer.stage("encode_trace"):
+                    return trace.encode(trace_format, meta=trace_meta)
+
+            t_wait = time.perf_counter()
+            trace_upload = upload_in_background(encode_trace, f"{base_path}/trace_{now_ms}{trace_ext}", trace_ctype)
+            up_raw, up_trace = await asyncio.gather(raw_upload, trace_upload)
+            upload_wait_ms = (time.perf_counter() - t_wait) * 1000.0
+            timer.add("upload_wait", upload_wait_ms)
+            upload_ms = {"raw_video": up_raw["elapsed_ms"], "trace": up_trace["elapsed_ms"]}
+
+            storage_info["raw_video_path"] = up_raw["path"]
+            storage_info["raw_video_url"] = up_raw["url"]
+            storage_info["trace_path"] = up_trace["path"]
+            storage_info["trace_url"] = up_trace["url"]
+            if trace_format == "csv":
+                storage_info["csv_path"] = up_trace["path"]
+                storage_info["csv_url"] = up_trace["url"]
+
+            # Firestore 문서
+            doc = {
+                "record_id": record_id,
+                "user_id": uid,
+                "created_at": fb_fs.SERVER_TIMESTAMP,
+                "kind": "video",
+                "video_meta": {"width": width, "height": height, "fps": fps},
+                "summary": summary,
+                "storage_path_raw_video": up_raw["path"],
+                "url_raw_video": up_raw["url"],
+                "storage_path_csv": storage_info["csv_path"],
+                "url_csv": storage_info["csv_url"],
+                "trace_format": trace_format,
+                "storage_path_trace": up_trace["path"],
+                "url_trace": up_trace["url"],
+            }
+            ref = db.collection("users").document(uid).collection("eye_records").document(record_id)
+            with timer.stage("firestore"):
+                ref.set(doc)
+            firestore_doc_id = record_id
+        except Exception:
+            # 업로드나 Firestore 저장이 실패하면 이미 올라간 원본/trace 를 지운다(분석 실패 경로와 같이)
+            await discard_uploads(raw_upload, trace_upload)
+            raise
+
+    response = {
         "ok": True,
         "saved": save,
         "record_id": firestore_doc_id,
         "storage": storage_info,
         "summary": summary,
         "overlay_base64_png": overlay_png_b64 if return_overlay else None,
+        "cached": False,
+    }
+    if profile_stats is not None:
+        # EYE_PROFILE_DIR/<record_id>.prof 로 저장 (저장하지 않는 요청도 같은 id 로 찾을 수 있게)
+        response["profile"] = {"record_id": record_id, **await loop.run_in_executor(
+            None, profile_report, profile_stats, record_id,
+        )}
+    else:
+        _result_cache.put(video_key, response)
+    response["timings"] = {
+        "queue_wait_ms": queue_wait_ms,
+        "analysis_ms": analysis_ms,
+        "upload_ms": upload_ms,            # 업로드별 소요 (원본은 분석과 겹쳐 진행)
+        "upload_wait_ms": upload_wait_ms,  # 분석 후 업로드 완료까지 실제로 기다린 시간
+        "total_ms": (time.perf_counter() - t_req) * 1000.0,
+        "stages": timer.as_dict(),         # 단계별 누적 ms (Server-Timing 헤더와 같은 값)
     }
+    if timer.enabled:
+        http_response.headers["Server-Timing"] = timer.server_timing()
+    return response
+
+# ──────────────────────────────────────────────────────────────────────────────
+# 실시간 프레임 스트리밍 (WebSocket, 세션마다 전용 추적 모드 FaceMesh)
+# ──────────────────────────────────────────────────────────────────────────────
+# EYE_STREAM_MAX_SESSIONS: 동시 세션 수(세션마다 FaceMesh 하나) / EYE_STREAM_IDLE_SEC: 이 시간 동안 메시지가 없으면 종료
+STREAM_MAX_SESSIONS = max(1, int(os.environ.get("EYE_STREAM_MAX_SESSIONS", "8")))
+STREAM_IDLE_SEC = max(1.0, float(os.environ.get("EYE_STREAM_IDLE_SEC", "30")))
+STREAM_WINDOW = max(2, int(os.environ.get("EYE_STREAM_WINDOW", "90")))  # rolling 요약에 쓰는 최근 프레임 수
+STREAM_MAX_FRAME_BYTES = 16 << 20
+_RAW_CHANNELS = {"bgr": 3, "rgb": 3, "rgba": 4, "bgra": 4}
+
+# 세션의 프레임은 순서대로 하나씩 처리하므로 세션당 스레드 하나면 충분하다.
+_stream_executor = ThreadPoolExecutor(max_workers=STREAM_MAX_SESSIONS, thread_name_prefix="eye-stream")
+
+def _json_safe(obj: Any) -> Any:
+    """NaN/inf → None (브라우저 JSON.parse 는 NaN 을 받지 않는다)."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _json_safe(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_json_safe(v) for v in obj]
+    return obj
+
+class StreamSessionsFull(Exception):
+    pass
+
+class StreamSession:
+    """WebSocket 세션 하나의 추적 상태: 전용 FaceMesh(tracking) + 세션 누적 요약 + 최근 STREAM_WINDOW 프레임."""
+
+    def __init__(
+        self, uid: str, roi: bool = False, fps: Optional[float] = None,
+        blink_thresh: float = 0.18, blink_min_frames: int = 2, window: int = STREAM_WINDOW,
+    ):
+        self.id = str(uuid.uuid4())
+        self.uid = uid
+        self.roi = roi
+        self.fps = fps
+        self.blink_thresh = blink_thresh
+        self.blink_min_frames = blink_min_frames
+        self.fm: Optional[mp_face_mesh.FaceMesh] = None
+        self.tracker: Optional[FaceLandmarkTracker] = None
+        self.summary = StreamingSummary(blink_thresh=blink_thresh, blink_min_frames=blink_min_frames)
+        self.recent: "collections.deque[Tuple[float, float, float]]" = collections.deque(maxlen=window)
+        self.frames = 0
+        self.detected = 0
+        self.infer_ms_total = 0.0
+        self.started = time.monotonic()
+        self.last_active = self.started
+
+    def open(self) -> None:
+        """FaceMesh 생성 (스트리밍 스레드에서, 이벤트 루프 비차단)."""
+        self.fm = _new_face_mesh(False)
+        self.tracker = FaceLandmarkTracker(self.fm, roi=self.roi)
+
+    def close(self) -> None:
+        if self.tracker is not None:
+            self.tracker.close()  # roi 재검출용 FaceMesh
+        if self.fm is not None:
+            with contextlib.suppress(Exception):
+                self.fm.close()
+        self.fm = None
+        self.tracker = None
+
+    def reset(self) -> None:
+        """요약/최근 구간 초기화 + 추적 끊기 (다른 사람/장면으로 바뀐 경우)."""
+        self.summary = StreamingSummary(blink_thresh=self.blink_thresh, blink_min_frames=self.blink_min_frames)
+        self.recent.clear()
+        self.frames = 0
+        self.detected = 0
+        self.infer_ms_total = 0.0
+        self.started = time.monotonic()
+        if self.fm is not None:
+            self.fm.process(np.zeros((64, 64, 3), dtype=np.uint8))
+            self.tracker.reset()
+
+    def process(self, frame_bgr: np.ndarray) -> Tuple[Dict[str, Any], float]:
+        """프레임 하나 분석 → (analyze_frame 형식 결과, 세션 시각 초). 스트리밍 스레드에서 호출."""
+        t = self.frames / self.fps if self.fps else time.monotonic() - self.started
+        h, w = frame_bgr.shape[:2]
+        t0 = time.perf_counter()
+        lm = self.tracker.process(frame_bgr)
+        self.infer_ms_total += (time.perf_counter() - t0) * 1000.0
+        self.frames += 1
+        if lm is None:
+            result: Dict[str, Any] = {"detected": False, "reason": "no_face"}
+            v_offset = eye_open = float("nan")
+        else:
+            result = _frame_result(lm, w, h)
+            v_offset, eye_open = result["v_offset"], result["eye_open"]
+            self.detected += 1
+        self.summary.update(t, v_offset, eye_open)
+        self.recent.append((t, v_offset, eye_open))
+        return result, t
+
+    def rolling(self) -> Dict[str, Any]:
+        """최근 프레임 구간 요약 (매 프레임 보내도 싼 것만)."""
+        if not self.recent:
+            return {"frames": 0}
+        a = np.asarray(self.recent, dtype=np.float64)
+        v = a[:, 1][~np.isnan(a[:, 1])]
+        o = a[:, 2][~np.isnan(a[:, 2])]
+        return {
+            "frames": int(len(a)),
+            "span_sec": float(a[-1, 0] - a[0, 0]),
+            "detected_ratio": float(len(v) / len(a)),
+            "eye_open_mean": float(o.mean()) if len(o) else float("nan"),
+            "v_offset_mean": float(v.mean()) if len(v) else float("nan"),
+            "v_ptp": float(np.percentile(v, 95) - np.percentile(v, 5)) if len(v) else float("nan"),
+        }
+
+    def session_summary(self) -> Dict[str, Any]:
+        """세션 시작(또는 reset)부터의 누적 요약 (/process 의 요약 항목과 같은 정의)."""
+        s = self.summary.result()
+        dur = s["duration_sec"]
+        return {
+            "frames_processed": self.frames,
+            "frames_detected": self.detected,
+            "duration_sec": dur,
+            "vertical_offset_std": s["v_std"],
+            "vertical_peak_to_peak": s["v_ptp"],
+            "blink_count": int(s["blink_count"]),
+            "blink_rate_per_min": (s["blink_count"] / dur * 60.0) if dur and dur > 0 else float("nan"),
+            "summary_exact": s["exact"],
+            "avg_infer_ms": self.infer_ms_total / self.frames if self.frames else 0.0,
+        }
+
+class StreamSessionRegistry:
+    """열린 스트리밍 세션 목록. 세션 수를 제한해 FaceMesh 메모리를 묶어 둔다.
+
+    유휴 세션은 각 연결의 수신 대기 타임아웃(idle_sec)으로 끊기고, 연결이 끝나면 release 로 FaceMesh 를 닫는다.
+    """
+
+    def __init__(self, max_sessions: int, idle_sec: float):
+        self.max_sessions = max_sessions
+        self.idle_sec = idle_sec
+        self.sessions: Dict[str, StreamSession] = {}
+        self.opened_total = 0
+        self.rejected_total = 0
+        self.idle_evictions = 0
+
+    def add(self, session: StreamSession) -> None:
+        if len(self.sessions) >= self.max_sessions:
+            self.rejected_total += 1
+            raise StreamSessionsFull()
+        self.sessions[session.id] = session
+        self.opened_total += 1
+
+    def release(self, session: StreamSession) -> None:
+        self.sessions.pop(session.id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "active": len(self.sessions),
+            "max_sessions": self.max_sessions,
+            "idle_sec": self.idle_sec,
+            "opened_total": self.opened_total,
+            "rejected_total": self.rejected_total,
+            "idle_evictions": self.idle_evictions,
+            "oldest_idle_sec": max((now - s.last_active for s in self.sessions.values()), default=0.0),
+        }
+
+_stream_sessions = StreamSessionRegistry(STREAM_MAX_SESSIONS, STREAM_IDLE_SEC)
+
+def _decode_stream_frame(data: bytes, fmt: str, width: int, height: int) -> np.ndarray:
+    """바이너리 메시지 → BGR 프레임. fmt=jpeg 는 jpg/png/webp 인코딩, 그 외는 width×height 원시 픽셀."""
+    if fmt == "jpeg":
+        return _decode_image(data)
+    ch = _RAW_CHANNELS[fmt]
+    if len(data) != width * height * ch:
+        raise ValueError(f"raw frame must be {width}x{height}x{ch} bytes, got {len(data)}")
+    px = np.frombuffer(data, np.uint8).reshape(height, width, ch)
+    if fmt == "bgr":
+        return px
+    code = {"rgb": cv2.COLOR_RGB2BGR, "rgba": cv2.COLOR_RGBA2BGR, "bgra": cv2.COLOR_BGRA2BGR}[fmt]
+    return cv2.cvtColor(px, code)
+
+def _process_stream_frame(
+    session: StreamSession, data: bytes, fmt: str, width: int, height: int,
+) -> Tuple[Dict[str, Any], float]:
+    """디코딩 + 분석 (스트리밍 스레드에서). 디코딩/변환도 프레임마다라 이벤트 루프에서 돌리지 않는다.
+
+    잘못된 프레임은 ValueError (세션 상태는 그대로).
+    """
+    return session.process(_decode_stream_frame(data, fmt, width, height))
+
+@router.get("/stream/sessions", summary="실시간 스트리밍 세션 현황")
+async def stream_sessions_status():
+    return {"ok": True, "sessions": _stream_sessions.stats()}
+
+@router.websocket("/stream")
+async def stream_eye_frames(
+    websocket: WebSocket,
+    format: str = Query("jpeg", pattern=r"^(jpeg|bgr|rgb|rgba|bgra)$", description="프레임 형식: jpeg(jpg/png/webp) | 원시 픽셀"),
+    width: int = Query(0, ge=0, le=4096, description="원시 픽셀 프레임 너비"),
+    height: int = Query(0, ge=0, le=4096, description="원시 픽셀 프레임 높이"),
+    fps: Optional[float] = Query(None, gt=0, description="프레임 시각 계산용 fps(미지정 시 서버 수신 시각)"),
+    roi: bool = Query(False, description="얼굴 주변만 잘라 축소 입력으로 추적"),
+    blink_thresh: float = Query(0.18, gt=0),
+    blink_min_frames: int = Query(2, ge=1),
+    summary_every: int = Query(30, ge=0, description="누적 요약을 함께 보낼 프레임 간격(0=요청 시에만)"),
+    user=Depends(get_current_user),
+):
+    """바이너리 메시지 = 프레임 하나 → {"type":"frame", result, rolling[, summary]} 응답.
+
+    텍스트 메시지(JSON): {"type":"summary"} 누적 요약 요청 / {"type":"reset"} 요약·추적 초기화 / {"type":"close"}.
+    """
+    await websocket.accept()
+    uid = user.get("uid") if isinstance(user, dict) else getattr(user, "uid", None)
+    if not uid:
+        await websocket.close(code=1008, reason="Invalid user")
+        return
+    if format != "jpeg" and not (width and height):
+        await websocket.close(code=1003, reason="width/height required for raw frames")
+        return
+
+    session = StreamSession(uid, roi=roi, fps=fps, blink_thresh=blink_thresh, blink_min_frames=blink_min_frames)
+    try:
+        _stream_sessions.add(session)
+    except StreamSessionsFull:
+        await websocket.close(code=1013, reason="too many stream sessions")  # Try Again Later
+        return
+
+    loop = asyncio.get_running_loop()
+
+    async def send(payload: Dict[str, Any]) -> None:
+        await websocket.send_text(json.dumps(_json_safe(payload)))
+
+    try:
+        await loop.run_in_executor(_stream_executor, session.open)
+        await send({"type": "ready", "session_id": session.id, "idle_sec": STREAM_IDLE_SEC})
+        while True:
+            try:
+                msg = await asyncio.wait_for(websocket.receive(), timeout=STREAM_IDLE_SEC)
+            except asyncio.TimeoutError:
+                _stream_sessions.idle_evictions += 1
+                await websocket.close(code=1001, reason="idle timeout")
+                break
+            if msg["type"] == "websocket.disconnect":
+                break
+            session.last_active = time.monotonic()
+
+            data = msg.get("bytes")
+            if data is None:
+                try:
+                    cmd = json.loads(msg.get("text") or "{}").get("type")
+                except (ValueError, AttributeError):
+                    cmd = None
+                if cmd == "summary":
+                    await send({"type": "summary", "summary": session.session_summary()})
+                elif cmd == "reset":
+                    await loop.run_in_executor(_stream_executor, session.reset)
+                    await send({"type": "reset"})
+                elif cmd == "close":
+                    await send({"type": "summary", "summary": session.session_summary()})
+                    await websocket.close(code=1000)
+                    break
+                else:
+                    await send({"type": "error", "detail": "unknown message"})
+                continue
+
+            if len(data) > STREAM_MAX_FRAME_BYTES:
+                await send({"type": "error", "detail": "frame too large"})
+                continue
+            t0 = time.perf_counter()
+            try:
+                result, t = await loop.run_in_executor(
+                    _stream_executor, _process_stream_frame, session, data, format, width, height,
+                )
+            except ValueError as e:
+                await send({"type": "error", "seq": session.frames, "detail": str(e)})
+                continue
+            out = {
+                "type": "frame",
+                "seq": session.frames - 1,
+                "t": t,
+                "result": result,
+                "rolling": session.rolling(),
+                "elapsed_ms": (time.perf_counter() - t0) * 1000.0,
+            }
+            if summary_every and session.frames % summary_every == 0:
+                out["summary"] = session.session_summary()
+            await send(out)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        _stream_sessions.release(session)
+        # FaceMesh 해제는 스트리밍 스레드에서 (graph 종료가 잠깐 막힐 수 있다)
+        await loop.run_in_executor(_stream_executor, session.close)
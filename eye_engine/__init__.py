@@ -0,0 +1,73 @@
+"""eye.py / lambda_eye_tracking.py / python_server 가 함께 쓰는 시선 분석 엔진."""
+from .adaptive import AdaptiveConfig, AdaptiveSampler
+from .cache import ANALYSIS_VERSION, ResultCache, cache_key, content_hash, file_content_hash
+from .decoder import DECODER_BACKEND, PyAVCapture, decoder_info, frames_are_rgb, open_video
+from .framebuf import FrameBuffers
+from .metrics import EyeMetricsEngine, mean_lr, trace_columns
+from .pipeline import PIPELINE_DEPTH, FramePipeline
+from .pool import FaceMeshPool
+from .profiling import PROFILE_ENABLED, profile_call, profile_report
+from .roi import FaceLandmarkTracker, MappedLandmarks
+from .sampling import SAMPLING_MODES, iter_sampled_frames, resolve_stride, skip_to
+from .segments import (
+    Segment, analyze_segment, merge_segments, new_video_face_mesh, plan_segments, run_segments_in_processes,
+)
+from .spool import SPOOL_CHUNK, SPOOL_MAX_BYTES, VideoSpool
+from .summary import BlinkCounter, QuantileSketch, RunningStats, StreamingSummary
+from .telemetry import PROMETHEUS_CONTENT_TYPE, MetricsRegistry, NullTimer, StageTimer, new_timer
+from .trace import TraceBuffer
+from .trace_format import TRACE_FILE_TYPES, TRACE_FORMATS, TraceReader, encode_trace
+
+__all__ = [
+    "ANALYSIS_VERSION",
+    "AdaptiveConfig",
+    "AdaptiveSampler",
+    "BlinkCounter",
+    "DECODER_BACKEND",
+    "EyeMetricsEngine",
+    "FaceLandmarkTracker",
+    "FaceMeshPool",
+    "FrameBuffers",
+    "FramePipeline",
+    "MappedLandmarks",
+    "MetricsRegistry",
+    "NullTimer",
+    "PIPELINE_DEPTH",
+    "PROFILE_ENABLED",
+    "PROMETHEUS_CONTENT_TYPE",
+    "PyAVCapture",
+    "QuantileSketch",
+    "ResultCache",
+    "RunningStats",
+    "SAMPLING_MODES",
+    "SPOOL_CHUNK",
+    "SPOOL_MAX_BYTES",
+    "Segment",
+    "StageTimer",
+    "StreamingSummary",
+    "TRACE_FILE_TYPES",
+    "TRACE_FORMATS",
+    "TraceBuffer",
+    "TraceReader",
+    "VideoSpool",
+    "analyze_segment",
+    "cache_key",
+    "content_hash",
+    "decoder_info",
+    "encode_trace",
+    "file_content_hash",
+    "frames_are_rgb",
+    "iter_sampled_frames",
+    "mean_lr",
+    "merge_segments",
+    "new_timer",
+    "new_video_face_mesh",
+    "open_video",
+    "plan_segments",
+    "profile_call",
+    "profile_report",
+    "resolve_stride",
+    "run_segments_in_processes",
+    "skip_to",
+    "trace_columns",
+]
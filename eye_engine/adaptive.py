@@ -0,0 +1,221 @@
+"""적응형 샘플링: 눈이 움직이는 동안은 촘촘히, 고정(fixation) 중에는 성기게 분석하고 요약이 수렴하면 멈춘다.
+
+- 분석 프레임마다 좌/우 평균 v_offset, eye_open 의 초당 변화량을 본다.
+  어느 쪽이든 motion_thresh 를 넘거나 눈꺼풀이 닫히는 중(eye_open < 1.5·blink_thresh)이면 요청한 간격
+  (step/target_fps)으로 되돌리고, 아니면 간격을 두 배씩 늘린다(최대 max_gap_sec — 블링크를 통째로 건너뛰지 않게).
+  얼굴을 놓친 프레임도 요청 간격으로 되돌린다.
+- early_stop=True 면 trace 가 지표를 계산한 묶음마다(TraceBuffer.chunk) 신뢰구간을 보고 멈춘다:
+    vertical_peak_to_peak: 블록 부트스트랩(블록 1초, 시간 상관을 보존) 95% 구간 반폭 ≤ vpp_tol,
+                           그리고 vpp_thresh 가 구간 밖(PSP 판정이 뒤집힐 여지 없음)
+    blink_rate_per_min:    포아송 정규근사 95% 구간 반폭 ≤ blink_tol
+  min_sec 초 이상 분석한 뒤에만 판단한다. 부트스트랩 난수 시드는 고정이라 같은 입력이면 같은 결과(캐시 안전).
+- 요약은 분석 프레임을 직전 분석 프레임과의 간격만큼 가중한다(TraceBuffer.hold_stride — 건너뛴 고정 구간을
+  그 값으로 채운 것처럼). 가중하지 않으면 촘촘히 본 움직임 구간이 p5/p95 를 부풀린다.
+- report() 는 건너뛴 프레임 수를 이유별로 돌려준다: step(요청 간격) / fixation(고정 구간) / early_stop(수렴 후).
+
+동영상 모드 FaceMesh 는 직전 프레임에 의존하므로 간격을 넓히면 추적이 재검출로 바뀔 수 있다.
+max_gap_sec 기본값(0.1초)은 30fps 에서 최대 3프레임 간격이다.
+"""
+from __future__ import annotations
+
+import math
+import os
+from typing import Any, Dict, Iterator, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .framebuf import FrameBuffers
+from .metrics import mean_lr
+from .sampling import resolve_stride, skip_to
+from .trace import TraceBuffer
+
+# 배포 단위 조정값 (요청 파라미터는 early_stop / 허용오차만)
+DEFAULT_MOTION_THRESH = float(os.environ.get("EYE_ADAPTIVE_MOTION", "1.0"))   # v_offset·eye_open 초당 변화
+DEFAULT_MAX_GAP_SEC = float(os.environ.get("EYE_ADAPTIVE_MAX_GAP_SEC", "0.1"))
+DEFAULT_MIN_SEC = float(os.environ.get("EYE_ADAPTIVE_MIN_SEC", "10"))
+BOOTSTRAP_SAMPLES = 64
+_Z95 = 1.959964
+
+
+class AdaptiveConfig(NamedTuple):
+    early_stop: bool = False
+    vpp_tol: float = 0.01          # vertical_peak_to_peak 95% 구간 반폭 허용치
+    blink_tol: float = 3.0         # blink_rate_per_min 95% 구간 반폭 허용치
+    min_sec: float = DEFAULT_MIN_SEC
+    motion_thresh: float = DEFAULT_MOTION_THRESH
+    max_gap_sec: float = DEFAULT_MAX_GAP_SEC
+
+
+def bootstrap_ptp_ci(
+    values: np.ndarray, block: int, samples: int = BOOTSTRAP_SAMPLES, seed: int = 0,
+) -> Tuple[float, float]:
+    """p5~p95 피크투피크의 95% 구간 (이동 블록 부트스트랩). 값이 블록 두 개보다 적으면 (nan, nan)."""
+    n = len(values)
+    block = max(1, int(block))
+    if n < 2 * block:
+        return float("nan"), float("nan")
+    rng = np.random.default_rng(seed)
+    k = n // block
+    starts = rng.integers(0, n - block + 1, size=(samples, k))
+    idx = (starts[:, :, None] + np.arange(block)).reshape(samples, -1)
+    lo, hi = np.percentile(values[idx], [5.0, 95.0], axis=1)
+    ptp = hi - lo
+    return float(np.percentile(ptp, 2.5)), float(np.percentile(ptp, 97.5))
+
+
+def blink_rate_ci(count: int, duration_sec: float) -> Tuple[float, float]:
+    """분당 블링크 수의 95% 구간 (포아송 정규근사, count=0 도 폭이 0 이 되지 않게 1 로 본다)."""
+    if not duration_sec or duration_sec <= 0:
+        return float("nan"), float("nan")
+    rate = count / duration_sec * 60.0
+    half = _Z95 * math.sqrt(max(count, 1)) / duration_sec * 60.0
+    return max(0.0, rate - half), rate + half
+
+
+class AdaptiveSampler:
+    """프레임 루프가 frames() 로 읽고, 분석한 프레임마다 observe() 로 다음 간격/중단을 정한다.
+
+    trace 의 hold_stride 를 설정하므로 trace 하나에 샘플러 하나.
+    """
+
+    def __init__(
+        self,
+        config: AdaptiveConfig,
+        trace: TraceBuffer,
+        step: int = 1,
+        target_fps: Optional[float] = None,
+        blink_thresh: float = 0.18,
+        vpp_thresh: Optional[float] = None,
+    ):
+        self.config = config
+        self.trace = trace
+        self.fps = trace.fps if trace.fps and trace.fps > 0 else 30.0
+        self.min_stride = resolve_stride(self.fps, step, target_fps)
+        trace.hold_stride = self.min_stride
+        self.max_stride = max(self.min_stride, config.max_gap_sec * self.fps)
+        self.blink_thresh = blink_thresh
+        self.vpp_thresh = vpp_thresh
+        self.stride = self.min_stride
+        self._pos = 0.0                   # 다음 분석 프레임 (실수 — target_fps 간격 누적)
+        self._prev: Optional[Tuple[int, float, float]] = None  # (frame_idx, v, eye_open)
+        self._last_idx: Optional[int] = None
+        self._checked_at = 0              # 마지막으로 수렴을 본 trace.n_done
+        self.analyzed = 0
+        self.dense_frames = 0      # 요청 간격을 유지한 프레임 (움직임·눈꺼풀 닫힘·얼굴 미검출)
+        self.skipped = {"step": 0, "fixation": 0}
+        self.stopped_at: Optional[float] = None
+        self.ci: Dict[str, Any] = {}
+
+    def frames(
+        self, cap: "cv2.VideoCapture", max_frames: Optional[int] = None, mode: str = "grab",
+        buffers: Optional[FrameBuffers] = None,
+    ) -> Iterator[Tuple[int, np.ndarray]]:
+        """(frame_idx, BGR frame). 다음 프레임 위치는 직전 observe() 가 정한 간격을 따른다.
+
+        buffers 를 주면 매번 같은 배열에 디코딩한다(iter_sampled_frames 와 같음).
+        """
+        cur = 0
+        kept = 0
+        while max_frames is None or kept < max_frames:
+            target = max(cur, int(round(self._pos)))
+            if not skip_to(cap, cur, target, mode):
+                return
+            ok, frame = buffers.read(cap) if buffers is not None else cap.read()
+            if not ok:
+                return
+            cur = target + 1
+            kept += 1
+            yield target, frame
+
+    def observe(self, frame_idx: int, row: np.ndarray) -> bool:
+        """분석한 프레임의 랜드마크 행(TraceBuffer.append 반환값) 반영. True 면 수렴 → 루프 중단."""
+        self.analyzed += 1
+        if self._last_idx is not None:
+            gap = frame_idx - self._last_idx - 1
+            base = max(0, int(round(self.min_stride)) - 1)
+            self.skipped["step"] += min(gap, base)
+            self.skipped["fixation"] += max(0, gap - base)
+        self._last_idx = frame_idx
+
+        trace = self.trace
+        m = trace.engine.compute(row, trace.width, trace.height)
+        v = float(mean_lr(m["v_offset"]))
+        eo = float(mean_lr(m["eye_open"]))
+        moving = True
+        if v == v and eo == eo and self._prev is not None:
+            p_idx, p_v, p_eo = self._prev
+            dt = max(1, frame_idx - p_idx) / self.fps
+            speed = max(abs(v - p_v), abs(eo - p_eo)) / dt
+            moving = speed > self.config.motion_thresh or eo < 1.5 * self.blink_thresh
+        self._prev = (frame_idx, v, eo) if v == v else None
+
+        if moving:
+            self.dense_frames += 1
+            self.stride = self.min_stride
+        else:
+            self.stride = min(self.max_stride, self.stride * 2.0)
+        self._pos = max(self._pos + self.min_stride, frame_idx + self.stride)
+
+        if self.config.early_stop and trace.n_done > self._checked_at:
+            self._checked_at = trace.n_done
+            return self._converged()
+        return False
+
+    def _converged(self) -> bool:
+        trace = self.trace
+        if trace.summary is None:
+            return False
+        res = trace.summary.result()
+        dur = res["duration_sec"]
+        if not dur or dur != dur or dur < self.config.min_sec:
+            return False
+        # 요약과 같은 가중(건너뛴 구간을 직전 값으로 채움)으로 부트스트랩 → 블록은 약 1초 분량
+        v = np.repeat(trace.computed("v_offset"), trace.hold_weights(0, trace.n_done))
+        v = v[~np.isnan(v)]
+        block = int(round(len(v) / dur))
+        v_lo, v_hi = bootstrap_ptp_ci(v, block)
+        b_lo, b_hi = blink_rate_ci(res["blink_count"], dur)
+        self.ci = {
+            "vertical_peak_to_peak": [v_lo, v_hi],
+            "blink_rate_per_min": [b_lo, b_hi],
+            "at_sec": dur,
+        }
+        if v_lo != v_lo or (v_hi - v_lo) / 2.0 > self.config.vpp_tol:
+            return False
+        if self.vpp_thresh is not None and v_lo <= self.vpp_thresh <= v_hi:
+            return False
+        if (b_hi - b_lo) / 2.0 > self.config.blink_tol:
+            return False
+        self.stopped_at = dur
+        return True
+
+    def report(self, frame_count: int = 0) -> Dict[str, Any]:
+        """응답용: 분석/건너뛴 프레임 수와 이유, 중단 여부와 그때의 신뢰구간."""
+        skipped = dict(self.skipped)
+        if self.stopped_at is not None:
+            # 메타데이터 프레임 수를 모르면 None
+            rest = frame_count - self._last_idx - 1 if frame_count and self._last_idx is not None else None
+            skipped["early_stop"] = max(0, rest) if rest is not None else None
+        else:
+            skipped["early_stop"] = 0
+        return {
+            "mode": "adaptive",
+            "frames_analyzed": self.analyzed,
+            "dense_frames": self.dense_frames,
+            "frames_skipped": skipped,
+            "stopped_early": self.stopped_at is not None,
+            "stop_reason": (
+                f"converged at {self.stopped_at:.1f}s: vertical_peak_to_peak ±{self.config.vpp_tol}, "
+                f"blink_rate_per_min ±{self.config.blink_tol} (95% CI)"
+            ) if self.stopped_at is not None else None,
+            "ci": self.ci or None,
+            "params": {
+                "early_stop": self.config.early_stop,
+                "vpp_tol": self.config.vpp_tol,
+                "blink_tol": self.config.blink_tol,
+                "min_sec": self.config.min_sec,
+                "motion_thresh": self.config.motion_thresh,
+                "max_gap_sec": self.config.max_gap_sec,
+            },
+        }
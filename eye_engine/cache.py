@@ -0,0 +1,156 @@
+"""분석 결과 캐시: 같은 내용의 입력을 같은 파라미터로 다시 분석하지 않는다.
+
+- 키 = sha256(입력 바이트) + 분석 파라미터 + ANALYSIS_VERSION. 파라미터는 정렬한 JSON 으로 고정한다.
+- 메모리 계층: 항목 수 제한 LRU (OrderedDict).
+- 디스크 계층(선택): disk_dir/<키 앞 2자>/<키>.json. 원자적으로 교체 기록하므로 여러 프로세스가 같은
+  디렉터리를 써도 깨진 파일을 읽지 않는다. 디스크에서 찾은 값은 메모리 계층에도 올린다.
+- 값은 JSON 으로 직렬화되는 dict 만 담는다(NaN 허용). pickle 은 쓰지 않는다.
+
+지표/요약 계산이 바뀌면 ANALYSIS_VERSION 을 올려 이전 결과가 쓰이지 않게 한다.
+"""
+from __future__ import annotations
+
+import contextlib
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# 분석 코드 버전 (지표 정의/요약 방식/FaceMesh 설정이 바뀌면 올린다)
+ANALYSIS_VERSION = "eye-engine-2"
+DEFAULT_MAX_ENTRIES = 256
+
+
+def content_hash(data: bytes) -> str:
+    """입력 바이트의 sha256 hex."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_content_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """파일 내용의 sha256 hex (통째로 읽지 않고 chunk_size 씩)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cache_key(kind: str, digest: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """kind(image/video 등) + 내용 해시 + 파라미터 + 분석 버전 → 캐시 키(sha256 hex)."""
+    blob = json.dumps(
+        {"v": ANALYSIS_VERSION, "kind": kind, "sha256": digest, "params": params or {}},
+        sort_keys=True, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """LRU 메모리 계층 + 선택적 디스크 계층. 스레드 안전."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, disk_dir: Optional[str] = None):
+        self.max_entries = max(0, int(max_entries))
+        self.disk_dir = os.path.abspath(disk_dir) if disk_dir else None
+        self._mem: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.disk_errors = 0
+
+    @classmethod
+    def from_env(cls, prefix: str = "EYE_CACHE") -> "ResultCache":
+        """<prefix>_MAX_ENTRIES (기본 256, 0 이면 메모리 계층 끔), <prefix>_DIR (디스크 계층 경로) 로 생성."""
+        max_entries = int(os.environ.get(f"{prefix}_MAX_ENTRIES", str(DEFAULT_MAX_ENTRIES)) or 0)
+        return cls(max_entries=max_entries, disk_dir=os.environ.get(f"{prefix}_DIR") or None)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _remember(self, key: str, value: Dict[str, Any]) -> None:
+        if self.max_entries == 0:
+            return
+        self._mem[key] = value
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """저장된 값의 사본 또는 None. 호출 측이 고쳐도 캐시 내용은 바뀌지 않는다."""
+        with self._lock:
+            value = self._mem.get(key)
+            if value is not None:
+                self._mem.move_to_end(key)
+                self.memory_hits += 1
+                return copy.deepcopy(value)
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), "r", encoding="utf-8") as f:
+                    value = json.load(f)
+            except FileNotFoundError:
+                value = None
+            except (OSError, ValueError):
+                value = None
+                with self._lock:
+                    self.disk_errors += 1
+            if value is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, value)
+                return copy.deepcopy(value)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """값 저장 (사본). 디스크 기록 실패는 조용히 넘어간다(캐시는 최선 노력)."""
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._remember(key, value)
+            self.stores += 1
+        if self.disk_dir:
+            try:
+                path = self._disk_path(key)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        json.dump(value, f)
+                    os.replace(tmp, path)
+                except BaseException:
+                    with contextlib.suppress(OSError):
+                        os.remove(tmp)
+                    raise
+            except (OSError, TypeError, ValueError):
+                with self._lock:
+                    self.disk_errors += 1
+
+    def clear(self) -> None:
+        """메모리 계층만 비운다(디스크 파일은 그대로)."""
+        with self._lock:
+            self._mem.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "version": ANALYSIS_VERSION,
+                "entries": len(self._mem),
+                "max_entries": self.max_entries,
+                "disk_dir": self.disk_dir,
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (hits / lookups) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "disk_errors": self.disk_errors,
+            }
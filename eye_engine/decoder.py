@@ -0,0 +1,251 @@
+"""동영상 디코더 백엔드: OpenCV(cv2.VideoCapture) 또는 PyAV(FFmpeg 라이브러리, 멀티스레드 디코딩).
+
+배포 단위 설정으로 고른다 (요청 파라미터 아님):
+    EYE_DECODER=opencv|pyav      기본 opencv. pyav 인데 av 패키지가 없으면 opencv 로 대신 연다(경고 한 번).
+    EYE_DECODER_THREADS=N        디코더 스레드 수. 0(기본)이면 라이브러리 기본값(코어 수 기준).
+                                 워커 프로세스가 여럿이면 코어 수 / 워커 수 정도로 잡는다.
+
+두 백엔드 모두 분석 루프가 쓰는 cv2.VideoCapture 메서드(isOpened/get/set/grab/retrieve/read/release)를
+그대로 제공하므로 iter_sampled_frames / AdaptiveSampler / TraceBuffer.for_capture 는 바뀌지 않는다.
+
+PyAV 백엔드:
+- 코덱 컨텍스트에 프레임+슬라이스 스레드(thread_type=AUTO)와 스레드 수를 지정한다.
+- CAP_PROP_POS_FRAMES seek 은 목표 시각 직전 키프레임으로 옮긴 뒤(backward) 목표 프레임까지 디코딩만 하고
+  색변환 없이 버린다 — 목표 프레임부터 정확히 내준다. 가까운 앞쪽(1초 이내) 목표는 seek 없이 디코딩해 넘긴다.
+- 프레임은 YUV → RGB 로 바로 변환해 내준다(output_rgb=True). BGR 을 거쳐 다시 RGB 로 바꾸던 cvtColor 가
+  없어지고, FrameBuffers(rgb=True) 의 to_rgb() 는 변환 없이 그대로 돌려준다.
+- 회전 메타데이터(휴대폰 세로 영상)는 OpenCV 와 같이 반영해 똑바로 세운 프레임을 내준다.
+"""
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+DECODER_BACKENDS = ("opencv", "pyav")
+DECODER_BACKEND = os.environ.get("EYE_DECODER", "opencv").strip().lower() or "opencv"
+DECODER_THREADS = max(0, int(os.environ.get("EYE_DECODER_THREADS", "0")))
+
+# seek 대신 디코딩으로 넘기는 최대 간격(초) — 보통 키프레임 간격(1~2초)보다 짧으면 seek 이 손해
+SEEK_DECODE_AHEAD_SEC = 1.0
+
+_log = logging.getLogger(__name__)
+_fallback_warned = False
+
+_ROTATE = {90: cv2.ROTATE_90_CLOCKWISE, 180: cv2.ROTATE_180, 270: cv2.ROTATE_90_COUNTERCLOCKWISE}
+
+
+class PyAVCapture:
+    """PyAV 디코더를 cv2.VideoCapture 처럼 쓰는 래퍼. read() 는 RGB 프레임을 돌려준다.
+
+    열지 못하면 예외 대신 isOpened() 가 False (cv2.VideoCapture 와 같음).
+    """
+
+    backend = "pyav"
+    output_rgb = True
+
+    def __init__(self, path: str, threads: int = 0):
+        import av
+
+        self._errors: Tuple[type, ...] = (av.error.FFmpegError,)
+        self.threads = int(threads)
+        self.pos = 0          # 다음 grab() 이 가져올 프레임 인덱스
+        self.seeks = 0
+        self._container = None
+        self._frame = None    # grab() 한 프레임 (retrieve 대상)
+        self._pending = None  # seek 뒤 목표 위치까지 디코딩해 둔 프레임
+        try:
+            self._container = av.open(path)
+            stream = self._container.streams.video[0]
+        except (av.error.FFmpegError, IndexError):
+            self.release()
+            return
+        ctx = stream.codec_context
+        ctx.thread_type = "AUTO"
+        ctx.thread_count = self.threads
+        self._stream = stream
+        self._tb = float(stream.time_base) if stream.time_base else 0.0
+        self._start = stream.start_time or 0
+        self.fps = float(stream.average_rate or stream.guessed_rate or 0)
+        self.frame_count = int(stream.frames or 0)
+        if not self.frame_count and self.fps > 0:
+            # 프레임 수가 헤더에 없으면 길이로 추정 (OpenCV 도 같은 방식)
+            if stream.duration and self._tb:
+                self.frame_count = int(round(stream.duration * self._tb * self.fps))
+            elif self._container.duration:
+                self.frame_count = int(round(self._container.duration / 1e6 * self.fps))
+        self.width, self.height = ctx.width, ctx.height
+        self._frames = self._container.decode(stream)
+        self._rotate: Optional[int] = None
+        first = self._next()
+        if first is not None:
+            self._pending = first
+            rotation = int(getattr(first, "rotation", 0) or 0) % 360
+            self._rotate = _ROTATE.get(rotation)
+            if rotation in (90, 270):
+                self.width, self.height = self.height, self.width
+
+    # ── cv2.VideoCapture 호환 ─────────────────────────────────────────────
+    def isOpened(self) -> bool:
+        return self._container is not None
+
+    def get(self, prop: int) -> float:
+        if self._container is None:
+            return 0.0
+        if prop == cv2.CAP_PROP_FPS:
+            return self.fps
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.frame_count)
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.pos)
+        return 0.0
+
+    def set(self, prop: int, value: float) -> bool:
+        if self._container is None or prop != cv2.CAP_PROP_POS_FRAMES:
+            return False
+        return self._seek(int(value))
+
+    def grab(self) -> bool:
+        """다음 프레임 디코딩만 (RGB 변환 없음)."""
+        if self._container is None:
+            return False
+        self._frame = self._next()
+        if self._frame is None:
+            return False
+        self.pos += 1
+        return True
+
+    def retrieve(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        """grab() 한 프레임을 RGB (h, w, 3) 로. image 가 같은 크기면 거기에 쓴다."""
+        if self._frame is None:
+            return False, None
+        rgb = self._frame.reformat(format="rgb24")
+        plane = rgb.planes[0]
+        # 줄 끝 여백(line_size)이 있을 수 있어 stride 를 지정한 뷰 (복사 없음)
+        view = np.ndarray((rgb.height, rgb.width, 3), np.uint8, buffer=plane, strides=(plane.line_size, 3, 1))
+        if self._rotate is not None:
+            view = cv2.rotate(view, self._rotate)
+        if image is not None and image.shape == view.shape and image.dtype == np.uint8:
+            np.copyto(image, view)
+            return True, image
+        return True, np.ascontiguousarray(view)
+
+    def read(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def release(self) -> None:
+        if self._container is not None:
+            self._container.close()
+            self._container = None
+        self._frame = self._pending = None
+
+    # ── 내부 ──────────────────────────────────────────────────────────────
+    def _next(self):
+        if self._pending is not None:
+            frame, self._pending = self._pending, None
+            return frame
+        try:
+            return next(self._frames)
+        except StopIteration:
+            return None
+        except self._errors:
+            # 손상된 뒷부분: cv2.VideoCapture 처럼 거기서 끝난 것으로 본다
+            return None
+
+    def _index(self, frame) -> int:
+        if frame.pts is None or not self.fps:
+            return self.pos
+        return int(round((frame.pts - self._start) * self._tb * self.fps))
+
+    def _seek(self, target: int) -> bool:
+        target = max(0, target)
+        if target == self.pos:
+            return True
+        if self.pos < target <= self.pos + SEEK_DECODE_AHEAD_SEC * max(self.fps, 1.0):
+            # 가까운 앞쪽: 키프레임으로 돌아가 다시 디코딩하는 것보다 그냥 넘기는 편이 싸다
+            while self.pos < target:
+                if not self.grab():
+                    return False
+            return True
+        if not self.fps or not self._tb:
+            return False
+
+        back_sec = 0.0
+        for _ in range(3):
+            # 목표 시각 직전 키프레임으로 (일부 컨테이너는 목표를 넘겨 잡으므로 더 앞에서 다시 시도)
+            sec = max(0.0, target / self.fps - back_sec)
+            try:
+                self._container.seek(self._start + int(sec / self._tb), stream=self._stream, backward=True)
+            except self._errors:
+                return False
+            self._frames = self._container.decode(self._stream)
+            self._frame = self._pending = None
+            frame = self._next()
+            if frame is None:
+                return False
+            idx = self._index(frame)
+            if idx <= target or sec == 0.0:
+                break
+            back_sec = back_sec * 2.0 + 1.0
+        self.seeks += 1
+        # 키프레임 → 목표까지 디코딩만 (RGB 변환 없음)
+        while idx < target:
+            frame = self._next()
+            if frame is None:
+                return False
+            idx = self._index(frame)
+        self._pending = frame
+        self.pos = idx
+        return True
+
+
+def _open_opencv(path: str, threads: int) -> "cv2.VideoCapture":
+    n_threads = getattr(cv2, "CAP_PROP_N_THREADS", None)
+    if threads > 0 and n_threads is not None:
+        cap = cv2.VideoCapture(path, cv2.CAP_FFMPEG, [n_threads, threads])
+        if cap.isOpened():
+            return cap
+    return cv2.VideoCapture(path)
+
+
+def open_video(path: str, backend: Optional[str] = None, threads: Optional[int] = None):
+    """설정한 백엔드로 동영상 열기 → cv2.VideoCapture 호환 객체 (isOpened() 로 성공 여부 확인).
+
+    backend/threads 를 주지 않으면 EYE_DECODER / EYE_DECODER_THREADS.
+    """
+    global _fallback_warned
+    backend = (backend or DECODER_BACKEND).lower()
+    threads = DECODER_THREADS if threads is None else max(0, int(threads))
+    if backend not in DECODER_BACKENDS:
+        raise ValueError(f"unknown decoder backend: {backend}")
+    if backend == "pyav":
+        try:
+            return PyAVCapture(path, threads)
+        except ImportError:
+            if not _fallback_warned:
+                _log.warning("EYE_DECODER=pyav 이지만 av 패키지가 없어 opencv 로 디코딩합니다")
+                _fallback_warned = True
+    return _open_opencv(path, threads)
+
+
+def frames_are_rgb(cap) -> bool:
+    """cap.read() 가 RGB 를 내주는지 (PyAV). cv2.VideoCapture 는 BGR."""
+    return bool(getattr(cap, "output_rgb", False))
+
+
+def decoder_info(cap) -> Dict[str, Any]:
+    """응답/로그용: 실제로 연 백엔드와 스레드 수."""
+    if isinstance(cap, PyAVCapture):
+        return {"backend": "pyav", "threads": cap.threads, "rgb": True}
+    n_threads = getattr(cv2, "CAP_PROP_N_THREADS", None)
+    threads = int(cap.get(n_threads)) if n_threads is not None else 0
+    return {"backend": "opencv", "threads": threads, "rgb": False}
@@ -0,0 +1,69 @@
+"""프레임 버퍼 재사용: 디코딩(BGR)과 색변환(RGB)이 매 프레임 새 배열을 만들지 않게 목적지 배열을 돌려 쓴다.
+
+- read(cap): cap.read(buf) 로 같은 BGR 배열에 디코딩한다(크기가 바뀌면 그때만 새로 잡는다).
+- to_rgb(bgr): cv2.cvtColor(..., dst=) 로 크기별 RGB 배열에 변환한다
+  (전체 프레임 / ROI 캔버스 / 재검출 축소본처럼 크기가 몇 가지뿐이라 크기마다 하나씩 둔다).
+- 빌려 준 프레임은 다음 read() 까지만 유효하다. 루프 밖으로 가져갈 프레임(대표 오버레이 등)은
+  retain() 으로 복사해 둔다(copy-on-retain). FaceMesh.process 는 입력을 패킷으로 복사하고
+  결과가 나올 때까지 기다리므로, 호출이 끝난 뒤 RGB 버퍼를 덮어써도 된다.
+- slots>1 이면 디코딩 배열을 slots 개 돌려 쓴다(eye_engine.pipeline 이 앞서 디코딩해 큐에 쌓는 동안
+  추론 중인 프레임을 덮어쓰지 않게). read() 가 준 프레임은 slots 번 뒤의 read() 까지 유효하다.
+- 디코더가 RGB 를 바로 내주면(eye_engine.decoder 의 PyAV 백엔드) rgb=True 로 만든다.
+  read() 배열이 이미 RGB 이므로 to_rgb() 는 변환 없이 그대로 돌려준다.
+
+1080p(6.2MB/프레임) 30fps 기준 디코딩+변환으로 초당 약 370MB 를 새로 잡던 것이 0 이 된다.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class FrameBuffers:
+    """한 프레임 루프(스레드 하나) 전용 버퍼 묶음. rgb=True 면 디코딩 프레임이 이미 RGB."""
+
+    def __init__(self, rgb: bool = False, slots: int = 1):
+        self.rgb = rgb
+        self._frames: List[Optional[np.ndarray]] = [None] * max(1, int(slots))  # 디코딩 배열 (rgb=True 면 RGB)
+        self._slot = 0
+        self._rgb: Dict[Tuple[int, ...], np.ndarray] = {}
+        self.reads = 0
+        self.allocs = 0      # 새로 잡은 배열 수 (첫 프레임/크기 변경 때만 늘어야 정상)
+        self.retained = 0
+
+    def read(self, cap: "cv2.VideoCapture") -> Tuple[bool, Optional[np.ndarray]]:
+        """cap.read() 와 같되 slots 번 전 프레임 배열에 덮어쓴다 (slots=1 이면 직전 프레임)."""
+        i = self._slot
+        ok, frame = cap.read(self._frames[i])
+        if not ok:
+            return False, None
+        self.reads += 1
+        if frame is not self._frames[i]:
+            self._frames[i] = frame
+            self.allocs += 1
+        self._slot = (i + 1) % len(self._frames)
+        return True, frame
+
+    def to_rgb(self, bgr: np.ndarray) -> np.ndarray:
+        """BGR → RGB (크기별 재사용 배열). 반환값은 같은 크기의 다음 to_rgb() 까지 유효."""
+        if self.rgb:
+            return bgr
+        dst = self._rgb.get(bgr.shape)
+        if dst is None:
+            dst = self._rgb[bgr.shape] = np.empty(bgr.shape, dtype=np.uint8)
+            self.allocs += 1
+        return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=dst)
+
+    def retain(self, frame: np.ndarray) -> np.ndarray:
+        """루프 밖에서 쓸 프레임 복사 (빌린 버퍼는 다음 read() 에 덮어써진다)."""
+        self.retained += 1
+        return frame.copy()
+
+    def nbytes(self) -> int:
+        total = sum(a.nbytes for a in self._frames if a is not None)
+        return int(total + sum(a.nbytes for a in self._rgb.values()))
+
+    def stats(self) -> dict:
+        return {"reads": self.reads, "allocs": self.allocs, "retained": self.retained, "bytes": self.nbytes()}
@@ -0,0 +1,143 @@
+"""랜드마크 → 눈 지표 벡터화 엔진.
+
+프레임마다 FaceMesh 랜드마크(478개) 중 지표에 쓰는 점(눈꼬리/눈꺼풀/홍채)만 골라
+(N, 3) 배열로 한 번 변환해 두고, 여러 프레임을 (B, N, 3) 로 쌓아 좌/우 눈 지표를 한 번에 계산한다.
+
+결과는 기존 `_eye_metrics` / `_iris_center` (랜드마크를 하나씩 `_px` 로 읽던 구현)와 비트 단위로 같다.
+- 픽셀 좌표는 float64 로 `x * w` 를 먼저 계산한 뒤 평균 (기존과 같은 연산 순서)
+- hypot 은 np.hypot 이 math.hypot 과 마지막 비트가 다를 수 있어 math.hypot 으로 계산
+"""
+from __future__ import annotations
+
+import math
+from itertools import chain
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# 대표 랜드마크 인덱스 (안정 쌍)
+L_CORNER_OUT, L_CORNER_IN = 33, 133
+L_LID_TOP, L_LID_BOT = 159, 145
+R_CORNER_OUT, R_CORNER_IN = 362, 263
+R_LID_TOP, R_LID_BOT = 386, 374
+
+# mediapipe FACEMESH_LEFT_IRIS / FACEMESH_RIGHT_IRIS 의 고유 인덱스 (refine_landmarks=True)
+LEFT_IRIS_IDXS = [474, 475, 476, 477]
+RIGHT_IRIS_IDXS = [469, 470, 471, 472]
+
+METRIC_KEYS = ("eye_width", "eye_open", "iris_cx", "iris_cy", "eye_cx", "eye_cy", "v_offset")
+
+
+def _hypot(dx: np.ndarray, dy: np.ndarray) -> np.ndarray:
+    """math.hypot 과 동일한 값 (np.hypot 은 드물게 1ulp 차이)."""
+    out = np.fromiter(map(math.hypot, dx.ravel().tolist(), dy.ravel().tolist()),
+                      dtype=np.float64, count=dx.size)
+    return out.reshape(dx.shape)
+
+
+class EyeMetricsEngine:
+    """좌/우 눈 지표 배치 계산기. 인덱스 배열은 생성 시 한 번만 만든다."""
+
+    def __init__(
+        self,
+        left_iris_idxs: Sequence[int] = LEFT_IRIS_IDXS,
+        right_iris_idxs: Sequence[int] = RIGHT_IRIS_IDXS,
+    ):
+        corners = [L_CORNER_OUT, L_CORNER_IN, L_LID_TOP, L_LID_BOT,
+                   R_CORNER_OUT, R_CORNER_IN, R_LID_TOP, R_LID_BOT]
+        self.point_idxs: List[int] = sorted(set(corners) | set(left_iris_idxs) | set(right_iris_idxs))
+        pos = {lm_idx: j for j, lm_idx in enumerate(self.point_idxs)}
+        self.n_points = len(self.point_idxs)
+
+        # 마지막 축 [좌, 우] 로 정렬된 압축 인덱스
+        self._c_out = np.array([pos[L_CORNER_OUT], pos[R_CORNER_OUT]])
+        self._c_in = np.array([pos[L_CORNER_IN], pos[R_CORNER_IN]])
+        self._lid_top = np.array([pos[L_LID_TOP], pos[R_LID_TOP]])
+        self._lid_bot = np.array([pos[L_LID_BOT], pos[R_LID_BOT]])
+        self._has_iris = bool(left_iris_idxs) and bool(right_iris_idxs) \
+            and len(left_iris_idxs) == len(right_iris_idxs)
+        self._iris = np.array([[pos[i] for i in left_iris_idxs],
+                               [pos[i] for i in right_iris_idxs]]) if self._has_iris else None
+
+    def to_array(self, landmarks) -> np.ndarray:
+        """FaceMesh 랜드마크 목록 → 사용하는 점만 (N, 3) float64."""
+        pts = [landmarks[i] for i in self.point_idxs]
+        flat = np.fromiter(chain.from_iterable((p.x, p.y, p.z) for p in pts),
+                           dtype=np.float64, count=3 * self.n_points)
+        return flat.reshape(self.n_points, 3)
+
+    def fill(self, landmarks, out: np.ndarray) -> None:
+        """랜드마크 목록(또는 (N, 3) 배열)을 미리 잡아 둔 (N, 3) 행에 기록."""
+        out[...] = landmarks if isinstance(landmarks, np.ndarray) else self.to_array(landmarks)
+
+    def empty(self) -> np.ndarray:
+        """얼굴 미검출 프레임용 NaN (N, 3) — compute 결과도 모두 NaN."""
+        return np.full((self.n_points, 3), np.nan)
+
+    def compute(self, pts: np.ndarray, w: int, h: int) -> Dict[str, np.ndarray]:
+        """pts (..., N, 3) → 각 지표 (..., 2) 배열 ([..., 0] 왼쪽, [..., 1] 오른쪽). 계산은 float64."""
+        pts = np.asarray(pts, dtype=np.float64)
+        x = pts[..., 0] * w
+        y = pts[..., 1] * h
+
+        x_out, y_out = x[..., self._c_out], y[..., self._c_out]
+        x_in, y_in = x[..., self._c_in], y[..., self._c_in]
+        eye_width = np.maximum(1e-6, _hypot(x_out - x_in, y_out - y_in))
+
+        x_t, y_t = x[..., self._lid_top], y[..., self._lid_top]
+        x_b, y_b = x[..., self._lid_bot], y[..., self._lid_bot]
+        eyelid_dist = _hypot(x_t - x_b, y_t - y_b)
+        eye_open = eyelid_dist / eye_width
+
+        if self._has_iris:
+            ix = x[..., self._iris].mean(axis=-1)
+            iy = y[..., self._iris].mean(axis=-1)
+        else:
+            ix = np.full(eye_open.shape, np.nan)
+            iy = np.full(eye_open.shape, np.nan)
+
+        cx, cy = (x_out + x_in) / 2.0, (y_out + y_in) / 2.0
+        eye_height = np.maximum(1e-6, eyelid_dist)
+        v_offset = (iy - cy) / eye_height  # 위 음수, 아래 양수
+
+        return {
+            "eye_width": eye_width,
+            "eye_open": eye_open,
+            "iris_cx": ix,
+            "iris_cy": iy,
+            "eye_cx": cx,
+            "eye_cy": cy,
+            "v_offset": v_offset,
+        }
+
+    def frame_metrics(
+        self, landmarks, w: int, h: int, keys: Sequence[str] = METRIC_KEYS,
+    ) -> Tuple[Dict[str, float], Dict[str, float]]:
+        """단일 프레임 → (왼쪽, 오른쪽) 지표 dict (python float). landmarks 는 목록 또는 (N, 3) 배열."""
+        pts = landmarks if isinstance(landmarks, np.ndarray) else self.to_array(landmarks)
+        m = self.compute(pts, w, h)
+        left = {k: float(m[k][0]) for k in keys}
+        right = {k: float(m[k][1]) for k in keys}
+        return left, right
+
+
+def mean_lr(values: np.ndarray) -> np.ndarray:
+    """(..., 2) 좌/우 평균. 기존 np.nanmean([L, R]) 과 같은 값 (좌/우는 같은 프레임이라 NaN 도 함께)."""
+    return (values[..., 0] + values[..., 1]) / 2.0
+
+
+def trace_columns(frame_idx: np.ndarray, m: Dict[str, np.ndarray], fps: float) -> Dict[str, np.ndarray]:
+    """compute() 결과 → 프레임별 trace 컬럼 (CSV 컬럼 순서 그대로)."""
+    return {
+        "frame_idx": frame_idx,
+        "time_sec": frame_idx / max(1e-6, fps),
+        # 왼쪽
+        "L_iris_cx": m["iris_cx"][:, 0], "L_iris_cy": m["iris_cy"][:, 0],
+        "L_eye_open": m["eye_open"][:, 0], "L_v_offset": m["v_offset"][:, 0],
+        # 오른쪽
+        "R_iris_cx": m["iris_cx"][:, 1], "R_iris_cy": m["iris_cy"][:, 1],
+        "R_eye_open": m["eye_open"][:, 1], "R_v_offset": m["v_offset"][:, 1],
+        # 대표
+        "eye_open": mean_lr(m["eye_open"]),
+        "v_offset": mean_lr(m["v_offset"]),
+    }
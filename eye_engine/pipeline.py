@@ -0,0 +1,258 @@
+"""프레임 파이프라인: 디코딩 → FaceMesh 추론 → trace 기록을 스레드 단계로 겹쳐 돌린다.
+
+    [decode 스레드] --frames 큐(depth)--> [inference: 호출 스레드] --results 큐--> [metrics 스레드]
+
+- decode: 샘플링 이터레이터(iter_sampled_frames)를 돌려 최대 depth 프레임 앞서 디코딩한다.
+  디코딩 배열은 FrameBuffers(slots=depth+2) 를 돌려 쓴다 — 큐에 쌓인 프레임과 추론 중인 프레임을 덮어쓰지 않는다.
+- inference: FaceMesh 는 호출 스레드에서만 쓴다(풀에서 빌린 인스턴스/워커 전역 인스턴스 그대로).
+  OpenCV/FFmpeg 디코딩과 MediaPipe 그래프는 GIL 을 놓고 돌므로 두 단계가 실제로 겹친다.
+- metrics: 결과를 받은 순서(=frame_idx 순)대로 TraceBuffer.append — 묶음 지표 계산과 요약 누적도 여기서 한다.
+- depth=0 이면 한 스레드에서 차례로 돈다(inline). 적응형 샘플링(다음 분석 프레임을 직전 결과로 정함)과
+  cProfile 로 재는 요청(켠 스레드만 잰다)은 항상 inline 이다.
+
+stats() 는 단계별 busy(일한 시간) / starved(입력 대기) / blocked(출력 큐가 차서 대기) ms 와
+utilization(busy / 전체 시간)을 주고, 가장 바쁜 단계를 bottleneck 으로 표시한다.
+설정: EYE_PIPELINE_DEPTH (0 이면 inline). 지정하지 않으면 CPU 가 둘 이상일 때 4, 하나면 0 —
+vCPU 하나(작은 Lambda 메모리 설정)에서는 겹칠 코어가 없어 스레드 전환 비용만 든다(1코어 측정 약 10% 느림).
+"""
+from __future__ import annotations
+
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from .framebuf import FrameBuffers
+from .roi import FaceLandmarkTracker
+from .telemetry import NullTimer, StageTimer
+from .trace import TraceBuffer
+
+
+def _available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # linux 외
+        return os.cpu_count() or 1
+
+
+PIPELINE_DEPTH = max(0, int(os.environ.get("EYE_PIPELINE_DEPTH") or (4 if _available_cpus() > 1 else 0)))
+STAGES = ("decode", "inference", "metrics")
+
+_DONE = object()
+# 멈춤 신호를 확인하는 간격(초) — 상대 단계가 예외로 빠졌을 때 큐에서 영원히 기다리지 않게
+_POLL_SEC = 0.1
+
+
+class _Stage:
+    __slots__ = ("busy", "starved", "blocked", "items")
+
+    def __init__(self):
+        self.busy = self.starved = self.blocked = 0.0
+        self.items = 0
+
+
+class FramePipeline:
+    """한 영상 분석용. decode_buffers() 로 샘플링 이터레이터에 넘길 버퍼를 받고 run() 으로 돌린다.
+
+    timer 를 주면 끝난 뒤 decode / inference / trace 단계 busy 시간을 더한다(단계가 겹치므로 합 > 전체 시간).
+    """
+
+    def __init__(self, depth: Optional[int] = None, timer: Optional[StageTimer] = None, rgb: bool = False):
+        self.depth = PIPELINE_DEPTH if depth is None else max(0, int(depth))
+        if sys.getprofile() is not None:
+            self.depth = 0  # cProfile 은 이 스레드만 잰다 → 다른 단계 스레드를 두지 않는다
+        self.timer = timer or NullTimer()
+        self.rgb = rgb
+        self.first_face: Optional[Tuple[int, np.ndarray]] = None  # (trace 행, 프레임 복사본)
+        self._stages = {name: _Stage() for name in STAGES}
+        self._wall = 0.0
+
+    @property
+    def threaded(self) -> bool:
+        return self.depth > 0
+
+    def decode_buffers(self) -> FrameBuffers:
+        """샘플링 이터레이터용 디코딩 버퍼 (큐 depth + 추론 중 1 + 디코딩 중 1 개를 돌려 쓴다)."""
+        return FrameBuffers(rgb=self.rgb, slots=self.depth + 2 if self.threaded else 1)
+
+    def run(
+        self,
+        frames: Iterable[Tuple[int, np.ndarray]],
+        tracker: FaceLandmarkTracker,
+        trace: TraceBuffer,
+        sampler=None,
+        keep_first_face: bool = False,
+        progress: Optional[Callable[[int, int], None]] = None,
+        progress_every: int = 100,
+    ) -> None:
+        """frames 를 끝까지(또는 sampler 가 수렴할 때까지) 분석해 trace 에 기록.
+
+        keep_first_face 면 얼굴이 처음 검출된 프레임을 복사해 first_face 에 둔다(오버레이용).
+        progress 는 progress_every 프레임마다 (기록한 프레임, trace 용량) 으로 호출한다.
+        """
+        t0 = time.perf_counter()
+        try:
+            if self.threaded and sampler is None:
+                self._run_threaded(frames, tracker, trace, keep_first_face, progress, progress_every)
+            else:
+                self._run_inline(frames, tracker, trace, sampler, keep_first_face, progress, progress_every)
+        finally:
+            self._wall = time.perf_counter() - t0
+            st = self._stages
+            self.timer.add("decode", st["decode"].busy * 1000.0)
+            self.timer.add("inference", st["inference"].busy * 1000.0)
+            self.timer.add("trace", st["metrics"].busy * 1000.0)
+
+    # ── inline ────────────────────────────────────────────────────────────
+    def _run_inline(self, frames, tracker, trace, sampler, keep_first_face, progress, progress_every) -> None:
+        self.depth = 0
+        dec, inf, met = (self._stages[n] for n in STAGES)
+        it = iter(frames)
+        while True:
+            t = time.perf_counter()
+            item = next(it, None)
+            t1 = time.perf_counter()
+            dec.busy += t1 - t
+            if item is None:
+                return
+            fidx, frame = item
+            dec.items += 1
+            lm = tracker.process(frame)
+            t2 = time.perf_counter()
+            inf.busy += t2 - t1
+            inf.items += 1
+            if lm is not None and keep_first_face and self.first_face is None:
+                self.first_face = (len(trace), frame.copy())
+            row = trace.append(fidx, lm)
+            met.busy += time.perf_counter() - t2
+            met.items += 1
+            if progress is not None and len(trace) % progress_every == 0:
+                progress(len(trace), trace.capacity)
+            if sampler is not None and sampler.observe(fidx, row):
+                return
+
+    # ── threaded ──────────────────────────────────────────────────────────
+    def _run_threaded(self, frames, tracker, trace, keep_first_face, progress, progress_every) -> None:
+        frame_q: "queue.Queue" = queue.Queue(maxsize=self.depth)
+        result_q: "queue.Queue" = queue.Queue(maxsize=self.depth * 8)
+        stop = threading.Event()
+        errors: Dict[str, BaseException] = {}
+
+        def put(q: "queue.Queue", item, stage: _Stage) -> bool:
+            t = time.perf_counter()
+            try:
+                while not stop.is_set():
+                    try:
+                        q.put(item, timeout=_POLL_SEC)
+                        return True
+                    except queue.Full:
+                        continue
+                return False
+            finally:
+                stage.blocked += time.perf_counter() - t
+
+        def get(q: "queue.Queue", stage: _Stage):
+            t = time.perf_counter()
+            try:
+                while True:
+                    try:
+                        return q.get(timeout=_POLL_SEC)
+                    except queue.Empty:
+                        if stop.is_set():
+                            return _DONE
+            finally:
+                stage.starved += time.perf_counter() - t
+
+        def decode() -> None:
+            st = self._stages["decode"]
+            it = iter(frames)
+            try:
+                while not stop.is_set():
+                    t = time.perf_counter()
+                    item = next(it, None)
+                    st.busy += time.perf_counter() - t
+                    if item is None:
+                        break
+                    st.items += 1
+                    if not put(frame_q, item, st):
+                        return
+            except BaseException as e:  # 호출 스레드에서 다시 올린다
+                errors["decode"] = e
+            put(frame_q, _DONE, st)
+
+        def metrics() -> None:
+            st = self._stages["metrics"]
+            try:
+                while True:
+                    item = get(result_q, st)
+                    if item is _DONE:
+                        return
+                    t = time.perf_counter()
+                    trace.append(*item)
+                    st.busy += time.perf_counter() - t
+                    st.items += 1
+                    if progress is not None and len(trace) % progress_every == 0:
+                        progress(len(trace), trace.capacity)
+            except BaseException as e:
+                errors["metrics"] = e
+                stop.set()
+
+        threads = [
+            threading.Thread(target=decode, name="eye-decode", daemon=True),
+            threading.Thread(target=metrics, name="eye-metrics", daemon=True),
+        ]
+        for th in threads:
+            th.start()
+        inf = self._stages["inference"]
+        n = 0
+        try:
+            while True:
+                item = get(frame_q, inf)
+                if item is _DONE:
+                    break
+                fidx, frame = item
+                t = time.perf_counter()
+                lm = tracker.process(frame)
+                inf.busy += time.perf_counter() - t
+                inf.items += 1
+                if lm is not None and keep_first_face and self.first_face is None:
+                    self.first_face = (n, frame.copy())
+                n += 1
+                if not put(result_q, (fidx, lm), inf):
+                    break
+            put(result_q, _DONE, inf)
+        except BaseException:
+            stop.set()  # 다른 단계가 큐에서 기다리다 빠져나오게
+            raise
+        finally:
+            for th in threads:
+                th.join()
+        for stage in STAGES:
+            if stage in errors:
+                raise errors[stage]
+
+    # ── 보고 ──────────────────────────────────────────────────────────────
+    def stats(self) -> Dict[str, Any]:
+        """단계별 busy/starved/blocked ms, 처리 수, 가동률 + 병목 단계 (응답/로그용)."""
+        wall = self._wall
+        stages = {}
+        for name, st in self._stages.items():
+            stages[name] = {
+                "items": st.items,
+                "busy_ms": round(st.busy * 1000.0, 3),
+                "starved_ms": round(st.starved * 1000.0, 3),
+                "blocked_ms": round(st.blocked * 1000.0, 3),
+                "utilization": round(st.busy / wall, 4) if wall > 0 else None,
+            }
+        busiest = max(STAGES, key=lambda n: self._stages[n].busy)
+        return {
+            "mode": "threaded" if self.threaded else "inline",
+            "depth": self.depth,
+            "wall_ms": round(wall * 1000.0, 3),
+            "stages": stages,
+            "bottleneck": busiest if wall > 0 else None,
+        }
@@ -0,0 +1,129 @@
+"""FaceMesh 인스턴스 풀: 요청이 인스턴스를 빌려 쓰고 돌려준다(checkout).
+
+- 한 인스턴스는 한 번에 한 요청만 쓴다 → 사용자끼리 추적 상태가 섞이지 않는다.
+- 인스턴스는 처음 필요할 때 size 개까지 만든다(만드는 동안에도 다른 요청은 기존 인스턴스를 쓴다).
+- 모두 사용 중이면 반납될 때까지 기다린다. 대기 시간은 stats() 로 본다(풀 크기 조정 근거).
+- reset 을 주면 반납할 때 호출한다(동영상 모드: 빈 프레임으로 추적 끊기).
+"""
+from __future__ import annotations
+
+import contextlib
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+
+class FaceMeshPool:
+    """스레드 안전 인스턴스 풀. factory() 로 만들고 checkout() 컨텍스트로 빌린다."""
+
+    def __init__(self, factory: Callable[[], Any], size: int, name: str = "facemesh",
+                 reset: Optional[Callable[[Any], None]] = None):
+        self.factory = factory
+        self.size = max(1, int(size))
+        self.name = name
+        self.reset = reset
+        self._idle: Deque[Any] = deque()
+        self._created = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+        self.checkouts = 0
+        self.waited = 0          # 바로 못 빌리고 기다린 횟수
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.last_wait_ms = 0.0
+        self.reset_errors = 0
+
+    def _acquire(self, timeout: Optional[float]) -> Any:
+        t0 = time.perf_counter()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        create = False
+        with self._cond:
+            self._waiting += 1
+            try:
+                while not self._idle and self._created >= self.size:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError(f"{self.name} pool: no instance within {timeout}s")
+                    self._cond.wait(remaining)
+                if self._idle:
+                    inst = self._idle.pop()
+                else:
+                    self._created += 1  # 자리 먼저 잡고 생성은 락 밖에서
+                    create = True
+                self._in_use += 1
+            finally:
+                self._waiting -= 1
+        if create:
+            try:
+                inst = self.factory()
+            except BaseException:
+                with self._cond:
+                    self._created -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+        wait_ms = (time.perf_counter() - t0) * 1000.0
+        with self._cond:
+            self.checkouts += 1
+            self.last_wait_ms = wait_ms
+            if not create and wait_ms >= 1.0:
+                self.waited += 1
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+        return inst
+
+    def _release(self, inst: Any) -> None:
+        if self.reset is not None:
+            try:
+                self.reset(inst)
+            except Exception:
+                # 상태를 모르는 인스턴스는 버리고 다음 요청 때 새로 만든다
+                with self._cond:
+                    self.reset_errors += 1
+                    self._created -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                with contextlib.suppress(Exception):
+                    inst.close()
+                return
+        with self._cond:
+            self._idle.append(inst)
+            self._in_use -= 1
+            self._cond.notify()
+
+    @contextlib.contextmanager
+    def checkout(self, timeout: Optional[float] = None):
+        """인스턴스를 빌려 with 블록 동안 쓴다. timeout 초 안에 못 빌리면 TimeoutError."""
+        inst = self._acquire(timeout)
+        try:
+            yield inst
+        finally:
+            self._release(inst)
+
+    def close(self) -> None:
+        """쉬고 있는 인스턴스를 닫는다(사용 중인 것은 반납 후 다시 만들어질 수 있다)."""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._created -= len(idle)
+        for inst in idle:
+            with contextlib.suppress(Exception):
+                inst.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "name": self.name,
+                "size": self.size,
+                "created": self._created,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "checkouts": self.checkouts,
+                "waited": self.waited,
+                "avg_wait_ms": self.wait_ms_total / self.checkouts if self.checkouts else 0.0,
+                "max_wait_ms": self.wait_ms_max,
+                "last_wait_ms": self.last_wait_ms,
+                "reset_errors": self.reset_errors,
+            }
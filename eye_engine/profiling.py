@@ -0,0 +1,69 @@
+"""요청 단위 프로파일링 (profile=true): 분석 함수를 cProfile 로 돌려 결과 파일 + 상위 함수 목록을 남긴다.
+
+- 설정으로만 켠다: EYE_PROFILE=1 (기본 끔). 결과는 EYE_PROFILE_DIR/<record_id>.prof
+  (기본: 임시 디렉터리/eye-profiles). pstats / snakeviz 로 그대로 열 수 있는 형식이다.
+- cProfile 은 켠 스레드만 잰다: 분석을 도는 작업 스레드/워커 프로세스 안에서 profile_call 로 감싼다.
+  통계는 marshal 바이트로 돌려주므로 프로세스 경계를 넘겨 부모에서 저장할 수 있다.
+- 구간 병렬 분석의 자식 프로세스는 재지 않는다(호출 측이 프로파일 요청은 순차 분석으로 돌린다).
+"""
+from __future__ import annotations
+
+import cProfile
+import marshal
+import os
+import pstats
+import re
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+PROFILE_ENABLED = os.environ.get("EYE_PROFILE", "0") in ("1", "true", "True")
+PROFILE_DIR = os.environ.get("EYE_PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "eye-profiles")
+PROFILE_TOP_N = max(1, int(os.environ.get("EYE_PROFILE_TOP_N", "20")))
+
+_SAFE_ID = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+def profile_call(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Tuple[Any, bytes]:
+    """fn(*args, **kwargs) 를 cProfile 로 실행 → (반환값, marshal 통계 바이트)."""
+    prof = cProfile.Profile()
+    try:
+        result = prof.runcall(fn, *args, **kwargs)
+    finally:
+        prof.create_stats()
+    return result, marshal.dumps(prof.stats)
+
+
+def save_profile(stats: bytes, record_id: str, directory: Optional[str] = None) -> str:
+    """통계 바이트를 <directory>/<record_id>.prof 로 저장하고 경로 반환 (cProfile.dump_stats 와 같은 형식)."""
+    if not _SAFE_ID.match(record_id):
+        raise ValueError(f"invalid record id for profile file: {record_id!r}")
+    directory = directory or PROFILE_DIR
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{record_id}.prof")
+    with open(path, "wb") as f:
+        f.write(stats)
+    return path
+
+
+def top_functions(path: str, n: int = PROFILE_TOP_N, sort: str = "tottime") -> List[Dict[str, Any]]:
+    """저장한 프로파일에서 자체 시간(tottime, 기본) 또는 누적 시간(cumtime) 상위 n 개 함수."""
+    st = pstats.Stats(path)
+    key = 2 if sort == "tottime" else 3
+    rows = sorted(st.stats.items(), key=lambda kv: kv[1][key], reverse=True)[:n]
+    out = []
+    for (filename, line, func), (cc, nc, tt, ct, _callers) in rows:
+        out.append({
+            "function": func,
+            "location": f"{os.path.basename(filename)}:{line}" if line else "built-in",
+            "calls": int(nc),
+            "primitive_calls": int(cc),
+            "tottime_ms": round(tt * 1000.0, 3),
+            "cumtime_ms": round(ct * 1000.0, 3),
+        })
+    return out
+
+
+def profile_report(stats: bytes, record_id: str, n: int = PROFILE_TOP_N) -> Dict[str, Any]:
+    """저장 + 상위 함수 목록 (응답에 그대로 싣는 형태)."""
+    path = save_profile(stats, record_id)
+    return {"path": path, "sort": "tottime", "top": top_functions(path, n)}
@@ -0,0 +1,206 @@
+"""눈 영역 ROI 추적: 직전 프레임의 얼굴 박스 주변만 잘라 고정 해상도로 FaceMesh 에 넣는다.
+
+1080p 원본 전체를 매 프레임 RGB 변환/추론하는 대신, 얼굴 박스(+여백)만 잘라
+긴 변 infer_size 로 축소한 뒤 추론한다. 결과 랜드마크는 원본 프레임 기준 정규화 좌표로
+되돌려 주므로 `_eye_metrics(lm, w, h)` 는 원본 해상도(w, h) 그대로 호출하면 된다.
+
+- 크롭은 항상 정사각형(프레임 밖은 검은 여백)으로 잘라 infer_size×infer_size 로 맞춘다.
+  추적 모드 FaceMesh 는 입력 크기가 바뀌면 추적을 잃으므로 입력 크기를 고정한다.
+- 크롭 박스는 얼굴이 안쪽 영역을 벗어날 때만 다시 잡는다(FaceMesh 내부 추적 연속성 유지).
+- 크롭 안에서 얼굴을 놓치면 같은 프레임을 축소한 전체 화면으로 즉시 재검출한다.
+  재검출은 별도의 정지 영상 모드 FaceMesh 가 맡는다(추적용 인스턴스의 입력 크기 유지).
+  재검출용 인스턴스는 호출 쪽이 detector 로 넘긴다 — 서버/워커 프로세스마다 하나(또는 FaceMeshPool)를
+  여러 요청이 같이 쓴다. 넘기지 않으면 추적기가 만들고 close() 에서 닫는다(인스턴스마다 모델·스레드를 잡는다).
+- RGB 변환은 FrameBuffers 의 크기별 배열에 덮어쓴다(프레임마다 새 배열을 만들지 않음).
+"""
+from __future__ import annotations
+
+import contextlib
+from typing import NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .framebuf import FrameBuffers
+
+
+class Point(NamedTuple):
+    x: float
+    y: float
+    z: float
+
+
+class MappedLandmarks:
+    """크롭 기준 랜드마크 → 원본 프레임 정규화 좌표 뷰 (접근한 인덱스만 변환)."""
+
+    __slots__ = ("_lm", "_ox", "_oy", "_sx", "_sy")
+
+    def __init__(self, lm, ox: float, oy: float, sx: float, sy: float):
+        self._lm = lm
+        self._ox, self._oy = ox, oy
+        self._sx, self._sy = sx, sy
+
+    def __len__(self) -> int:
+        return len(self._lm)
+
+    def __getitem__(self, i: int) -> Point:
+        p = self._lm[i]
+        return Point(self._ox + p.x * self._sx, self._oy + p.y * self._sy, p.z * self._sx)
+
+
+def _norm_bounds(lm) -> Tuple[float, float, float, float]:
+    """랜드마크 외곽 박스(정규화 좌표). MappedLandmarks 는 원본 목록에서 구한 뒤 한 번만 변환."""
+    if isinstance(lm, MappedLandmarks):
+        x0, y0, x1, y1 = _norm_bounds(lm._lm)
+        return (lm._ox + x0 * lm._sx, lm._oy + y0 * lm._sy,
+                lm._ox + x1 * lm._sx, lm._oy + y1 * lm._sy)
+    xs = [p.x for p in lm]
+    ys = [p.y for p in lm]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _fit_long_side(img: np.ndarray, size: int) -> np.ndarray:
+    """긴 변이 size 보다 크면 비율 유지 축소(확대는 하지 않음)."""
+    h, w = img.shape[:2]
+    scale = size / float(max(h, w))
+    if scale >= 1.0:
+        return img
+    return cv2.resize(img, (max(1, int(round(w * scale))), max(1, int(round(h * scale)))),
+                      interpolation=cv2.INTER_AREA)
+
+
+class FaceLandmarkTracker:
+    """FaceMesh 호출 래퍼. roi=False 면 기존과 동일하게 전체 프레임을 넣는다.
+
+    process(frame_bgr) → 원본 프레임 정규화 좌표 랜드마크(인덱싱 가능) 또는 None.
+    detector: 재검출용 정지 영상 모드 FaceMesh, 또는 그런 인스턴스의 FaceMeshPool(재검출 때만 빌린다).
+    주지 않으면 roi 모드 첫 재검출 때 만들고, 그 인스턴스는 close() 가 닫는다 — 추적기를 다 쓴 쪽이 부른다.
+    buffers 를 주면 디코딩 루프와 같은 FrameBuffers 의 RGB 배열을 쓴다(없으면 자체 버퍼).
+    buffers.rgb 면 process() 에 RGB 프레임을 넣는다(디코더가 RGB 를 내줄 때 — 색변환 없음).
+    """
+
+    def __init__(
+        self,
+        face_mesh,
+        roi: bool = False,
+        infer_size: int = 384,
+        margin: float = 0.35,
+        redetect_size: int = 640,
+        detector=None,
+        buffers: Optional[FrameBuffers] = None,
+    ):
+        self.fm = face_mesh
+        self.buffers = buffers if buffers is not None else FrameBuffers()
+        self.roi = roi
+        self.infer_size = infer_size
+        self.margin = margin
+        self.redetect_size = redetect_size
+        self.detector = detector
+        self._owns_detector = detector is None
+        self.box: Optional[Tuple[int, int, int]] = None  # (x0, y0, side) 원본 px, 정사각형
+        self.redetections = 0
+        self.roi_frames = 0
+        self._canvas: Optional[np.ndarray] = None
+
+    def stats(self) -> dict:
+        return {
+            "mode": "roi" if self.roi else "full",
+            "roi_frames": self.roi_frames,
+            "redetections": self.redetections,
+        }
+
+    def close(self) -> None:
+        """직접 만든 재검출 FaceMesh 를 닫는다 (넘겨받은 detector 와 face_mesh 는 그 주인이 관리)."""
+        if self._owns_detector and self.detector is not None:
+            with contextlib.suppress(Exception):
+                self.detector.close()
+            self.detector = None
+
+    def reset(self) -> None:
+        """추적 박스를 버린다 → 다음 프레임은 전체 프레임에서 다시 검출 (FaceMesh/detector 는 그대로 재사용)."""
+        self.box = None
+
+    def process(self, frame_bgr: np.ndarray):
+        if not self.roi:
+            res = self.fm.process(self.buffers.to_rgb(frame_bgr))
+            return res.multi_face_landmarks[0].landmark if res.multi_face_landmarks else None
+
+        h, w = frame_bgr.shape[:2]
+        if self.box is not None:
+            lm = self._process_crop(frame_bgr, self.box, w, h)
+            if lm is not None:
+                self.roi_frames += 1
+                self._update_box(lm, w, h)
+                return lm
+            self.box = None  # 추적 실패 → 같은 프레임에서 재검출
+
+        lm = self._detect_full(frame_bgr)
+        if lm is not None:
+            self._update_box(lm, w, h)
+        return lm
+
+    # ── 내부 ──────────────────────────────────────────────────────────────
+    def _get_detector(self):
+        if self.detector is None:
+            try:
+                from mediapipe.solutions import face_mesh as mp_face_mesh
+            except ModuleNotFoundError:
+                from mediapipe.python.solutions import face_mesh as mp_face_mesh
+            self.detector = mp_face_mesh.FaceMesh(
+                static_image_mode=True,
+                max_num_faces=1,
+                refine_landmarks=True,
+                min_detection_confidence=0.5,
+            )
+        return self.detector
+
+    def _detect_full(self, frame_bgr: np.ndarray):
+        """축소한 전체 프레임으로 재검출 (정규화 좌표라 축소해도 원본 좌표와 동일)."""
+        self.redetections += 1
+        small = _fit_long_side(frame_bgr, self.redetect_size)
+        rgb = self.buffers.to_rgb(small)
+        detector = self._get_detector()
+        if hasattr(detector, "checkout"):  # FaceMeshPool: 재검출하는 동안만 빌린다
+            with detector.checkout() as fm:
+                res = fm.process(rgb)
+        else:
+            res = detector.process(rgb)
+        return res.multi_face_landmarks[0].landmark if res.multi_face_landmarks else None
+
+    def _process_crop(self, frame_bgr: np.ndarray, box: Tuple[int, int, int], w: int, h: int):
+        x0, y0, side = box
+        n = self.infer_size
+        if self._canvas is None:
+            self._canvas = np.zeros((n, n, 3), dtype=np.uint8)
+        canvas = self._canvas
+        canvas[:] = 0
+
+        # 프레임 안쪽 부분만 잘라 같은 배율로 캔버스에 배치 (바깥은 검은 여백)
+        sx0, sy0 = max(0, x0), max(0, y0)
+        sx1, sy1 = min(w, x0 + side), min(h, y0 + side)
+        scale = n / float(side)
+        dx0, dy0 = int(round((sx0 - x0) * scale)), int(round((sy0 - y0) * scale))
+        dx1, dy1 = int(round((sx1 - x0) * scale)), int(round((sy1 - y0) * scale))
+        if dx1 - dx0 < 1 or dy1 - dy0 < 1:
+            return None
+        cv2.resize(frame_bgr[sy0:sy1, sx0:sx1], (dx1 - dx0, dy1 - dy0),
+                   dst=canvas[dy0:dy1, dx0:dx1], interpolation=cv2.INTER_AREA)
+
+        res = self.fm.process(self.buffers.to_rgb(canvas))
+        if not res.multi_face_landmarks:
+            return None
+        return MappedLandmarks(res.multi_face_landmarks[0].landmark, x0 / w, y0 / h, side / w, side / h)
+
+    def _update_box(self, lm, w: int, h: int) -> None:
+        nx0, ny0, nx1, ny1 = _norm_bounds(lm)
+        fx0, fy0, fx1, fy1 = nx0 * w, ny0 * h, nx1 * w, ny1 * h
+        if self.box is not None:
+            # 얼굴이 현재 박스의 안쪽(여백 절반 이내)에 있으면 박스 유지
+            bx0, by0, bside = self.box
+            inset = bside * self.margin / (1 + 2 * self.margin) / 2
+            if (fx0 >= bx0 + inset and fy0 >= by0 + inset
+                    and fx1 <= bx0 + bside - inset and fy1 <= by0 + bside - inset):
+                return
+        side = int(max(fx1 - fx0, fy1 - fy0) * (1 + 2 * self.margin))
+        cx, cy = (fx0 + fx1) / 2.0, (fy0 + fy1) / 2.0
+        self.box = (int(cx - side / 2), int(cy - side / 2), side) if side >= 16 else None
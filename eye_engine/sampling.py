@@ -0,0 +1,89 @@
+"""프레임 샘플링: 버릴 프레임은 grab()만 하고(색변환/복사 없음), 분석할 프레임만 retrieve().
+
+- mode="grab": 모든 프레임을 grab() 으로 넘기고 분석 대상만 retrieve() → BGR 변환/복사는 분석 프레임에서만 발생
+- mode="seek": 다음 분석 프레임까지 간격이 크면 CAP_PROP_POS_FRAMES 로 건너뛴다(키프레임부터 재디코딩).
+  간격이 키프레임 주기보다 길 때(낮은 target_fps, 긴 영상)만 이득이다.
+
+간격은 step(정수 프레임 간격) 또는 target_fps(초당 분석 프레임 수)로 지정한다.
+"""
+from __future__ import annotations
+
+from typing import Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .framebuf import FrameBuffers
+
+SAMPLING_MODES = ("grab", "seek")
+
+# seek 모드에서 이 프레임 수 이상 떨어져 있을 때만 실제로 seek 한다(짧은 간격은 grab 이 더 싸다).
+SEEK_MIN_GAP = 30
+
+
+def resolve_stride(fps: float, step: int = 1, target_fps: Optional[float] = None) -> float:
+    """분석 프레임 간격(프레임 단위, 실수 허용). target_fps 가 있으면 step 보다 우선."""
+    if target_fps and target_fps > 0 and fps and fps > 0:
+        return max(1.0, float(fps) / float(target_fps))
+    return float(max(1, int(step)))
+
+
+def skip_to(cap: "cv2.VideoCapture", cur: int, target: int, mode: str = "grab") -> bool:
+    """다음 grab() 위치를 cur → target 으로 옮긴다 (grab() 만, seek 모드는 간격이 크면 seek). 실패 시 False."""
+    if mode == "seek" and target - cur >= SEEK_MIN_GAP:
+        return bool(cap.set(cv2.CAP_PROP_POS_FRAMES, target))
+    while cur < target:
+        if not cap.grab():
+            return False
+        cur += 1
+    return True
+
+
+def iter_sampled_frames(
+    cap: "cv2.VideoCapture",
+    fps: float,
+    step: int = 1,
+    target_fps: Optional[float] = None,
+    max_frames: Optional[int] = None,
+    mode: str = "grab",
+    start_frame: int = 0,
+    end_frame: Optional[int] = None,
+    buffers: Optional[FrameBuffers] = None,
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """(frame_idx, BGR frame) 를 분석 대상 프레임에 대해서만 yield.
+
+    frame_idx 는 원본 영상 기준 인덱스이므로 time_sec = frame_idx / fps 계산은 그대로 유효하다.
+    start_frame/end_frame 으로 [start, end) 구간만 읽을 수 있다(구간 분할 분석). 분석 프레임 격자는
+    영상 처음부터 잡은 것과 같으므로 구간을 이어 붙이면 전체를 한 번에 읽은 것과 같은 frame_idx 가 된다.
+    buffers 를 주면 매번 같은 배열에 디코딩한다 — yield 한 프레임은 다음 반복까지만 유효(eye_engine.framebuf).
+    """
+    if mode not in SAMPLING_MODES:
+        raise ValueError(f"unknown sampling mode: {mode}")
+
+    stride = resolve_stride(fps, step, target_fps)
+    kept = 0
+    cur = 0          # 다음 grab() 이 가져올 프레임 인덱스
+    k = 0            # 분석 프레임 순번
+    if start_frame > 0:
+        if not cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame):
+            return
+        cur = start_frame
+        k = max(0, int(start_frame // stride) - 1)
+    while max_frames is None or kept < max_frames:
+        target = int(round(k * stride))
+        k += 1
+        if target < cur:
+            continue
+        if end_frame is not None and target >= end_frame:
+            return
+
+        if not skip_to(cap, cur, target, mode):
+            return
+        cur = target
+
+        ok, frame = buffers.read(cap) if buffers is not None else cap.read()
+        if not ok:
+            return
+        cur += 1
+        kept += 1
+        yield target, frame
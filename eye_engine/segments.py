@@ -0,0 +1,246 @@
+"""구간 분할 병렬 분석: 긴 영상을 시간 구간으로 나눠 구간마다 별도 FaceMesh 로 분석하고 frame_idx 순으로 합친다.
+
+- 구간 경계는 원본 프레임 기준이며, 분석 프레임 격자(step/target_fps)는 영상 전체 기준 그대로라
+  합친 trace 의 frame_idx 는 순차 분석과 같다.
+- 각 구간은 warmup(경계 앞 overlap_sec) 프레임부터 FaceMesh 에 넣어 얼굴을 다시 잡은 뒤
+  start 부터만 trace 에 기록한다. 첫 구간은 순차 분석과 똑같이 영상 처음부터 시작한다.
+- FaceMesh 추적 모드는 직전 프레임에 의존하므로 경계 직후 몇 프레임의 랜드마크는 순차 분석과
+  미세하게 다를 수 있다(warmup 이 짧을수록). 요약은 이 차이만큼만 달라진다.
+
+워커 실행은 호출 측이 고른다: python_server 는 상주 프로세스 풀, Lambda/eye.py 는
+run_segments_in_processes (multiprocessing.Process + Pipe — Lambda 에는 /dev/shm 이 없어 Pool/Queue 불가).
+"""
+from __future__ import annotations
+
+import multiprocessing as mp
+import os
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+from .decoder import decoder_info, frames_are_rgb, open_video
+from .framebuf import FrameBuffers
+from .metrics import EyeMetricsEngine
+from .roi import FaceLandmarkTracker
+from .sampling import iter_sampled_frames, resolve_stride
+from .trace import TraceBuffer
+
+# 구간 하나의 최소 길이(초). 이보다 짧게 나누면 FaceMesh 생성/warmup 비용이 이득보다 크다.
+MIN_SEGMENT_SEC = 10.0
+# 경계 앞 재검출용 겹침(초)
+DEFAULT_OVERLAP_SEC = 1.0
+
+
+class Segment(NamedTuple):
+    start: int            # trace 에 기록하는 첫 원본 프레임 (포함)
+    end: Optional[int]    # 끝 원본 프레임 (제외), None 이면 영상 끝까지
+    warmup: int           # FaceMesh 에 넣기 시작하는 원본 프레임 (≤ start)
+
+
+def plan_segments(
+    frame_count: int,
+    fps: float,
+    workers: int,
+    step: int = 1,
+    target_fps: Optional[float] = None,
+    max_frames: Optional[int] = None,
+    overlap_sec: float = DEFAULT_OVERLAP_SEC,
+    min_segment_sec: float = MIN_SEGMENT_SEC,
+) -> List[Segment]:
+    """영상을 최대 workers 개 구간으로 분할. 프레임 수를 모르거나 짧으면 구간 하나(순차)."""
+    end: Optional[int] = None
+    total = int(frame_count or 0)
+    if max_frames:
+        # 순차 분석에서 max_frames 번째 분석 프레임 다음에서 끊는다
+        end = int(round((int(max_frames) - 1) * resolve_stride(fps, step, target_fps))) + 1
+        total = min(total, end) if total > 0 else 0
+    if total <= 0 or workers <= 1 or not fps or fps <= 0:
+        return [Segment(0, end, 0)]
+
+    n = max(1, min(int(workers), int(total / (min_segment_sec * fps))))
+    if n == 1:
+        return [Segment(0, end, 0)]
+    bounds = [int(round(i * total / n)) for i in range(n)]
+    overlap = int(round(overlap_sec * fps))
+    segs = []
+    for i, start in enumerate(bounds):
+        # 마지막 구간은 메타데이터 프레임 수가 부정확해도 끝까지 읽도록 end=None (max_frames 컷은 유지)
+        seg_end = bounds[i + 1] if i + 1 < n else end
+        segs.append(Segment(start, seg_end, max(0, start - overlap)))
+    return segs
+
+
+def analyze_segment(
+    face_mesh,
+    video_path: str,
+    seg: Segment,
+    engine: EyeMetricsEngine,
+    fps: float,
+    step: int = 1,
+    target_fps: Optional[float] = None,
+    sampling: str = "grab",
+    roi: bool = False,
+    detector=None,
+) -> Dict[str, Any]:
+    """구간 하나 분석 → {"frame_idx": int32 (k,), "points": float32 (k, N, 3), "tracking", "warmup_frames"}.
+
+    face_mesh 는 새로 만들었거나 빈 프레임으로 추적 상태를 끊어 둔 인스턴스여야 한다.
+    detector 는 roi 재검출용 FaceMesh (상주 워커는 워커마다 하나를 넘긴다 — FaceLandmarkTracker 참고).
+    """
+    cap = open_video(video_path)
+    if not cap.isOpened():
+        raise ValueError("cannot open video")
+    decoder = decoder_info(cap)
+    buffers = FrameBuffers(rgb=frames_are_rgb(cap))  # 디코딩/RGB 변환 배열 재사용
+    tracker = FaceLandmarkTracker(face_mesh, roi=roi, buffers=buffers, detector=detector)
+    idxs: List[int] = []
+    rows: List[np.ndarray] = []
+    warmup_frames = 0
+    try:
+        for fidx, frame in iter_sampled_frames(
+            cap, fps, step=step, target_fps=target_fps, mode=sampling,
+            start_frame=seg.warmup, end_frame=seg.end, buffers=buffers,
+        ):
+            lm = tracker.process(frame)
+            if fidx < seg.start:
+                warmup_frames += 1
+                continue
+            idxs.append(fidx)
+            rows.append(engine.to_array(lm) if lm is not None else engine.empty())
+    finally:
+        cap.release()
+        tracker.close()
+    points = (np.stack(rows).astype(np.float32) if rows
+              else np.empty((0, engine.n_points, 3), dtype=np.float32))
+    return {
+        "frame_idx": np.asarray(idxs, dtype=np.int32),
+        "points": points,
+        "tracking": {**tracker.stats(), "decoder": decoder},
+        "warmup_frames": warmup_frames,
+    }
+
+
+def merge_segments(trace: TraceBuffer, results: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """구간 결과를 순서대로 trace 에 이어 붙이고 합친 tracking 통계 반환."""
+    for r in results:
+        trace.extend(r["frame_idx"], r["points"])
+    first = results[0]["tracking"] if results else {}
+    return {
+        "mode": first.get("mode", "full"),
+        "roi_frames": sum(r["tracking"]["roi_frames"] for r in results),
+        "redetections": sum(r["tracking"]["redetections"] for r in results),
+        "segments": len(results),
+        "warmup_frames": sum(r["warmup_frames"] for r in results),
+        "decoder": first.get("decoder"),
+    }
+
+
+def new_video_face_mesh():
+    """동영상용(추적 모드) FaceMesh — eye.py / lambda / python_server 와 같은 설정."""
+    try:
+        from mediapipe.solutions import face_mesh as mp_face_mesh
+    except ModuleNotFoundError:
+        from mediapipe.python.solutions import face_mesh as mp_face_mesh
+    return mp_face_mesh.FaceMesh(
+        static_image_mode=False,
+        max_num_faces=1,
+        refine_landmarks=True,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5,
+    )
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """이 프로세스의 최대 RSS (MB, linux ru_maxrss 는 KB). resource 가 없으면 None."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _segment_child(conn, args: tuple) -> None:
+    try:
+        fm = new_video_face_mesh()
+        try:
+            result = analyze_segment(fm, *args)
+        finally:
+            fm.close()
+        # forkserver 자식은 호출한 프로세스가 아니라 서버의 자식이라 RUSAGE_CHILDREN 에 잡히지 않는다 → 직접 보고
+        result["peak_rss_mb"] = _peak_rss_mb()
+        conn.send(("ok", result))
+    except Exception as e:  # 부모에서 구간 번호와 함께 다시 올린다
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def _start_method() -> str:
+    # fork 는 쓰지 않는다: 부모가 MediaPipe 를 한 번이라도 돌렸으면(프리웜, 웜 컨테이너의 이전 요청)
+    # 그래프 스레드가 잡고 있던 힙 상태가 자식에 복사돼 자식 FaceMesh 가 malloc 오류로 죽는다.
+    # forkserver 는 MediaPipe 를 돌린 적 없는 서버 프로세스에서 갈라지고, 서버는 첫 호출 때 한 번만 뜬다.
+    default = "forkserver" if os.name == "posix" else "spawn"
+    return os.environ.get("EYE_SEGMENT_START_METHOD", default)
+
+
+def run_segments_in_processes(
+    video_path: str,
+    segments: Sequence[Segment],
+    engine: EyeMetricsEngine,
+    fps: float,
+    step: int = 1,
+    target_fps: Optional[float] = None,
+    sampling: str = "grab",
+    roi: bool = False,
+    start_method: Optional[str] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> List[Dict[str, Any]]:
+    """구간마다 자식 프로세스 하나(자체 FaceMesh)로 분석, 결과는 구간 순서대로 반환.
+
+    progress 를 주면 구간 결과를 받을 때마다 (받은 구간 수, 전체 구간 수) 로 호출한다.
+    결과마다 그 자식 프로세스의 최대 RSS 가 peak_rss_mb 로 붙는다 (resource 가 없으면 None).
+    start_method 를 주지 않으면 EYE_SEGMENT_START_METHOD (기본: posix 는 forkserver, 그 외 spawn).
+    fork 는 MediaPipe 를 이미 돌린 프로세스에서 자식이 죽으므로 넘기지 않는다.
+    """
+    ctx = mp.get_context(start_method or _start_method())
+    procs = []
+    for seg in segments:
+        recv_end, send_end = ctx.Pipe(duplex=False)
+        args = (video_path, seg, engine, fps, step, target_fps, sampling, roi)
+        p = ctx.Process(target=_segment_child, args=(send_end, args), daemon=True)
+        p.start()
+        send_end.close()
+        procs.append((p, recv_end))
+
+    results: List[Dict[str, Any]] = []
+    errors: List[str] = []
+    for i, (p, conn) in enumerate(procs):
+        try:
+            status, payload = conn.recv()
+        except EOFError:
+            status, payload = "error", None
+        finally:
+            conn.close()
+        p.join()
+        if payload is None:
+            payload = f"worker exited with code {p.exitcode}"
+        if status == "ok":
+            results.append(payload)
+        else:
+            errors.append(f"segment {i}: {payload}")
+        if progress is not None:
+            try:
+                progress(i + 1, len(procs))
+            except BaseException:
+                # 호출한 쪽이 중단하면(예: 작업 임대를 잃음) 남은 구간 프로세스를 기다리지 않고 정리
+                for rest, rest_conn in procs[i + 1:]:
+                    rest.terminate()
+                    rest.join()
+                    rest_conn.close()
+                raise
+    if errors:
+        raise RuntimeError("; ".join(errors))
+    return results
@@ -0,0 +1,120 @@
+"""동영상 입력 스풀: 업로드/다운로드한 동영상을 디스크 임시 파일 대신 메모리 파일(memfd)에 담아 경로로 연다.
+
+- Linux 는 os.memfd_create 로 만든 익명 메모리 파일을 /proc/<pid>/fd/<fd> 경로로 넘긴다.
+  cv2.VideoCapture(FFmpeg) / PyAV 가 일반 파일처럼 열고 seek 한다. pid 를 넣은 경로라 같은 사용자의
+  다른 프로세스(구간 분석 자식 — fork/spawn 모두, python_server 풀 워커)도 같은 내용을 연다.
+- 쓴 크기가 max_memory(EYE_SPOOL_MAX_MB, 기본 256) 를 넘으면 그때까지의 내용을 디스크 임시 파일로 옮기고
+  이어 쓴다(tempfile.SpooledTemporaryFile 과 같은 방식). memfd 가 없거나(리눅스 외) 만들 수 없으면 처음부터 임시 파일.
+  EYE_SPOOL_MAX_MB=0 이면 항상 임시 파일(기존 동작).
+- 쓰는 동안 sha256 을 함께 계산한다(digest()) — 캐시 키 때문에 다시 읽지 않는다.
+  write() 는 순서대로만 받는다(seek 없음 — boto3 download_fileobj 도 순서대로 쓴다).
+- 경로에 확장자가 없다: FFmpeg 는 내용으로 컨테이너(mp4/mov/webm/avi ...)를 판별한다.
+
+memfd 는 프로세스 메모리(Lambda 는 함수 메모리 설정)를 쓰고 close() 하면 바로 반환된다.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+from typing import IO, Any, Dict, Optional
+
+SPOOL_MAX_BYTES = int(float(os.environ.get("EYE_SPOOL_MAX_MB", "256")) * 1024 * 1024)
+# 파일 객체에서 옮겨 담을 때 한 번에 읽는 크기
+SPOOL_CHUNK = 1 << 20
+
+
+class VideoSpool:
+    """write() 로 채우고 path 로 연다. close()(또는 with 블록 끝) 뒤에는 path 가 무효."""
+
+    def __init__(self, suffix: str = ".mp4", max_memory: Optional[int] = None):
+        self.suffix = suffix
+        self.max_memory = SPOOL_MAX_BYTES if max_memory is None else int(max_memory)
+        self.size = 0
+        self.rolled_over = False
+        self._sha = hashlib.sha256()
+        self._file: Optional[IO[bytes]] = None
+        self._path: Optional[str] = None
+        self.in_memory = False
+        if self.max_memory > 0 and hasattr(os, "memfd_create"):
+            self._open_memfd()
+        if self._file is None:
+            self._open_disk()
+
+    @classmethod
+    def from_bytes(cls, data: bytes, suffix: str = ".mp4", max_memory: Optional[int] = None) -> "VideoSpool":
+        spool = cls(suffix, max_memory)
+        spool.write(data)
+        return spool
+
+    # ── 쓰기 ──────────────────────────────────────────────────────────────
+    def write(self, data: bytes) -> int:
+        if self.in_memory and self.size + len(data) > self.max_memory:
+            self._roll_over()
+        self._file.write(data)
+        self._sha.update(data)
+        self.size += len(data)
+        return len(data)
+
+    def write_from(self, fp: IO[bytes], chunk_size: int = SPOOL_CHUNK) -> int:
+        """파일 객체 내용을 chunk_size 씩 옮겨 담는다. 옮긴 바이트 수 반환."""
+        n = 0
+        for block in iter(lambda: fp.read(chunk_size), b""):
+            n += self.write(block)
+        return n
+
+    # ── 읽기 ──────────────────────────────────────────────────────────────
+    @property
+    def path(self) -> str:
+        """cv2.VideoCapture / eye_engine.open_video 에 넘길 경로 (쓴 내용을 먼저 내보낸다)."""
+        if self._file is None:
+            raise ValueError("spool is closed")
+        self._file.flush()
+        return self._path
+
+    def digest(self) -> str:
+        """지금까지 쓴 내용의 sha256 hex (eye_engine.cache.content_hash 와 같은 값)."""
+        return self._sha.hexdigest()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"storage": "memfd" if self.in_memory else "disk", "bytes": self.size, "rolled_over": self.rolled_over}
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()  # memfd 는 메모리 반환, NamedTemporaryFile 은 삭제
+            self._file = None
+
+    def __enter__(self) -> "VideoSpool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ── 내부 ──────────────────────────────────────────────────────────────
+    def _open_memfd(self) -> None:
+        try:
+            fd = os.memfd_create("eye-video", os.MFD_CLOEXEC)
+        except OSError:  # seccomp 등으로 막힌 환경
+            return
+        path = f"/proc/{os.getpid()}/fd/{fd}"
+        if not os.path.exists(path):  # /proc 이 없으면 경로로 열 수 없다
+            os.close(fd)
+            return
+        self._file = open(fd, "w+b")
+        self._path = path
+        self.in_memory = True
+
+    def _open_disk(self) -> None:
+        tmp = tempfile.NamedTemporaryFile(suffix=self.suffix)
+        self._file, self._path = tmp, tmp.name
+        self.in_memory = False
+
+    def _roll_over(self) -> None:
+        mem = self._file
+        mem.flush()
+        mem.seek(0)
+        self._open_disk()
+        shutil.copyfileobj(mem, self._file, SPOOL_CHUNK)
+        mem.close()
+        self.rolled_over = True
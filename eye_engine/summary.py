@@ -0,0 +1,259 @@
+"""스트리밍 요약 통계: trace 전체를 메모리에 두지 않고 PSP 요약을 누적 계산한다.
+
+- 수직 피크투피크(p5~p95): QuantileSketch
+    exact_limit 개까지는 값을 그대로 모아 np.percentile 과 완전히 같은 값을 낸다.
+    넘으면 상대오차 rel_err 의 로그 버킷(DDSketch 방식)으로 옮겨 담고 이후는 버킷만 센다.
+- 표준편차: Welford/Chan 누적 (배치 평균/제곱편차를 합침, np.nanstd(ddof=0) 와 부동소수 반올림 차이만)
+- 블링크: count_blinks 와 같은 상태기계를 프레임마다 진행
+- 길이: time_sec 최소/최대
+
+오차 한계 (버킷 모드, n > exact_limit):
+    각 순서통계량 추정값 x̂ 는 |x̂ - x| ≤ rel_err·|x| (|x| < min_value 인 값은 0 으로, 오차 ≤ min_value).
+    np.percentile 처럼 이웃한 두 순서통계량을 선형보간하므로
+        |p̂ - p| ≤ rel_err·max(|x_⌊r⌋|, |x_⌈r⌉|) + min_value,   r = q·(n-1)
+    따라서 피크투피크 오차는 ≤ rel_err·(|p5| + |p95|) + 2·min_value.
+    기본값(rel_err=1e-3)에서 v_offset 이 ±1 범위면 피크투피크 오차 ≤ 0.002 (vpp_thresh 0.06 의 3% 이하).
+
+메모리: exact_limit 개 float64 + 버킷 수 ≤ 2·⌈ln(max|x|/min_value)/ln γ⌉ + 1 (γ = (1+rel_err)/(1-rel_err)).
+영상 길이와 무관하게 값의 범위로만 정해진다.
+"""
+from __future__ import annotations
+
+import math
+from typing import Dict, Optional
+
+import numpy as np
+
+# 기본값: 기본 max_frames(12000) 까지는 정확 계산
+DEFAULT_EXACT_LIMIT = 16384
+DEFAULT_REL_ERR = 1e-3
+
+
+class QuantileSketch:
+    """유한한 실수의 분위수 스케치 (정확 버퍼 → 상대오차 로그 버킷)."""
+
+    def __init__(
+        self,
+        rel_err: float = DEFAULT_REL_ERR,
+        exact_limit: int = DEFAULT_EXACT_LIMIT,
+        min_value: float = 1e-9,
+    ):
+        self.rel_err = rel_err
+        self.min_value = min_value
+        self._gamma = (1.0 + rel_err) / (1.0 - rel_err)
+        self._log_gamma = math.log(self._gamma)
+        self._exact = np.empty(max(0, int(exact_limit)), dtype=np.float64)
+        self._pos: Dict[int, int] = {}
+        self._neg: Dict[int, int] = {}
+        self._zero = 0
+        self.n = 0
+        self.spilled = False
+
+    def __len__(self) -> int:
+        return self.n
+
+    @property
+    def n_buckets(self) -> int:
+        return len(self._pos) + len(self._neg) + (1 if self._zero else 0)
+
+    def add_many(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if not values.size:
+            return
+        if not self.spilled:
+            if self.n + values.size <= len(self._exact):
+                self._exact[self.n:self.n + values.size] = values
+                self.n += values.size
+                return
+            # 정확 버퍼 초과 → 지금까지 모은 값을 버킷으로 옮기고 버퍼는 해제
+            self.spilled = True
+            kept = self._exact[:self.n]
+            self._exact = np.empty(0, dtype=np.float64)
+            self._bucket(kept)
+        self._bucket(values)
+        self.n += values.size
+
+    def _bucket(self, values: np.ndarray) -> None:
+        mag = np.abs(values)
+        small = mag < self.min_value
+        self._zero += int(small.sum())
+        for store, sel in ((self._pos, (values > 0) & ~small), (self._neg, (values < 0) & ~small)):
+            if not sel.any():
+                continue
+            idx = np.ceil(np.log(mag[sel]) / self._log_gamma).astype(np.int64)
+            keys, counts = np.unique(idx, return_counts=True)
+            for k, c in zip(keys.tolist(), counts.tolist()):
+                store[k] = store.get(k, 0) + c
+
+    def _value(self, i: int) -> float:
+        # 버킷 (γ^(i-1), γ^i] 의 대표값 — 구간 안 어떤 값과도 상대오차 ≤ rel_err
+        return 2.0 * self._gamma ** i / (self._gamma + 1.0)
+
+    def _value_at_rank(self, k: int) -> float:
+        """0 기반 k 번째 순서통계량 추정."""
+        seen = 0
+        for i in sorted(self._neg, reverse=True):  # 가장 작은(음수 쪽 큰 절댓값) 값부터
+            seen += self._neg[i]
+            if k < seen:
+                return -self._value(i)
+        seen += self._zero
+        if k < seen:
+            return 0.0
+        for i in sorted(self._pos):
+            seen += self._pos[i]
+            if k < seen:
+                return self._value(i)
+        return self._value(max(self._pos)) if self._pos else 0.0
+
+    def quantile(self, q: float) -> float:
+        """q ∈ [0, 1]. np.percentile(x, 100*q) (linear 보간) 과 같은 정의."""
+        if self.n == 0:
+            return float("nan")
+        if not self.spilled:
+            return float(np.percentile(self._exact[:self.n], 100.0 * q))
+        r = q * (self.n - 1)
+        lo, hi = int(math.floor(r)), int(math.ceil(r))
+        v_lo = self._value_at_rank(lo)
+        v_hi = self._value_at_rank(hi) if hi != lo else v_lo
+        return v_lo + (v_hi - v_lo) * (r - lo)
+
+    def ptp(self, lo_q: float = 0.05, hi_q: float = 0.95) -> float:
+        """분위수 피크투피크 (기본 p5~p95, 기존 robust_ptp)."""
+        if self.n == 0:
+            return float("nan")
+        if not self.spilled:
+            lo, hi = np.percentile(self._exact[:self.n], [100.0 * lo_q, 100.0 * hi_q])
+            return float(hi - lo)
+        return float(self.quantile(hi_q) - self.quantile(lo_q))
+
+    def nbytes(self) -> int:
+        # 버킷 하나 ≈ dict 항목(키/값 int) 약 100B 로 어림
+        return int(self._exact.nbytes + 100 * self.n_buckets)
+
+
+class RunningStats:
+    """평균/분산 누적 (Welford, 배치는 Chan 결합). std 는 모집단 표준편차(ddof=0)."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, x: float) -> None:
+        self.n += 1
+        d = x - self.mean
+        self.mean += d / self.n
+        self._m2 += d * (x - self.mean)
+
+    def add_many(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64).ravel()
+        nb = values.size
+        if not nb:
+            return
+        mb = float(values.mean())
+        m2b = float(((values - mb) ** 2).sum())
+        n = self.n + nb
+        d = mb - self.mean
+        self.mean += d * nb / n
+        self._m2 += m2b + d * d * self.n * nb / n
+        self.n = n
+
+    def std(self) -> float:
+        return math.sqrt(self._m2 / self.n) if self.n else float("nan")
+
+
+class BlinkCounter:
+    """count_blinks 의 증분 버전. update() 를 값마다 부르면 count 가 count_blinks(values) 와 같다."""
+
+    def __init__(self, thresh: float = 0.18, min_frames: int = 2):
+        self.thresh = thresh
+        self.min_frames = min_frames
+        self.closed = False
+        self.hold = 0
+        self._count = 0
+
+    def update(self, v: float) -> None:
+        if v != v:  # NaN → 닫힘 구간 종료
+            if self.closed and self.hold >= self.min_frames:
+                self._count += 1
+            self.closed, self.hold = False, 0
+        elif v < self.thresh:
+            if self.closed:
+                self.hold += 1
+            else:
+                self.closed, self.hold = True, 1
+        else:
+            if self.closed and self.hold >= self.min_frames:
+                self._count += 1
+            self.closed, self.hold = False, 0
+
+    def update_many(self, values: np.ndarray) -> None:
+        for v in np.asarray(values, dtype=np.float64).ravel().tolist():
+            self.update(v)
+
+    @property
+    def count(self) -> int:
+        """지금까지의 블링크 수 (진행 중인 닫힘 구간이 min_frames 이상이면 포함, 상태는 유지)."""
+        return self._count + (1 if self.closed and self.hold >= self.min_frames else 0)
+
+
+class StreamingSummary:
+    """프레임 trace 요약 누적기. 처리 중 언제든 result() 로 현재까지의 요약을 볼 수 있다."""
+
+    def __init__(
+        self,
+        blink_thresh: float = 0.18,
+        blink_min_frames: int = 2,
+        rel_err: float = DEFAULT_REL_ERR,
+        exact_limit: int = DEFAULT_EXACT_LIMIT,
+    ):
+        self.frames = 0
+        self.t_min: Optional[float] = None
+        self.t_max: Optional[float] = None
+        self.v_sketch = QuantileSketch(rel_err=rel_err, exact_limit=exact_limit)
+        self.v_stats = RunningStats()
+        self.blinks = BlinkCounter(blink_thresh, blink_min_frames)
+
+    def update_many(
+        self, time_sec: np.ndarray, v_offset: np.ndarray, eye_open: np.ndarray,
+        weights: Optional[np.ndarray] = None,
+    ) -> None:
+        """프레임 묶음 반영 (frame_idx 순). NaN(얼굴 미검출)은 기존 요약처럼 지표 계산에서 뺀다.
+
+        weights(정수 ≥ 1)를 주면 각 프레임을 그 횟수만큼 반복한 것처럼 센다(적응형 샘플링의 건너뛴 구간).
+        """
+        time_sec = np.asarray(time_sec, dtype=np.float64)
+        if not time_sec.size:
+            return
+        self.frames += int(time_sec.size)
+        t0, t1 = float(time_sec.min()), float(time_sec.max())
+        self.t_min = t0 if self.t_min is None else min(self.t_min, t0)
+        self.t_max = t1 if self.t_max is None else max(self.t_max, t1)
+
+        v = np.asarray(v_offset, dtype=np.float64)
+        o = np.asarray(eye_open, dtype=np.float64)
+        if weights is not None:
+            v, o = np.repeat(v, weights), np.repeat(o, weights)
+        v_valid = v[~np.isnan(v)]
+        self.v_sketch.add_many(v_valid)
+        self.v_stats.add_many(v_valid)
+
+        self.blinks.update_many(o[~np.isnan(o)])
+
+    def update(self, time_sec: float, v_offset: float, eye_open: float) -> None:
+        self.update_many(np.array([time_sec]), np.array([v_offset]), np.array([eye_open]))
+
+    def result(self) -> dict:
+        """현재까지의 요약. duration_sec 은 프레임이 없으면 NaN."""
+        dur = (self.t_max - self.t_min) if self.frames else float("nan")
+        return {
+            "frames": self.frames,
+            "duration_sec": float(dur),
+            "v_ptp": self.v_sketch.ptp(),
+            "v_std": self.v_stats.std(),
+            "blink_count": self.blinks.count,
+            "exact": not self.v_sketch.spilled,
+        }
+
+    def nbytes(self) -> int:
+        return self.v_sketch.nbytes()
@@ -0,0 +1,204 @@
+"""요청 단계별 시간 측정 + Prometheus 텍스트 형식 지표.
+
+- StageTimer: 요청 하나의 단계별 누적 ms (decode / inference / trace / metrics / upload ...).
+  server_timing() 은 Server-Timing 헤더 값, as_dict() 는 JSON 응답용.
+  프레임 루프에서는 wrap_iter()(이터레이터의 next 시간) 와 stage() 컨텍스트를 쓴다.
+- EYE_TIMING=0 이면 new_timer() 가 NullTimer 를 준다: 모든 호출이 아무 일도 하지 않는다
+  (stage() 는 공용 nullcontext, wrap_iter() 는 이터레이터를 그대로 반환).
+- MetricsRegistry: 의존성 없는 Histogram/Counter 와 Prometheus text exposition(0.0.4) 렌더링.
+"""
+from __future__ import annotations
+
+import contextlib
+import math
+import os
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+TIMING_ENABLED = os.environ.get("EYE_TIMING", "1") not in ("0", "false", "False", "")
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_NULL_CONTEXT = contextlib.nullcontext()
+
+
+class StageTimer:
+    """단계 이름 → 누적 ms. 같은 이름을 여러 번 재면 더한다(프레임 루프)."""
+
+    enabled = True
+
+    def __init__(self):
+        self.ms: Dict[str, float] = {}
+        self._lock = threading.Lock()  # 업로드 스레드에서 재는 단계도 있다
+
+    def add(self, name: str, ms: float) -> None:
+        with self._lock:
+            self.ms[name] = self.ms.get(name, 0.0) + ms
+
+    @contextlib.contextmanager
+    def _stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - t0) * 1000.0)
+
+    def stage(self, name: str):
+        """with timer.stage("decode"): ..."""
+        return self._stage(name)
+
+    def wrap_iter(self, name: str, it: Iterable[T]) -> Iterator[T]:
+        """이터레이터의 next() 에 걸린 시간을 name 단계로 (루프 본문 시간은 제외)."""
+        it = iter(it)
+        total = 0.0
+        try:
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    total += time.perf_counter() - t0
+                    return
+                total += time.perf_counter() - t0
+                yield item
+        finally:
+            self.add(name, total * 1000.0)
+
+    def merge(self, stages: Optional[Dict[str, float]], prefix: str = "") -> None:
+        """다른 프로세스/스레드에서 잰 단계(as_dict 결과)를 더한다."""
+        for name, ms in (stages or {}).items():
+            self.add(prefix + name, float(ms))
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            return {name: round(ms, 3) for name, ms in self.ms.items()}
+
+    def server_timing(self) -> str:
+        """Server-Timing 헤더 값: "decode;dur=12.3, inference;dur=45.6"."""
+        return ", ".join(f"{name};dur={ms:.1f}" for name, ms in self.as_dict().items())
+
+
+class NullTimer(StageTimer):
+    """계측 끔: 모든 메서드가 즉시 반환."""
+
+    enabled = False
+
+    def add(self, name: str, ms: float) -> None:
+        return None
+
+    def stage(self, name: str):
+        return _NULL_CONTEXT
+
+    def wrap_iter(self, name: str, it: Iterable[T]) -> Iterable[T]:
+        return it
+
+    def merge(self, stages: Optional[Dict[str, float]], prefix: str = "") -> None:
+        return None
+
+    def as_dict(self) -> Dict[str, float]:
+        return {}
+
+    def server_timing(self) -> str:
+        return ""
+
+
+def new_timer(enabled: Optional[bool] = None) -> StageTimer:
+    """EYE_TIMING(기본 켬)에 따라 StageTimer 또는 NullTimer."""
+    return StageTimer() if (TIMING_ENABLED if enabled is None else enabled) else NullTimer()
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Prometheus 텍스트 형식 지표
+# ──────────────────────────────────────────────────────────────────────────────
+def _fmt(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(float(v))
+
+
+def _labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    """누적 버킷 히스토그램 (라벨 조합마다 버킷/합/개수)."""
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name, self.help = name, help
+        self.buckets = sorted(float(b) for b in buckets)
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # [버킷별 개수..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        if value is None or math.isnan(value):
+            return
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, s in sorted(self._series.items()):
+                for i, b in enumerate(self.buckets):
+                    le = 'le="%s"' % _fmt(b)
+                    out.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {int(s[i])}")
+                le = 'le="+Inf"'
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {int(s[-1])}")
+                out.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(s[-2])}")
+                out.append(f"{self.name}_count{_labels(self.labelnames, key)} {int(s[-1])}")
+        return out
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help = name, help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, v in sorted(self._values.items()):
+                out.append(f"{self.name}{_labels(self.labelnames, key)} {_fmt(v)}")
+        return out
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List = []
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float], labelnames: Sequence[str] = ()) -> Histogram:
+        h = Histogram(name, help, buckets, labelnames)
+        self._metrics.append(h)
+        return h
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        c = Counter(name, help, labelnames)
+        self._metrics.append(c)
+        return c
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self._metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,214 @@
+"""프레임별 trace 컨테이너: 행(dict) 목록 대신 미리 잡아 둔 컬럼 배열에 바로 기록한다.
+
+- 프레임마다 지표에 쓰는 랜드마크 점만 (capacity, N, 3) float32 배열의 한 행에 기록하고,
+  frame_idx 는 int32 컬럼에 둔다. 얼굴 미검출 프레임은 NaN 행으로 남는다.
+- 용량은 CAP_PROP_FRAME_COUNT / 샘플링 간격 / max_frames 로 미리 잡고, 모자라면 두 배로 늘린다.
+- 지표 컬럼(CSV 컬럼)은 chunk 프레임마다 묶어 계산해 미리 잡아 둔 컬럼에 채우고, 같은 묶음을
+  StreamingSummary 에 넘겨 처리 중에도 요약을 볼 수 있게 한다. 이미 frame_idx 순이므로 정렬하지 않는다.
+
+FaceMesh 랜드마크 좌표는 원래 float32 이므로 전체 프레임 모드에서는 float32 저장이 손실 없다
+(ROI 모드는 원본 좌표 복원값을 반올림 — 1080p 기준 0.001px 미만).
+지표 컬럼은 기존 CSV/요약 값과 같도록 float64 로 둔다.
+"""
+from __future__ import annotations
+
+import math
+from typing import IO, Any, Dict, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from .metrics import EyeMetricsEngine, trace_columns
+from .sampling import resolve_stride
+from .summary import StreamingSummary
+from .trace_format import encode_trace, write_columns_csv
+
+# 프레임 수를 알 수 없을 때(스트림/메타데이터 누락) 시작 용량
+DEFAULT_CAPACITY = 1024
+# 지표를 묶어 계산하는 프레임 수
+DEFAULT_CHUNK = 256
+
+
+class TraceBuffer:
+    """분석 프레임 trace. append() 로 채우고 finalize() 뒤 column()/write_csv() 로 읽는다.
+
+    summary 를 주면 지표를 계산한 묶음마다 누적되므로 summary.result() 는 처리 중에도 쓸 수 있다.
+    """
+
+    def __init__(
+        self,
+        engine: EyeMetricsEngine,
+        width: int,
+        height: int,
+        fps: float,
+        capacity: int = DEFAULT_CAPACITY,
+        summary: Optional[StreamingSummary] = None,
+        chunk: int = DEFAULT_CHUNK,
+    ):
+        self.engine = engine
+        self.width, self.height, self.fps = width, height, fps
+        self.summary = summary
+        self.chunk = max(1, int(chunk))
+        capacity = max(1, int(capacity))
+        self.frame_idx = np.empty(capacity, dtype=np.int32)
+        self.points = np.full((capacity, engine.n_points, 3), np.nan, dtype=np.float32)
+        self._metric_cols: Dict[str, np.ndarray] = {}  # 지표 컬럼 (float64, capacity 길이)
+        self.n = 0
+        self.n_done = 0  # 지표 계산/요약 반영을 마친 프레임 수
+        self.grows = 0
+        self.columns: Optional[Dict[str, np.ndarray]] = None
+        # 간격이 고르지 않은 샘플링(eye_engine.adaptive)이면 기본 간격(프레임). 요약에서 각 프레임을
+        # 직전 분석 프레임과의 간격만큼(기본 간격 단위) 가중해 건너뛴 구간을 그 값으로 채운 것처럼 센다.
+        self.hold_stride: Optional[float] = None
+
+    @classmethod
+    def for_capture(
+        cls,
+        engine: EyeMetricsEngine,
+        cap: "cv2.VideoCapture",
+        fps: float,
+        step: int = 1,
+        target_fps: Optional[float] = None,
+        max_frames: Optional[int] = None,
+        summary: Optional[StreamingSummary] = None,
+    ) -> "TraceBuffer":
+        """영상 메타데이터로 분석 프레임 수를 추정해 용량을 잡는다(추정이 틀려도 append 가 늘린다)."""
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        if total > 0:
+            capacity = int(math.ceil(total / resolve_stride(fps, step, target_fps)))
+        else:
+            capacity = DEFAULT_CAPACITY
+        if max_frames:
+            capacity = min(capacity, int(max_frames))
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+        return cls(engine, width, height, fps, capacity=capacity, summary=summary)
+
+    @property
+    def capacity(self) -> int:
+        return len(self.frame_idx)
+
+    def __len__(self) -> int:
+        return self.n
+
+    def _grow(self) -> None:
+        cap = self.capacity * 2
+        frame_idx = np.empty(cap, dtype=np.int32)
+        frame_idx[: self.n] = self.frame_idx[: self.n]
+        points = np.full((cap, self.engine.n_points, 3), np.nan, dtype=np.float32)
+        points[: self.n] = self.points[: self.n]
+        for name, col in self._metric_cols.items():
+            grown = np.empty(cap, dtype=col.dtype)
+            grown[: self.n_done] = col[: self.n_done]
+            self._metric_cols[name] = grown
+        self.frame_idx, self.points = frame_idx, points
+        self.grows += 1
+
+    def append(self, frame_idx: int, landmarks=None) -> np.ndarray:
+        """프레임 기록. landmarks=None 이면 NaN 행(얼굴 미검출). 기록한 (N, 3) 행을 반환."""
+        if self.n == self.capacity:
+            self._grow()
+        i = self.n
+        self.frame_idx[i] = frame_idx
+        row = self.points[i]
+        if landmarks is not None:
+            self.engine.fill(landmarks, row)
+        self.n += 1
+        self.columns = None
+        if self.n - self.n_done >= self.chunk:
+            self.flush()
+        return row
+
+    def extend(self, frame_idx: np.ndarray, points: np.ndarray) -> None:
+        """여러 프레임을 한 번에 기록 (구간 분석 결과 병합용). points 는 (k, N, 3), NaN 행은 미검출."""
+        k = len(frame_idx)
+        while self.n + k > self.capacity:
+            self._grow()
+        self.frame_idx[self.n:self.n + k] = frame_idx
+        self.points[self.n:self.n + k] = points
+        self.n += k
+        self.columns = None
+        if self.n - self.n_done >= self.chunk:
+            self.flush()
+
+    def flush(self) -> None:
+        """아직 계산하지 않은 프레임의 지표를 묶어 계산해 컬럼에 채우고 요약에 반영."""
+        a, b = self.n_done, self.n
+        if a == b:
+            return
+        m = self.engine.compute(self.points[a:b], self.width, self.height)
+        part = trace_columns(self.frame_idx[a:b], m, self.fps)
+        for name, values in part.items():
+            if name == "frame_idx":
+                continue
+            col = self._metric_cols.get(name)
+            if col is None:
+                col = self._metric_cols[name] = np.empty(self.capacity, dtype=np.float64)
+            col[a:b] = values
+        if self.summary is not None:
+            self.summary.update_many(
+                part["time_sec"], part["v_offset"], part["eye_open"], weights=self.hold_weights(a, b),
+            )
+        self.n_done = b
+
+    def hold_weights(self, a: int = 0, b: Optional[int] = None) -> Optional[np.ndarray]:
+        """[a, b) 프레임의 요약 가중치 (hold_stride 가 없으면 None — 모두 1)."""
+        b = self.n if b is None else b
+        if self.hold_stride is None or a >= b:
+            return None
+        prev = self.frame_idx[a - 1] if a > 0 else self.frame_idx[a] - self.hold_stride
+        gaps = np.diff(self.frame_idx[a:b].astype(np.float64), prepend=float(prev))
+        return np.maximum(1, np.rint(gaps / self.hold_stride)).astype(np.int64)
+
+    def finalize(self) -> Dict[str, np.ndarray]:
+        """남은 프레임까지 계산해 CSV 컬럼(순서 유지)으로 보관/반환."""
+        self.flush()
+        columns = {"frame_idx": self.frame_idx[: self.n]}
+        for name, col in self._metric_cols.items():
+            columns[name] = col[: self.n]
+        self.columns = columns
+        return self.columns
+
+    def computed(self, name: str) -> np.ndarray:
+        """지표 계산을 마친 앞부분(n_done 프레임)의 컬럼 — 처리 중 수렴 판단용 (복사 없음)."""
+        col = self._metric_cols.get(name)
+        return col[: self.n_done] if col is not None else np.empty(0, dtype=np.float64)
+
+    def _finalized(self) -> Dict[str, np.ndarray]:
+        if self.columns is None:
+            raise RuntimeError("finalize() 를 먼저 호출해야 합니다")
+        return self.columns
+
+    def column(self, name: str) -> np.ndarray:
+        return self._finalized()[name]
+
+    def write_csv(self, fp: IO[str]) -> None:
+        """헤더 포함 CSV 기록 (DataFrame 변환 없이 컬럼 배열에서 바로)."""
+        write_columns_csv(self._finalized(), fp)
+
+    def encode(self, fmt: str = "csv", meta: Optional[Dict[str, Any]] = None) -> bytes:
+        """저장용 바이트 (csv | npz, eye_engine.trace_format)."""
+        return encode_trace(self._finalized(), fmt, meta)
+
+    def records(self, limit: Optional[int] = None, keys: Optional[Sequence[str]] = None) -> List[Dict]:
+        """앞에서부터 limit 개 프레임을 dict 목록으로 (응답 미리보기용, NaN 유지). keys 로 컬럼 선택."""
+        columns = self._finalized()
+        names = list(keys) if keys is not None else list(columns)
+        k = self.n if limit is None else min(limit, self.n)
+        cols = [columns[c][:k].tolist() for c in names]
+        return [dict(zip(names, row)) for row in zip(*cols)]
+
+    def nbytes(self) -> int:
+        """미리 잡아 둔 컬럼 배열 전체 바이트 (용량 기준)."""
+        total = self.frame_idx.nbytes + self.points.nbytes
+        total += sum(c.nbytes for c in self._metric_cols.values())
+        return int(total)
+
+    def stats(self) -> dict:
+        """메모리 사용량 보고 (요약/로그용)."""
+        return {
+            "frames": self.n,
+            "capacity": self.capacity,
+            "grows": self.grows,
+            "bytes": self.nbytes(),
+        }
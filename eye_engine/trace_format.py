@@ -0,0 +1,111 @@
+"""trace 저장 포맷: CSV(내보내기용) / npz(압축 컬럼 바이너리).
+
+npz 는 컬럼마다 압축 멤버 하나(frame_idx int32, 나머지 float32)와 JSON 메타데이터(__meta__)를 담는다.
+np.load 의 NpzFile 은 멤버를 접근할 때만 압축을 풀기 때문에 TraceReader 는 필요한 컬럼만 읽는다.
+pickle 을 쓰지 않으므로 allow_pickle=False 로 연다.
+
+Parquet/Arrow 는 pyarrow 가 배포 의존성에 없어 넣지 않았다(npz 는 numpy 만으로 읽고 쓴다).
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+from typing import IO, Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+TRACE_FORMATS = ("csv", "npz")
+TRACE_FORMAT_VERSION = 1
+
+# 포맷 → (확장자, Content-Type)
+TRACE_FILE_TYPES: Dict[str, Tuple[str, str]] = {
+    "csv": (".csv", "text/csv"),
+    "npz": (".npz", "application/octet-stream"),
+}
+
+_META_KEY = "__meta__"
+
+
+def _json_default(o: Any) -> Any:
+    if isinstance(o, np.generic):
+        return o.item()
+    raise TypeError(f"not JSON serializable: {type(o).__name__}")
+
+
+def write_columns_csv(columns: Dict[str, np.ndarray], fp: IO[str]) -> None:
+    """헤더 포함 CSV 기록 (NaN 은 빈 칸 — pandas to_csv 와 같은 표기)."""
+    w = csv.writer(fp, lineterminator="\n")
+    w.writerow(list(columns))
+    for row in zip(*(c.tolist() for c in columns.values())):
+        w.writerow(["" if v != v else v for v in row])
+
+
+def encode_trace(columns: Dict[str, np.ndarray], fmt: str = "csv", meta: Optional[Dict[str, Any]] = None) -> bytes:
+    """trace 컬럼 → 저장용 바이트. csv 는 메타데이터 없이 기존 CSV 그대로."""
+    if fmt not in TRACE_FORMATS:
+        raise ValueError(f"unknown trace format: {fmt}")
+    if fmt == "csv":
+        buf = io.StringIO()
+        write_columns_csv(columns, buf)
+        return buf.getvalue().encode("utf-8")
+
+    arrays = {}
+    for name, col in columns.items():
+        arrays[name] = col.astype(np.int32 if name == "frame_idx" else np.float32, copy=False)
+    header = {
+        "format_version": TRACE_FORMAT_VERSION,
+        "frames": int(len(columns["frame_idx"])) if "frame_idx" in columns else 0,
+        "columns": list(columns),
+        **(meta or {}),
+    }
+    arrays[_META_KEY] = np.frombuffer(
+        json.dumps(header, ensure_ascii=False, default=_json_default).encode("utf-8"), dtype=np.uint8,
+    )
+    buf = io.BytesIO()
+    np.savez_compressed(buf, **arrays)
+    return buf.getvalue()
+
+
+class TraceReader:
+    """npz trace 리더. 컬럼은 column()/read() 로 요청할 때 처음 압축을 풀고 캐시한다.
+
+    with TraceReader(data) as r:
+        r.meta["fps"], r.columns
+        r.read(["time_sec", "v_offset"])
+    """
+
+    def __init__(self, source: Union[bytes, str, "os.PathLike[str]", IO[bytes]]):
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(bytes(source))
+        self._npz = np.load(source, allow_pickle=False)
+        if _META_KEY not in self._npz.files:
+            raise ValueError("not an eye trace npz (missing metadata)")
+        self.meta: Dict[str, Any] = json.loads(self._npz[_META_KEY].tobytes().decode("utf-8"))
+        self.columns: List[str] = list(self.meta.get("columns") or [f for f in self._npz.files if f != _META_KEY])
+        self._cache: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return int(self.meta.get("frames", 0))
+
+    def __enter__(self) -> "TraceReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._npz.close()
+
+    def column(self, name: str) -> np.ndarray:
+        if name not in self._cache:
+            if name not in self.columns:
+                raise KeyError(name)
+            self._cache[name] = self._npz[name]
+        return self._cache[name]
+
+    def read(self, columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """선택한 컬럼(기본 전체)을 저장 순서대로."""
+        names = self.columns if columns is None else list(columns)
+        return {name: self.column(name) for name in names}
@@ -1,40 +1,107 @@
+import time
+
+_INIT_T0 = time.perf_counter()
+
+import contextlib
 import json
-import boto3
 import base64
-import cv2
 import math
-import numpy as np
-import pandas as pd
-import io
 import os
+import resource
 import uuid
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 import traceback
+from decimal import Decimal
+
+# ──────────────────────────────────────────────────────────────────────────────
+# 콜드 스타트: 초기화 단계별 소요 시간 기록
+#   - boto3 클라이언트/DynamoDB Table, MediaPipe 는 처음 쓰는 시점에 만든다(lazy).
+#   - EYE_PREWARM=1(기본)이면 init 단계에서 미리 만들고 FaceMesh 더미 추론까지 끝내 둔다
+#     (Lambda init 단계는 CPU 버스트를 받으므로 첫 요청 지연을 여기로 옮기는 것이 유리).
+#     EYE_PREWARM=0 이면 가벼운 import 만 하고 모두 첫 사용 시점으로 미룬다.
+# ──────────────────────────────────────────────────────────────────────────────
+INIT_TIMINGS_MS: Dict[str, float] = {}
+
+@contextlib.contextmanager
+def _timed(component: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        INIT_TIMINGS_MS[component] = round(INIT_TIMINGS_MS.get(component, 0.0) + (time.perf_counter() - t0) * 1000.0, 2)
 
-# AWS 서비스 클라이언트 초기화
-s3_client = boto3.client('s3')
-dynamodb = boto3.resource('dynamodb')
+with _timed('import_cv2_numpy'):
+    import cv2
+    import numpy as np
+
+# 공용 분석 엔진 (배포 zip 에 eye_engine 패키지 포함)
+with _timed('import_eye_engine'):
+    from eye_engine import (
+        SAMPLING_MODES, TRACE_FILE_TYPES, TRACE_FORMATS, AdaptiveConfig, AdaptiveSampler, EyeMetricsEngine,
+        FaceLandmarkTracker, FrameBuffers, FramePipeline, ResultCache, StreamingSummary, TraceBuffer, VideoSpool,
+        cache_key, content_hash, decoder_info, frames_are_rgb, iter_sampled_frames, merge_segments, open_video,
+        plan_segments, run_segments_in_processes,
+    )
 
 # 환경 변수에서 설정 읽기
 S3_BUCKET = os.environ.get('S3_BUCKET', 'seoul-ht-09')
 DYNAMODB_TABLE = os.environ.get('DYNAMODB_TABLE', 'parkinson-analysis')
+PREWARM = os.environ.get('EYE_PREWARM', '1') not in ('0', 'false', 'False', '')
+# 결과/작업 테이블: dynamodb(기본) | memory(로컬 테스트용 MemoryTable)
+TABLE_BACKEND = os.environ.get('EYE_TABLE', 'dynamodb')
+# 비동기 작업 큐: lambda(기본, 자기 자신 비동기 호출) | sqs(EYE_JOB_QUEUE_URL) | local(LocalJobQueue)
+JOB_QUEUE_BACKEND = os.environ.get('EYE_JOB_QUEUE', 'lambda')
+# 작업 임대: running 항목의 updated_at 이 EYE_JOB_LEASE_SEC 넘게 그대로면 워커가 죽은 것으로 본다
+# (제한 시간 초과/메모리 부족은 except 에 닿지 못한다). 재전달된 호출이 넘겨받고, EYE_JOB_MAX_ATTEMPTS 번째면 failed.
+# 분석 중에는 진행률 갱신이 updated_at 을 새로 쓰므로 함수 제한 시간보다 조금 길게 잡는다.
+JOB_LEASE_SEC = int(os.environ.get('EYE_JOB_LEASE_SEC', '900'))
+JOB_MAX_ATTEMPTS = max(1, int(os.environ.get('EYE_JOB_MAX_ATTEMPTS', '3')))
 
-# DynamoDB 테이블 참조
-table = dynamodb.Table(DYNAMODB_TABLE)
+# 분석 결과 캐시: 메모리 계층은 웜 컨테이너 동안 유지, EYE_CACHE_DIR(예: /tmp/eye-cache) 지정 시 디스크 계층
+result_cache = ResultCache.from_env('EYE_CACHE')
 
-# MediaPipe 초기화 (Lambda 환경에서는 싱글톤 패턴 사용)
-try:
-    import mediapipe as mp
-    mp_face_mesh = mp.solutions.face_mesh
-    from mediapipe.python.solutions.face_mesh_connections import (
-        FACEMESH_LEFT_IRIS, FACEMESH_RIGHT_IRIS,
-    )
-except ImportError:
-    # MediaPipe가 없는 경우 대체 구현
-    mp_face_mesh = None
-    FACEMESH_LEFT_IRIS = []
-    FACEMESH_RIGHT_IRIS = []
+# AWS 서비스 클라이언트 (처음 쓸 때 생성, 이후 재사용)
+_s3_client = None
+_table = None
+
+def get_s3_client():
+    """S3 클라이언트 싱글톤"""
+    global _s3_client
+    if _s3_client is None:
+        with _timed('import_boto3'):
+            import boto3
+        with _timed('s3_client'):
+            _s3_client = boto3.client('s3')
+    return _s3_client
+
+def get_table():
+    """DynamoDB 테이블 참조 싱글톤 (EYE_TABLE=memory 면 MemoryTable)"""
+    global _table
+    if _table is None and TABLE_BACKEND == 'memory':
+        _table = MemoryTable()
+    if _table is None:
+        with _timed('import_boto3'):
+            import boto3
+        with _timed('dynamodb_table'):
+            _table = boto3.resource('dynamodb').Table(DYNAMODB_TABLE)
+    return _table
+
+# MediaPipe (처음 쓸 때 import, 없으면 None — Lambda 환경에서는 싱글톤 패턴 사용)
+_mp_face_mesh: Any = False  # False: 아직 import 안 함 / None: MediaPipe 없음
+
+def get_face_mesh_module():
+    """mediapipe face_mesh 모듈 (없으면 None)"""
+    global _mp_face_mesh
+    if _mp_face_mesh is False:
+        with _timed('import_mediapipe'):
+            try:
+                import mediapipe as mp
+                _mp_face_mesh = mp.solutions.face_mesh
+            except ImportError:
+                # MediaPipe가 없는 경우 대체 구현
+                _mp_face_mesh = None
+    return _mp_face_mesh
 
 # 전역 변수로 FaceMesh 모델 캐시
 _face_mesh_model = None
@@ -42,21 +109,36 @@ _face_mesh_model = None
 def get_face_mesh():
     """FaceMesh 모델 싱글톤"""
     global _face_mesh_model
+    mp_face_mesh = get_face_mesh_module()
     if _face_mesh_model is None and mp_face_mesh is not None:
-        _face_mesh_model = mp_face_mesh.FaceMesh(
-            static_image_mode=False,
-            max_num_faces=1,
-            refine_landmarks=True,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5,
-        )
+        with _timed('face_mesh_create'):
+            _face_mesh_model = mp_face_mesh.FaceMesh(
+                static_image_mode=False,
+                max_num_faces=1,
+                refine_landmarks=True,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5,
+            )
     return _face_mesh_model
 
-# 유틸리티 함수들
-def _px(lm, w: int, h: int) -> Tuple[float, float]:
-    """랜드마크를 픽셀 좌표로 변환"""
-    return lm.x * w, lm.y * h
+# roi=True 재검출용 정지 영상 모드 FaceMesh 캐시 (웜 컨테이너의 요청들이 같이 쓴다)
+_redetect_face_mesh_model = None
+
+def get_redetect_face_mesh():
+    """재검출용 FaceMesh 싱글톤 (처음 재검출할 때 생성, MediaPipe 가 없으면 None)"""
+    global _redetect_face_mesh_model
+    mp_face_mesh = get_face_mesh_module()
+    if _redetect_face_mesh_model is None and mp_face_mesh is not None:
+        with _timed('redetect_face_mesh_create'):
+            _redetect_face_mesh_model = mp_face_mesh.FaceMesh(
+                static_image_mode=True,
+                max_num_faces=1,
+                refine_landmarks=True,
+                min_detection_confidence=0.5,
+            )
+    return _redetect_face_mesh_model
 
+# 유틸리티 함수들
 def _uniq_indices(conns: List[Tuple[int, int]]) -> List[int]:
     """연결점들에서 고유 인덱스 추출"""
     s = set()
@@ -65,59 +147,30 @@ def _uniq_indices(conns: List[Tuple[int, int]]) -> List[int]:
         s.add(b)
     return sorted(list(s))
 
-# 홍채 랜드마크 인덱스
-LEFT_IRIS_IDXS = _uniq_indices(FACEMESH_LEFT_IRIS) if FACEMESH_LEFT_IRIS else []
-RIGHT_IRIS_IDXS = _uniq_indices(FACEMESH_RIGHT_IRIS) if FACEMESH_RIGHT_IRIS else []
-
-# 눈 랜드마크 인덱스
-L_CORNER_OUT, L_CORNER_IN = 33, 133
-L_LID_TOP, L_LID_BOT = 159, 145
-R_CORNER_OUT, R_CORNER_IN = 362, 263
-R_LID_TOP, R_LID_BOT = 386, 374
-
-def _iris_center(landmarks, idxs, w, h) -> Tuple[float, float]:
-    """홍채 중심점 계산"""
-    xs, ys = [], []
-    for i in idxs:
-        x, y = _px(landmarks[i], w, h)
-        xs.append(x)
-        ys.append(y)
-    if not xs:
-        return float("nan"), float("nan")
-    return float(np.mean(xs)), float(np.mean(ys))
-
-def _eye_metrics(landmarks, w, h, is_left=True) -> Dict[str, float]:
-    """눈 지표 계산"""
-    if is_left:
-        c_out, c_in = L_CORNER_OUT, L_CORNER_IN
-        lid_top, lid_bot = L_LID_TOP, L_LID_BOT
-        iris_idxs = LEFT_IRIS_IDXS
-    else:
-        c_out, c_in = R_CORNER_OUT, R_CORNER_IN
-        lid_top, lid_bot = R_LID_TOP, R_LID_BOT
-        iris_idxs = RIGHT_IRIS_IDXS
+# 비동기 작업 진행률 보고 간격(분석 프레임 수)
+PROGRESS_EVERY = 100
 
-    x_out, y_out = _px(landmarks[c_out], w, h)
-    x_in, y_in = _px(landmarks[c_in], w, h)
-    eye_width = max(1e-6, math.hypot(x_out - x_in, y_out - y_in))
+# 눈 지표 계산 엔진 (눈꼬리/눈꺼풀/홍채 점만 배열로 뽑아 벡터 계산) — 홍채 인덱스가 MediaPipe 에서 오므로 lazy
+_eye_metrics: Optional[EyeMetricsEngine] = None
 
-    x_t, y_t = _px(landmarks[lid_top], w, h)
-    x_b, y_b = _px(landmarks[lid_bot], w, h)
-    eyelid_dist = math.hypot(x_t - x_b, y_t - y_b)
-
-    eye_open = eyelid_dist / eye_width
-    ix, iy = _iris_center(landmarks, iris_idxs, w, h)
-
-    cx, cy = (x_out + x_in) / 2.0, (y_out + y_in) / 2.0
-    eye_height = max(1e-6, eyelid_dist)
-    v_offset_norm = (iy - cy) / eye_height
+def get_eye_metrics() -> EyeMetricsEngine:
+    """EyeMetricsEngine 싱글톤 (홍채 랜드마크 인덱스는 MediaPipe 연결 정보에서)"""
+    global _eye_metrics
+    if _eye_metrics is None:
+        left_iris: List[Tuple[int, int]] = []
+        right_iris: List[Tuple[int, int]] = []
+        if get_face_mesh_module() is not None:
+            from mediapipe.python.solutions.face_mesh_connections import (
+                FACEMESH_LEFT_IRIS, FACEMESH_RIGHT_IRIS,
+            )
+            left_iris, right_iris = FACEMESH_LEFT_IRIS, FACEMESH_RIGHT_IRIS
+        _eye_metrics = EyeMetricsEngine(
+            _uniq_indices(left_iris) if left_iris else [],
+            _uniq_indices(right_iris) if right_iris else [],
+        )
+    return _eye_metrics
 
-    return {
-        "iris_cx": ix, 
-        "iris_cy": iy,
-        "eye_open": eye_open,
-        "v_offset": v_offset_norm,
-    }
+EYE_METRIC_KEYS = ("iris_cx", "iris_cy", "eye_open", "v_offset")
 
 def analyze_frame(frame_bgr: np.ndarray) -> Dict[str, Any]:
     """단일 프레임 분석"""
@@ -137,8 +190,7 @@ def analyze_frame(frame_bgr: np.ndarray) -> Dict[str, Any]:
             return {"detected": False, "reason": "no_face"}
 
         landmarks = results.multi_face_landmarks[0].landmark
-        left_metrics = _eye_metrics(landmarks, w, h, is_left=True)
-        right_metrics = _eye_metrics(landmarks, w, h, is_left=False)
+        left_metrics, right_metrics = get_eye_metrics().frame_metrics(landmarks, w, h, keys=EYE_METRIC_KEYS)
 
         eye_open = float(np.nanmean([left_metrics["eye_open"], right_metrics["eye_open"]]))
         v_offset = float(np.nanmean([left_metrics["v_offset"], right_metrics["v_offset"]]))
@@ -162,38 +214,10 @@ def analyze_frame(frame_bgr: np.ndarray) -> Dict[str, Any]:
     except Exception as e:
         return {"detected": False, "reason": f"analysis_error: {str(e)}"}
 
-def count_blinks(openness_series: List[float], thresh: float = 0.18, min_frames: int = 2) -> int:
-    """블링크 카운트"""
-    closed = False
-    hold = 0
-    count = 0
-    
-    for v in openness_series:
-        if np.isnan(v):
-            if closed and hold >= min_frames:
-                count += 1
-            closed, hold = False, 0
-            continue
-            
-        if v < thresh:
-            if closed:
-                hold += 1
-            else:
-                closed = True
-                hold = 1
-        else:
-            if closed and hold >= min_frames:
-                count += 1
-            closed, hold = False, 0
-            
-    if closed and hold >= min_frames:
-        count += 1
-    return count
-
 def upload_to_s3(data: bytes, key: str, content_type: str = 'application/octet-stream') -> str:
     """S3에 데이터 업로드"""
     try:
-        s3_client.put_object(
+        get_s3_client().put_object(
             Bucket=S3_BUCKET,
             Key=key,
             Body=data,
@@ -203,48 +227,153 @@ def upload_to_s3(data: bytes, key: str, content_type: str = 'application/octet-s
     except Exception as e:
         raise Exception(f"S3 upload failed: {str(e)}")
 
-def download_from_s3(key: str) -> bytes:
+def download_from_s3(key: str, bucket: str = S3_BUCKET) -> bytes:
     """S3에서 데이터 다운로드"""
     try:
-        response = s3_client.get_object(Bucket=S3_BUCKET, Key=key)
+        response = get_s3_client().get_object(Bucket=bucket, Key=key)
         return response['Body'].read()
     except Exception as e:
         raise Exception(f"S3 download failed: {str(e)}")
 
+def download_s3_to_spool(key: str, spool: VideoSpool, bucket: str = S3_BUCKET) -> int:
+    """S3 객체를 VideoSpool(memfd, 큰 영상은 /tmp)로 스트리밍 다운로드 (bytes 로 통째로 올리지 않음). 바이트 수 반환
+
+    spool 은 seek 이 없어 전송 관리자가 조각을 순서대로 쓴다. sha256 도 받는 동안 계산된다(spool.digest()).
+    """
+    try:
+        get_s3_client().download_fileobj(bucket, key, spool)
+        return spool.size
+    except Exception as e:
+        raise Exception(f"S3 download failed: {str(e)}")
+
+def copy_within_s3(src_bucket: str, src_key: str, key: str) -> str:
+    """다른 버킷의 객체를 S3 안에서 복사 (데이터가 Lambda 를 거치지 않음)"""
+    try:
+        get_s3_client().copy({'Bucket': src_bucket, 'Key': src_key}, S3_BUCKET, key)
+        return f"s3://{S3_BUCKET}/{key}"
+    except Exception as e:
+        raise Exception(f"S3 copy failed: {str(e)}")
+
+def _to_dynamo(value: Any) -> Any:
+    """DynamoDB 저장용 변환: float → Decimal (NaN/inf 는 DynamoDB 가 받지 않으므로 None)"""
+    return json.loads(json.dumps(value), parse_float=Decimal, parse_constant=lambda _: None)
+
+def _json_default(value: Any) -> Any:
+    """DynamoDB 에서 읽은 Decimal 을 응답 JSON 으로"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"not JSON serializable: {type(value).__name__}")
+
 def save_to_dynamodb(analysis_id: str, user_id: str, result_data: Dict[str, Any]) -> None:
     """DynamoDB에 분석 결과 저장"""
     try:
-        table.put_item(
+        get_table().put_item(
             Item={
                 'analysisId': analysis_id,
                 'testType': 'eye-tracking',
                 'userId': user_id,
                 'timestamp': int(datetime.now().timestamp()),
-                'results': result_data,
+                'results': _to_dynamo(result_data),
                 'status': 'completed'
             }
         )
     except Exception as e:
         raise Exception(f"DynamoDB save failed: {str(e)}")
 
+def _prewarm() -> None:
+    """init 단계에서 AWS 클라이언트 생성 + FaceMesh 더미 추론 (그래프/모델 로드를 첫 요청 전에 끝낸다)"""
+    get_s3_client()
+    get_table()
+    get_eye_metrics()
+    face_mesh = get_face_mesh()
+    if face_mesh is not None:
+        with _timed('face_mesh_warmup'):
+            face_mesh.process(np.zeros((64, 64, 3), dtype=np.uint8))
+
+def _rss_mb() -> float:
+    """현재 RSS (MB)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return float('nan')
+
+def _peak_rss_mb() -> float:
+    """프로세스 최대 RSS (MB, linux ru_maxrss 는 KB). 웜 컨테이너에서는 이전 호출까지 포함한 최고치"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+# 이번 호출의 구간 병렬 분석 자식 프로세스별 최대 RSS (MB). 자식은 forkserver 에서 갈라져
+# 이 프로세스의 RUSAGE_CHILDREN 에 잡히지 않으므로 각 자식이 결과와 함께 보고한 값을 모은다.
+_segment_peak_rss_mb: List[float] = []
+
 def lambda_handler(event, context):
+    """호출마다 소요 시간/메모리를 측정해 로그(JSON 한 줄)와 응답 헤더로 남긴다.
+
+    컨테이너의 첫 호출에는 init 단계별 소요 시간(INIT_TIMINGS_MS)과 첫 호출 중 lazy 초기화한 항목도 함께 남긴다.
+    """
+    global _cold
+    cold, _cold = _cold, False
+    lazy_before = dict(INIT_TIMINGS_MS)
+    t0 = time.perf_counter()
+    rss_start, peak_start = _rss_mb(), _peak_rss_mb()
+    _segment_peak_rss_mb.clear()
+    request_meta: Dict[str, Any] = {}
+    response = _handle(event, context, request_meta)
+
+    peak = _peak_rss_mb()
+    metrics = {
+        'action': request_meta.get('action'),  # API Gateway 요청은 body 안의 action
+        'status': response.get('statusCode'),
+        'duration_ms': round((time.perf_counter() - t0) * 1000.0, 1),
+        'rss_start_mb': round(rss_start, 1),
+        'rss_end_mb': round(_rss_mb(), 1),
+        'peak_rss_mb': round(peak, 1),
+        'peak_grew': peak > peak_start,  # False 면 이번 호출의 최고치는 이전 호출 최고치 이하
+        'cold_start': cold,
+    }
+    if _segment_peak_rss_mb:
+        # 구간 자식은 동시에 돌므로 합이 함수 메모리 한도와 비교할 값 (이 프로세스의 peak_rss_mb 에 더해서)
+        metrics['segment_peak_rss_max_mb'] = round(max(_segment_peak_rss_mb), 1)
+        metrics['segment_peak_rss_sum_mb'] = round(sum(_segment_peak_rss_mb), 1)
+    if cold:
+        metrics['init_ms'] = INIT_MS
+        metrics['init_timings_ms'] = INIT_PHASE_TIMINGS_MS
+    # 이번 호출 중 처음 만든 lazy 항목 (prewarm 을 끈 경우 첫 요청이 떠안은 초기화 비용)
+    lazy = {k: round(v - lazy_before.get(k, 0.0), 2) for k, v in INIT_TIMINGS_MS.items() if v != lazy_before.get(k)}
+    if lazy:
+        metrics['lazy_init_ms'] = lazy
+    print(json.dumps({'invocation_metrics': metrics}))
+    response['headers'] = {
+        **(response.get('headers') or {}),
+        'X-Invocation-Duration-Ms': str(metrics['duration_ms']),
+        'X-Invocation-Peak-Rss-Mb': str(metrics['peak_rss_mb']),
+    }
+    return response
+
+def _handle(event, context, request_meta: Optional[Dict[str, Any]] = None):
     """
-    AWS Lambda 메인 핸들러
+    AWS Lambda 메인 핸들러 (request_meta 를 주면 파싱한 action 을 기록 — 호출 지표용)
     
     예상 입력:
     {
-        "action": "analyze_image" | "analyze_video" | "process_file",
+        "action": "analyze_image" | "analyze_video" | "process_file" | "submit_video" | "get_status" | "cache_stats",
         "file_data": "base64_encoded_data",
         "file_name": "file.mp4",
         "user_id": "user123",
         "parameters": {
             "step": 1,
+            "target_fps": null,        # 지정 시 step 대신 초당 분석 프레임 수로 샘플링
+            "sampling": "grab",        # grab(건너뛸 프레임 디코딩만) | seek(키프레임 탐색)
+            "roi": false,              # 얼굴 주변만 잘라 축소 입력으로 추적
+            "trace_format": "csv",     # csv | npz(float32 압축 컬럼 + 메타데이터)
             "vpp_thresh": 0.06,
             "blink_thresh": 0.18,
             "max_frames": 12000
         }
     }
     """
+    if request_meta is None:
+        request_meta = {}
     try:
         # CORS 헤더
         headers = {
@@ -262,6 +391,17 @@ def lambda_handler(event, context):
                 'body': json.dumps({'message': 'OK'})
             }
 
+        # SQS 큐로 받은 비동기 작업 (배치)
+        if 'Records' in event:
+            request_meta['action'] = 'run_video_job'
+            for record in event['Records']:
+                handle_run_video_job(json.loads(record['body']).get('job_id'), headers)
+            return {
+                'statusCode': 200,
+                'headers': headers,
+                'body': json.dumps({'processed': len(event['Records'])})
+            }
+
         # 요청 본문 파싱
         if 'body' in event:
             if event.get('isBase64Encoded', False):
@@ -274,6 +414,7 @@ def lambda_handler(event, context):
 
         # 필수 파라미터 확인
         action = request_data.get('action')
+        request_meta['action'] = action
         if not action:
             return {
                 'statusCode': 400,
@@ -291,6 +432,18 @@ def lambda_handler(event, context):
             return handle_analyze_video(request_data, user_id, analysis_id, headers)
         elif action == 'process_s3_file':
             return handle_process_s3_file(request_data, user_id, analysis_id, headers)
+        elif action == 'submit_video':
+            return handle_submit_video(request_data, user_id, analysis_id, headers)
+        elif action == 'get_status':
+            return handle_get_status(request_data, user_id, headers)
+        elif action == 'run_video_job':
+            return handle_run_video_job(request_data.get('job_id'), headers)
+        elif action == 'cache_stats':
+            return {
+                'statusCode': 200,
+                'headers': headers,
+                'body': json.dumps({'cache': result_cache.stats()})
+            }
         else:
             return {
                 'statusCode': 400,
@@ -322,12 +475,26 @@ def handle_analyze_image(request_data: Dict, user_id: str, analysis_id: str, hea
             }
 
         # Base64 디코딩
-        image_data = base64.b64decode(file_data)
-        
+        return _analyze_image_data(base64.b64decode(file_data), user_id, analysis_id, headers)
+
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': headers,
+            'body': json.dumps({'error': f'Image analysis failed: {str(e)}'})
+        }
+
+def _analyze_image_data(image_data: bytes, user_id: str, analysis_id: str, headers: Dict) -> Dict:
+    """이미지 바이트 분석 → DynamoDB 기록 → 응답 (base64 요청 / S3 객체 공용)"""
+    # 같은 이미지는 캐시된 결과 사용 (디코딩/추론 생략)
+    image_key = cache_key('image', content_hash(image_data))
+    result = result_cache.get(image_key)
+    cached = result is not None
+    if result is None:
         # OpenCV로 이미지 디코딩
         nparr = np.frombuffer(image_data, np.uint8)
         frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
+
         if frame is None:
             return {
                 'statusCode': 400,
@@ -335,34 +502,77 @@ def handle_analyze_image(request_data: Dict, user_id: str, analysis_id: str, hea
                 'body': json.dumps({'error': 'Invalid image data'})
             }
 
-        # 분석 수행
+        # 분석 수행 (MediaPipe 미탑재/분석 오류 결과는 캐시하지 않는다)
         result = analyze_frame(frame)
-        
-        # 결과 저장
-        save_to_dynamodb(analysis_id, user_id, {
-            'type': 'image',
-            'analysis': result
+        if result.get('detected') or result.get('reason') == 'no_face':
+            result_cache.put(image_key, result)
+
+    # 결과 저장
+    save_to_dynamodb(analysis_id, user_id, {
+        'type': 'image',
+        'analysis': result
+    })
+
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': json.dumps({
+            'analysis_id': analysis_id,
+            'result': result,
+            'cached': cached,
+            'status': 'success'
         })
+    }
 
-        return {
-            'statusCode': 200,
-            'headers': headers,
-            'body': json.dumps({
-                'analysis_id': analysis_id,
-                'result': result,
-                'status': 'success'
-            })
-        }
+def _video_options(params: Dict) -> Tuple[Dict[str, Any], Optional[str]]:
+    """동영상 분석 파라미터 추출/검증 → (옵션, 오류 메시지 또는 None)"""
+    opts = {
+        'step': params.get('step', 1),
+        'vpp_thresh': params.get('vpp_thresh', 0.06),
+        'blink_thresh': params.get('blink_thresh', 0.18),
+        'max_frames': params.get('max_frames', 12000),
+        'blink_min_frames': params.get('blink_min_frames', 2),
+        'target_fps': params.get('target_fps'),
+        'sampling': params.get('sampling', 'grab'),
+        'roi': bool(params.get('roi', False)),
+        'trace_format': params.get('trace_format', 'csv'),
+        # 구간 병렬 분석 프로세스 수 (Lambda vCPU 는 메모리 설정에 비례, 코어 수로 제한)
+        'segments': max(1, min(int(params.get('segments', 1) or 1), os.cpu_count() or 1)),
+        # 적응형 샘플링 (눈 움직임에 따라 분석 간격 조절, early_stop 이면 요약이 수렴할 때 중단)
+        'adaptive': bool(params.get('adaptive', False)),
+        'early_stop': bool(params.get('early_stop', False)),
+        'vpp_tol': float(params.get('vpp_tol', 0.01)),
+        'blink_tol': float(params.get('blink_tol', 3.0)),
+    }
+    if opts['sampling'] not in SAMPLING_MODES:
+        return opts, f"Unknown sampling mode: {opts['sampling']}"
+    if opts['trace_format'] not in TRACE_FORMATS:
+        return opts, f"Unknown trace format: {opts['trace_format']}"
+    return opts, None
 
-    except Exception as e:
-        return {
-            'statusCode': 500,
-            'headers': headers,
-            'body': json.dumps({'error': f'Image analysis failed: {str(e)}'})
-        }
+def _video_cache_key(digest: str, user_id: str, opts: Dict[str, Any], source: Optional[str] = None) -> str:
+    # 같은 사용자가 같은 영상을 같은 파라미터로 다시 보내면(재시도 등) 이전 응답을 그대로 반환.
+    # S3 객체를 분석한 응답은 video_path 가 그 원본 키일 수 있으므로 source(s3://버킷/키)가 같을 때만 재사용한다
+    # (다른 키로 보낸 같은 영상에 이전 요청의 키를 돌려주면, 클라이언트가 그 키를 지우거나 덮어쓸 수 있다).
+    params = {'user_id': user_id, **opts}
+    if source:
+        params['source'] = source
+    return cache_key('video', digest, params)
+
+def _cached_video_response(video_cache_key: str, headers: Dict) -> Optional[Dict]:
+    """캐시 적중 시 이전 응답 (디코딩/추론/S3 업로드/DynamoDB 기록 모두 생략)"""
+    cached_body = result_cache.get(video_cache_key)
+    if cached_body is None:
+        return None
+    cached_body['cached'] = True
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': json.dumps(cached_body)
+    }
 
 def handle_analyze_video(request_data: Dict, user_id: str, analysis_id: str, headers: Dict) -> Dict:
-    """동영상 분석 처리"""
+    """동영상 분석 처리 (요청 본문의 base64 file_data)"""
     try:
         file_data = request_data.get('file_data')
         if not file_data:
@@ -374,164 +584,525 @@ def handle_analyze_video(request_data: Dict, user_id: str, analysis_id: str, hea
 
         # 파라미터 추출
         params = request_data.get('parameters', {})
-        step = params.get('step', 1)
-        vpp_thresh = params.get('vpp_thresh', 0.06)
-        blink_thresh = params.get('blink_thresh', 0.18)
-        max_frames = params.get('max_frames', 12000)
-        blink_min_frames = params.get('blink_min_frames', 2)
+        opts, error = _video_options(params)
+        if error:
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': json.dumps({'error': error})
+            }
 
-        # Base64 디코딩 및 임시 파일로 저장
+        # Base64 디코딩
         video_data = base64.b64decode(file_data)
-        
+        video_cache_key = _video_cache_key(content_hash(video_data), user_id, opts)
+        cached = _cached_video_response(video_cache_key, headers)
+        if cached is not None:
+            return cached
+
         # S3에 원본 비디오 저장
         video_key = f"users/{user_id}/eye/{analysis_id}/raw_video.mp4"
         upload_to_s3(video_data, video_key, 'video/mp4')
 
-        # 임시 파일로 비디오 처리
-        import tempfile
-        with tempfile.NamedTemporaryFile(delete=True, suffix='.mp4') as tmp:
-            tmp.write(video_data)
-            tmp.flush()
-            
-            cap = cv2.VideoCapture(tmp.name)
-            if not cap.isOpened():
-                return {
-                    'statusCode': 400,
-                    'headers': headers,
-                    'body': json.dumps({'error': 'Cannot open video file'})
-                }
-
-            fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
-
-            rows = []
-            frame_idx = 0
-            processed = 0
-            face_mesh = get_face_mesh()
-
-            while processed < max_frames:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                    
-                if frame_idx % step != 0:
-                    frame_idx += 1
-                    continue
-
-                t_sec = frame_idx / max(1e-6, fps)
-                
-                if face_mesh:
-                    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    results = face_mesh.process(rgb)
-                    
-                    if results.multi_face_landmarks:
-                        landmarks = results.multi_face_landmarks[0].landmark
-                        left_metrics = _eye_metrics(landmarks, width, height, is_left=True)
-                        right_metrics = _eye_metrics(landmarks, width, height, is_left=False)
-                        
-                        v_offset = float(np.nanmean([left_metrics["v_offset"], right_metrics["v_offset"]]))
-                        eye_open = float(np.nanmean([left_metrics["eye_open"], right_metrics["eye_open"]]))
-                        
-                        rows.append({
-                            "frame_idx": frame_idx,
-                            "time_sec": t_sec,
-                            "L_iris_cx": left_metrics["iris_cx"],
-                            "L_iris_cy": left_metrics["iris_cy"],
-                            "L_eye_open": left_metrics["eye_open"],
-                            "L_v_offset": left_metrics["v_offset"],
-                            "R_iris_cx": right_metrics["iris_cx"],
-                            "R_iris_cy": right_metrics["iris_cy"],
-                            "R_eye_open": right_metrics["eye_open"],
-                            "R_v_offset": right_metrics["v_offset"],
-                            "eye_open": eye_open,
-                            "v_offset": v_offset,
-                        })
-                    else:
-                        rows.append({
-                            "frame_idx": frame_idx,
-                            "time_sec": t_sec,
-                            "L_iris_cx": np.nan, "L_iris_cy": np.nan,
-                            "L_eye_open": np.nan, "L_v_offset": np.nan,
-                            "R_iris_cx": np.nan, "R_iris_cy": np.nan,
-                            "R_eye_open": np.nan, "R_v_offset": np.nan,
-                            "eye_open": np.nan, "v_offset": np.nan,
-                        })
-
-                processed += 1
-                frame_idx += 1
-
-            cap.release()
-
-        if not rows:
+        # 메모리 파일(memfd, 큰 영상은 /tmp 임시 파일)로 비디오 처리
+        with VideoSpool.from_bytes(video_data) as spool:
+            del video_data
+            return _analyze_video_file(
+                spool.path, video_key, opts, params, user_id, analysis_id, headers, video_cache_key,
+            )
+
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': headers,
+            'body': json.dumps({'error': f'Video analysis failed: {str(e)}'})
+        }
+
+def _analyze_video_file(
+    video_path: str, video_key: str, opts: Dict[str, Any], params: Dict, user_id: str, analysis_id: str,
+    headers: Dict, video_cache_key: str, progress: Optional[Callable[[int, int], None]] = None,
+    save_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict:
+    """로컬 동영상 파일 분석 → trace S3 업로드 → DynamoDB 기록 → 응답 (base64 요청 / S3 객체 / 비동기 작업 공용)
+
+    progress 를 주면 순차 분석 중 PROGRESS_EVERY 프레임마다 (처리한 프레임, 예상 프레임),
+    구간 병렬 분석이면 구간이 끝날 때마다 (끝난 구간, 전체 구간) 으로 호출한다.
+    save_result 를 주면 save_to_dynamodb 대신 결과를 넘긴다 (비동기 작업은 작업 항목을 갱신).
+    """
+    step, target_fps, max_frames = opts['step'], opts['target_fps'], opts['max_frames']
+    sampling, roi, trace_format = opts['sampling'], opts['roi'], opts['trace_format']
+    vpp_thresh = opts['vpp_thresh']
+
+    # 디코더 백엔드는 함수 환경변수 EYE_DECODER / EYE_DECODER_THREADS (eye_engine.decoder)
+    cap = open_video(video_path)
+    if not cap.isOpened():
+        return {
+            'statusCode': 400,
+            'headers': headers,
+            'body': json.dumps({'error': 'Cannot open video file'})
+        }
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+
+    # 프레임별 랜드마크 점을 미리 잡아 둔 컬럼 배열에 기록 — 지표는 루프 뒤 한 번에 계산
+    trace = TraceBuffer.for_capture(
+        get_eye_metrics(), cap, fps, step=step, target_fps=target_fps, max_frames=max_frames,
+        summary=StreamingSummary(blink_thresh=opts['blink_thresh'], blink_min_frames=opts['blink_min_frames']),
+    )
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    # 적응형 샘플링은 다음 분석 프레임을 직전 결과로 정하므로 순차로만 분석
+    plan = plan_segments(
+        frame_count, fps, 1 if opts['adaptive'] else opts['segments'],
+        step=step, target_fps=target_fps, max_frames=max_frames,
+    )
+    if len(plan) > 1 and get_face_mesh_module() is not None:
+        # 구간마다 자식 프로세스(자체 FaceMesh)로 병렬 분석 → frame_idx 순으로 이어 붙인다
+        cap.release()
+        results = run_segments_in_processes(
+            video_path, plan, get_eye_metrics(), fps, step=step, target_fps=target_fps, sampling=sampling, roi=roi,
+            progress=progress,
+        )
+        _segment_peak_rss_mb.extend(r['peak_rss_mb'] for r in results if r.get('peak_rss_mb') is not None)
+        tracking = merge_segments(trace, results)
+        adaptive_report = None
+    else:
+        face_mesh = get_face_mesh()
+        # 디코딩 → 추론 → trace 기록을 단계 스레드로 겹쳐 돌린다 (적응형 샘플링은 직전 결과가 필요해 inline)
+        # PyAV 디코더면 프레임이 이미 RGB 라 FaceMesh 입력 변환이 없다
+        rgb = frames_are_rgb(cap)
+        decoder = decoder_info(cap)
+        pipeline = FramePipeline(depth=0 if opts['adaptive'] else None, rgb=rgb)
+        buffers = pipeline.decode_buffers()
+        # roi=True 면 직전 얼굴 박스 주변만 잘라 축소 입력 (랜드마크는 원본 좌표로 복원)
+        tracker = FaceLandmarkTracker(
+            face_mesh, roi=roi, buffers=FrameBuffers(rgb=rgb), detector=get_redetect_face_mesh() if roi else None,
+        ) if face_mesh else None
+        sampler = AdaptiveSampler(
+            AdaptiveConfig(opts['early_stop'], opts['vpp_tol'], opts['blink_tol']), trace,
+            step=step, target_fps=target_fps, blink_thresh=opts['blink_thresh'], vpp_thresh=vpp_thresh,
+        ) if opts['adaptive'] and tracker else None
+
+        if tracker:
+            # 건너뛸 프레임은 grab()만(또는 seek) → 분석 프레임만 retrieve
+            if sampler is not None:
+                frames = sampler.frames(cap, max_frames=max_frames, mode=sampling, buffers=buffers)
+            else:
+                frames = iter_sampled_frames(
+                    cap, fps, step=step, target_fps=target_fps, max_frames=max_frames, mode=sampling,
+                    buffers=buffers,
+                )
+            pipeline.run(frames, tracker, trace, sampler=sampler, progress=progress, progress_every=PROGRESS_EVERY)
+
+        cap.release()
+        tracking = {**tracker.stats(), "decoder": decoder, "pipeline": pipeline.stats()} if tracker else None
+        adaptive_report = sampler.report(frame_count) if sampler is not None else None
+
+    if not len(trace):
+        return {
+            'statusCode': 400,
+            'headers': headers,
+            'body': json.dumps({'error': 'No valid frames processed'})
+        }
+
+    # 프레임 배치 지표 계산 → trace 생성 (미검출 프레임은 NaN, frame_idx 순이라 정렬 불필요)
+    trace.finalize()
+    trace_ext, trace_ctype = TRACE_FILE_TYPES[trace_format]
+    trace_data = trace.encode(trace_format, meta={
+        'analysis_id': analysis_id,
+        'fps': float(fps),
+        'width': width,
+        'height': height,
+        'params': params,
+    })
+
+    # S3에 trace 저장 (csv: 기존 CSV / npz: float32 압축 컬럼 + 메타데이터)
+    trace_key = f"users/{user_id}/eye/{analysis_id}/analysis_results{trace_ext}"
+    upload_to_s3(trace_data, trace_key, trace_ctype)
+    csv_key = trace_key if trace_format == 'csv' else None
+
+    # 통계 계산 — 분석 중 누적한 스트리밍 요약 (O(1) 메모리, eye_engine.summary 오차 한계)
+    streamed = trace.summary.result()
+    v_ptp = streamed["v_ptp"]
+    v_std = streamed["v_std"]
+    blink_count = streamed["blink_count"]
+    dur_sec = streamed["duration_sec"]
+    blink_rate_per_min = (blink_count / dur_sec * 60.0) if (dur_sec and not math.isnan(dur_sec) and dur_sec > 0) else float("nan")
+
+    psp_suspected = bool(v_ptp < vpp_thresh) if not math.isnan(v_ptp) else False
+    psp_reason = f"vertical_peak_to_peak({v_ptp:.3f}) < threshold({vpp_thresh:.3f})" if psp_suspected else "criteria_not_met"
+
+    summary = {
+        "frames_processed": len(trace),
+        "fps": fps,
+        "duration_sec_est": dur_sec,
+        "vertical_offset_std": v_std,
+        "vertical_peak_to_peak": v_ptp,
+        "blink_count": blink_count,
+        "blink_rate_per_min": blink_rate_per_min,
+        "psp_suspected": psp_suspected,
+        "psp_rule_reason": psp_reason,
+        "video_meta": {"width": width, "height": height, "fps": fps},
+        "tracking": tracking,
+        "trace_buffer": trace.stats(),
+        "summary_exact": streamed["exact"],
+        "adaptive_sampling": adaptive_report,  # 분석/건너뛴 프레임 수와 이유, 조기 중단 여부
+    }
+
+    # 결과 저장
+    result_data = {
+        'type': 'video',
+        'summary': summary,
+        'video_path': video_key,
+        'csv_path': csv_key,
+        'trace_path': trace_key,
+        'trace_format': trace_format,
+    }
+    if save_result is not None:
+        save_result(result_data)
+    else:
+        save_to_dynamodb(analysis_id, user_id, result_data)
+
+    response_body = {
+        'analysis_id': analysis_id,
+        'summary': summary,
+        'video_path': video_key,
+        'csv_path': csv_key,
+        'trace_path': trace_key,
+        'trace_format': trace_format,
+        'cached': False,
+        'status': 'success'
+    }
+    result_cache.put(video_cache_key, response_body)
+
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': json.dumps(response_body)
+    }
+
+def handle_process_s3_file(request_data: Dict, user_id: str, analysis_id: str, headers: Dict) -> Dict:
+    """S3에 저장된 파일 처리
+
+    base64 로 다시 감싸지 않는다: 이미지는 바이트 그대로, 동영상은 VideoSpool(memfd, 큰 영상은 /tmp)로 스트리밍 다운로드해 분석한다.
+    원본이 이미 S3_BUCKET 에 있으면 raw_video 로 다시 올리지 않고 그 키를 video_path 로 기록한다.
+    """
+    try:
+        s3_key = request_data.get('s3_key')
+        if not s3_key:
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': json.dumps({'error': 'Missing s3_key'})
+            }
+        s3_bucket = request_data.get('s3_bucket') or S3_BUCKET
+
+        # 파일 타입에 따라 처리
+        file_name = request_data.get('file_name') or s3_key
+        if file_name.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')):
+            # 이미지 처리 (작으므로 메모리로)
+            return _analyze_image_data(download_from_s3(s3_key, s3_bucket), user_id, analysis_id, headers)
+
+        # 비디오 처리
+        params = request_data.get('parameters', {})
+        opts, error = _video_options(params)
+        if error:
             return {
                 'statusCode': 400,
                 'headers': headers,
-                'body': json.dumps({'error': 'No valid frames processed'})
+                'body': json.dumps({'error': error})
             }
 
-        # CSV 생성
-        df = pd.DataFrame(rows).sort_values("frame_idx").reset_index(drop=True)
-        csv_buffer = io.StringIO()
-        df.to_csv(csv_buffer, index=False)
-        csv_data = csv_buffer.getvalue().encode('utf-8')
-        
-        # S3에 CSV 저장
-        csv_key = f"users/{user_id}/eye/{analysis_id}/analysis_results.csv"
-        upload_to_s3(csv_data, csv_key, 'text/csv')
-
-        # 통계 계산
-        v_series = df["v_offset"].to_numpy(dtype=float)
-        eye_open_series = df["eye_open"].to_numpy(dtype=float)
-        v_valid = v_series[~np.isnan(v_series)]
-        open_valid = eye_open_series[~np.isnan(eye_open_series)]
-
-        def robust_ptp(x: np.ndarray) -> float:
-            if x.size == 0:
-                return float("nan")
-            lo, hi = np.percentile(x, [5, 95])
-            return float(hi - lo)
-
-        v_ptp = robust_ptp(v_valid)
-        v_std = float(np.nanstd(v_valid)) if v_valid.size else float("nan")
-        blink_count = count_blinks(open_valid.tolist(), thresh=blink_thresh, min_frames=blink_min_frames)
-        
-        dur_sec = float(df["time_sec"].dropna().max() - df["time_sec"].dropna().min()) if df["time_sec"].notna().any() else float("nan")
-        blink_rate_per_min = (blink_count / dur_sec * 60.0) if (dur_sec and not math.isnan(dur_sec) and dur_sec > 0) else float("nan")
-
-        psp_suspected = bool(v_ptp < vpp_thresh) if not math.isnan(v_ptp) else False
-        psp_reason = f"vertical_peak_to_peak({v_ptp:.3f}) < threshold({vpp_thresh:.3f})" if psp_suspected else "criteria_not_met"
-
-        summary = {
-            "frames_processed": len(df),
-            "fps": fps,
-            "duration_sec_est": dur_sec,
-            "vertical_offset_std": v_std,
-            "vertical_peak_to_peak": v_ptp,
-            "blink_count": blink_count,
-            "blink_rate_per_min": blink_rate_per_min,
-            "psp_suspected": psp_suspected,
-            "psp_rule_reason": psp_reason,
-            "video_meta": {"width": width, "height": height, "fps": fps}
+        ext = os.path.splitext(file_name)[1] or '.mp4'
+        with VideoSpool(suffix=ext) as spool:
+            download_s3_to_spool(s3_key, spool, s3_bucket)
+            video_cache_key = _video_cache_key(spool.digest(), user_id, opts, source=f"s3://{s3_bucket}/{s3_key}")
+            cached = _cached_video_response(video_cache_key, headers)
+            if cached is not None:
+                return cached
+
+            if s3_bucket == S3_BUCKET:
+                video_key = s3_key
+            else:
+                video_key = f"users/{user_id}/eye/{analysis_id}/raw_video{ext}"
+                copy_within_s3(s3_bucket, s3_key, video_key)
+            return _analyze_video_file(
+                spool.path, video_key, opts, params, user_id, analysis_id, headers, video_cache_key,
+            )
+
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': headers,
+            'body': json.dumps({'error': f'S3 file processing failed: {str(e)}'})
         }
 
-        # 결과 저장
-        save_to_dynamodb(analysis_id, user_id, {
-            'type': 'video',
-            'summary': summary,
+# ──────────────────────────────────────────────────────────────────────────────
+# 비동기 동영상 작업: submit_video → (큐) → run_video_job 워커 → get_status 로 조회
+#   작업 상태는 결과와 같은 테이블(analysisId = job_id)에 pending → running → completed | failed 로 기록한다.
+#   테이블(EYE_TABLE=memory)과 큐(EYE_JOB_QUEUE=local)는 로컬 대체 구현으로 바꿀 수 있다.
+# ──────────────────────────────────────────────────────────────────────────────
+class ConditionalCheckFailed(Exception):
+    """MemoryTable 의 조건부 갱신 실패 (DynamoDB 의 ConditionalCheckFailedException 에 해당)"""
+
+
+class MemoryTable:
+    """DynamoDB Table 대체 (이 모듈이 쓰는 put_item / get_item / update_item(SET, = 조건의 AND) 부분)."""
+
+    def __init__(self, key: str = 'analysisId'):
+        self.key = key
+        self.items: Dict[str, Dict[str, Any]] = {}
+
+    def put_item(self, Item: Dict[str, Any]) -> None:
+        self.items[Item[self.key]] = json.loads(json.dumps(Item, default=_json_default))
+
+    def get_item(self, Key: Dict[str, Any]) -> Dict[str, Any]:
+        item = self.items.get(Key[self.key])
+        return {'Item': json.loads(json.dumps(item))} if item is not None else {}
+
+    def update_item(self, Key: Dict[str, Any], UpdateExpression: str,
+                    ExpressionAttributeNames: Dict[str, str], ExpressionAttributeValues: Dict[str, Any],
+                    ConditionExpression: Optional[str] = None) -> None:
+        if ConditionExpression:
+            current = self.items.get(Key[self.key], {})
+            for condition in ConditionExpression.split(' AND '):
+                name, value = (part.strip() for part in condition.split('='))
+                if current.get(ExpressionAttributeNames[name]) != ExpressionAttributeValues[value]:
+                    raise ConditionalCheckFailed(ConditionExpression)
+        item = self.items.setdefault(Key[self.key], dict(Key))
+        assignments = UpdateExpression.strip()[len('SET '):].split(',')
+        for assignment in assignments:
+            name, value = (part.strip() for part in assignment.split('='))
+            item[ExpressionAttributeNames[name]] = json.loads(
+                json.dumps(ExpressionAttributeValues[value], default=_json_default))
+
+
+class LambdaAsyncJobQueue:
+    """이 함수를 InvocationType=Event 로 다시 호출 (워커 = 같은 함수의 별도 호출)."""
+
+    def __init__(self, function_name: Optional[str] = None):
+        self.function_name = function_name or os.environ.get('EYE_JOB_FUNCTION', os.environ.get('AWS_LAMBDA_FUNCTION_NAME'))
+        self._client = None
+
+    def send(self, message: Dict[str, Any]) -> None:
+        if self._client is None:
+            import boto3
+            self._client = boto3.client('lambda')
+        self._client.invoke(FunctionName=self.function_name, InvocationType='Event',
+                            Payload=json.dumps(message).encode('utf-8'))
+
+
+class SQSJobQueue:
+    """SQS 로 전달 (이 함수를 큐의 이벤트 소스로 연결하면 event['Records'] 로 받는다)."""
+
+    def __init__(self, queue_url: Optional[str] = None):
+        self.queue_url = queue_url or os.environ.get('EYE_JOB_QUEUE_URL')
+        self._client = None
+
+    def send(self, message: Dict[str, Any]) -> None:
+        if self._client is None:
+            import boto3
+            self._client = boto3.client('sqs')
+        self._client.send_message(QueueUrl=self.queue_url, MessageBody=json.dumps(message))
+
+
+class LocalJobQueue:
+    """로컬/테스트용: 메시지를 쌓아 두고 drain() 으로 같은 프로세스에서 워커를 돌린다 (inline=True 면 즉시)."""
+
+    def __init__(self, inline: bool = False):
+        self.inline = inline
+        self.pending: List[Dict[str, Any]] = []
+
+    def send(self, message: Dict[str, Any]) -> None:
+        self.pending.append(message)
+        if self.inline:
+            self.drain()
+
+    def drain(self) -> int:
+        n = 0
+        while self.pending:
+            message = self.pending.pop(0)
+            handle_run_video_job(message.get('job_id'), {})
+            n += 1
+        return n
+
+
+_job_queue = None
+
+def get_job_queue():
+    """작업 큐 싱글톤 (EYE_JOB_QUEUE)"""
+    global _job_queue
+    if _job_queue is None:
+        if JOB_QUEUE_BACKEND == 'sqs':
+            _job_queue = SQSJobQueue()
+        elif JOB_QUEUE_BACKEND == 'local':
+            _job_queue = LocalJobQueue()
+        else:
+            _job_queue = LambdaAsyncJobQueue()
+    return _job_queue
+
+def _update_job(job_id: str, expect: Optional[Dict[str, Any]] = None, **fields: Any) -> None:
+    """작업 항목 일부 필드 갱신 (updated_at 포함). expect 를 주면 그 필드들이 모두 그 값일 때만 갱신"""
+    fields['updated_at'] = int(datetime.now().timestamp())
+    names = {f'#f{i}': k for i, k in enumerate(fields)}
+    values = {f':v{i}': _to_dynamo(v) for i, v in enumerate(fields.values())}
+    kwargs: Dict[str, Any] = {}
+    if expect:
+        for i, (k, v) in enumerate(expect.items()):
+            names[f'#c{i}'] = k
+            values[f':c{i}'] = _to_dynamo(v)
+        kwargs['ConditionExpression'] = ' AND '.join(f'#c{i} = :c{i}' for i in range(len(expect)))
+    get_table().update_item(
+        Key={'analysisId': job_id},
+        UpdateExpression='SET ' + ', '.join(f'#f{i} = :v{i}' for i in range(len(fields))),
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values,
+        **kwargs,
+    )
+
+def _is_condition_failure(e: Exception) -> bool:
+    """조건부 갱신 실패인지 (MemoryTable / botocore ClientError 모두)"""
+    if isinstance(e, ConditionalCheckFailed):
+        return True
+    return getattr(e, 'response', {}).get('Error', {}).get('Code') == 'ConditionalCheckFailedException'
+
+def _get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    return get_table().get_item(Key={'analysisId': job_id}).get('Item')
+
+def _job_is_stale(item: Dict[str, Any]) -> bool:
+    """running 인데 JOB_LEASE_SEC 넘게 갱신이 없는 작업 (워커가 제한 시간 초과/메모리 부족으로 죽음)"""
+    if item.get('status') != 'running':
+        return False
+    updated_at = int(item.get('updated_at') or item.get('timestamp') or 0)
+    return int(datetime.now().timestamp()) - updated_at > JOB_LEASE_SEC
+
+def _claim_job(item: Dict[str, Any]) -> Optional[int]:
+    """작업을 이 호출이 맡는다 → 시도 번호 (이미 끝났거나 살아 있는 다른 워커가 맡고 있으면 None).
+
+    pending 이면 바로 맡고, running 이라도 임대가 끝났으면(_job_is_stale) 넘겨받는다 — 죽은 워커의 작업이
+    running 으로 영원히 남지 않게. 조건부 갱신이라 재전달이 겹쳐도 한 호출만 맡는다.
+    """
+    job_id = item['analysisId']
+    attempts = int(item.get('attempts') or 0)
+    if item.get('status') == 'pending':
+        expect = {'status': 'pending'}
+    elif _job_is_stale(item):
+        expect = {'status': 'running', 'updated_at': item.get('updated_at')}
+    else:
+        return None
+    try:
+        if attempts >= JOB_MAX_ATTEMPTS:
+            _update_job(job_id, expect=expect, status='failed',
+                        error=f'worker stopped without finishing after {attempts} attempts (timeout or out of memory)')
+            return None
+        _update_job(job_id, expect=expect, status='running', progress=0, attempts=attempts + 1,
+                    started_at=int(datetime.now().timestamp()))
+    except Exception as e:
+        if not _is_condition_failure(e):
+            raise
+        return None
+    return attempts + 1
+
+def _submit_cached_job(
+    analysis_id: str, user_id: str, params: Dict, cached_body: Dict[str, Any], headers: Dict,
+) -> Dict:
+    """캐시 적중한 submit_video: 작업 항목을 결과와 함께 completed 로 쓰고 보통과 같은 202 + job_id 로 응답"""
+    result_data = {
+        'type': 'video',
+        **{k: cached_body.get(k) for k in ('summary', 'video_path', 'csv_path', 'trace_path', 'trace_format')},
+    }
+    now = int(datetime.now().timestamp())
+    get_table().put_item(Item={
+        'analysisId': analysis_id,
+        'testType': 'eye-tracking',
+        'userId': user_id,
+        'timestamp': now,
+        'updated_at': now,
+        'status': 'completed',
+        'progress': 100,
+        'attempts': 0,
+        'video_path': result_data['video_path'],
+        'parameters_json': json.dumps(params),
+        'results': _to_dynamo(result_data),
+        'cached_analysis_id': cached_body.get('analysis_id'),  # 결과를 재사용한 이전 분석
+    })
+    return {
+        'statusCode': 202,
+        'headers': headers,
+        'body': json.dumps({
+            'job_id': analysis_id,
+            'analysis_id': analysis_id,
+            'status': 'completed',
+            'video_path': result_data['video_path'],
+            'cached': True,
+        })
+    }
+
+def handle_submit_video(request_data: Dict, user_id: str, analysis_id: str, headers: Dict) -> Dict:
+    """동영상 분석 작업 등록 → 202 + job_id (분석은 워커 호출에서)
+
+    입력은 file_data(base64, 원본을 S3 에 올려 둔다) 또는 s3_key(+ s3_bucket). 큐 메시지에는 job_id 만 싣는다.
+    """
+    try:
+        params = request_data.get('parameters', {})
+        opts, error = _video_options(params)
+        if error:
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': json.dumps({'error': error})
+            }
+
+        file_data = request_data.get('file_data')
+        s3_key = request_data.get('s3_key')
+        source = None
+        if file_data:
+            video_data = base64.b64decode(file_data)
+            # 이미 분석한 영상이면 큐에 넣지 않고 작업을 바로 completed 로 기록
+            cached_body = result_cache.get(_video_cache_key(content_hash(video_data), user_id, opts))
+            if cached_body is not None:
+                return _submit_cached_job(analysis_id, user_id, params, cached_body, headers)
+            video_key = f"users/{user_id}/eye/{analysis_id}/raw_video.mp4"
+            upload_to_s3(video_data, video_key, 'video/mp4')
+            del video_data
+        elif s3_key:
+            s3_bucket = request_data.get('s3_bucket') or S3_BUCKET
+            source = f"s3://{s3_bucket}/{s3_key}"
+            if s3_bucket == S3_BUCKET:
+                video_key = s3_key
+            else:
+                video_key = f"users/{user_id}/eye/{analysis_id}/raw_video{os.path.splitext(s3_key)[1] or '.mp4'}"
+                copy_within_s3(s3_bucket, s3_key, video_key)
+        else:
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': json.dumps({'error': 'Missing file_data or s3_key'})
+            }
+
+        now = int(datetime.now().timestamp())
+        get_table().put_item(Item={
+            'analysisId': analysis_id,
+            'testType': 'eye-tracking',
+            'userId': user_id,
+            'timestamp': now,
+            'updated_at': now,
+            'status': 'pending',
+            'progress': 0,
             'video_path': video_key,
-            'csv_path': csv_key
+            'parameters_json': json.dumps(params),
+            **({'source': source} if source else {}),  # S3 원본이면 결과 캐시 키에 포함 (_video_cache_key)
         })
+        get_job_queue().send({'action': 'run_video_job', 'job_id': analysis_id})
 
         return {
-            'statusCode': 200,
+            'statusCode': 202,
             'headers': headers,
             'body': json.dumps({
+                'job_id': analysis_id,
                 'analysis_id': analysis_id,
-                'summary': summary,
+                'status': 'pending',
                 'video_path': video_key,
-                'csv_path': csv_key,
-                'status': 'success'
             })
         }
 
@@ -539,39 +1110,112 @@ def handle_analyze_video(request_data: Dict, user_id: str, analysis_id: str, hea
         return {
             'statusCode': 500,
             'headers': headers,
-            'body': json.dumps({'error': f'Video analysis failed: {str(e)}'})
+            'body': json.dumps({'error': f'Video job submit failed: {str(e)}'})
         }
 
-def handle_process_s3_file(request_data: Dict, user_id: str, analysis_id: str, headers: Dict) -> Dict:
-    """S3에 저장된 파일 처리"""
+def handle_get_status(request_data: Dict, user_id: str, headers: Dict) -> Dict:
+    """작업 상태/진행률(0~100) 조회, 완료 시 결과 포함"""
+    job_id = request_data.get('job_id') or request_data.get('analysis_id')
+    if not job_id:
+        return {
+            'statusCode': 400,
+            'headers': headers,
+            'body': json.dumps({'error': 'Missing job_id'})
+        }
+    item = _get_job(job_id)
+    if item is None or item.get('userId') != user_id:
+        return {
+            'statusCode': 404,
+            'headers': headers,
+            'body': json.dumps({'error': 'Job not found'})
+        }
+    status, error = item.get('status'), item.get('error')
+    if _job_is_stale(item):
+        # 워커가 끝내지 못하고 멈춘 작업 (재전달된 호출이 넘겨받으면 다시 running)
+        status, error = 'failed', f'worker stopped responding (no update for over {JOB_LEASE_SEC}s)'
+    return {
+        'statusCode': 200,
+        'headers': headers,
+        'body': json.dumps({
+            'job_id': job_id,
+            'status': status,
+            'progress': item.get('progress', 100 if status == 'completed' else 0),
+            'attempts': item.get('attempts', 0),
+            'error': error,
+            'result': item.get('results') if item.get('status') == 'completed' else None,
+            'updated_at': item.get('updated_at', item.get('timestamp')),
+        }, default=_json_default)
+    }
+
+def handle_run_video_job(job_id: Optional[str], headers: Dict) -> Dict:
+    """워커: 작업 항목의 S3 원본을 VideoSpool(memfd, 큰 영상은 /tmp)로 받아 분석하고 상태/진행률을 갱신"""
+    item = _get_job(job_id) if job_id else None
+    if item is None:
+        return {
+            'statusCode': 404,
+            'headers': headers,
+            'body': json.dumps({'error': 'Job not found'})
+        }
+    # 큐는 최소 한 번 전달이므로 이미 끝났거나 살아 있는 다른 워커가 잡은 작업은 건너뛴다
+    attempt = _claim_job(item)
+    if attempt is None:
+        return {
+            'statusCode': 200,
+            'headers': headers,
+            'body': json.dumps({'job_id': job_id, 'status': item.get('status'), 'skipped': True})
+        }
+
+    user_id = item['userId']
+    video_key = item['video_path']
+    params = json.loads(item.get('parameters_json') or '{}')
     try:
-        s3_key = request_data.get('s3_key')
-        if not s3_key:
-            return {
-                'statusCode': 400,
-                'headers': headers,
-                'body': json.dumps({'error': 'Missing s3_key'})
-            }
+        opts, error = _video_options(params)
+        if error:
+            raise ValueError(error)
 
-        # S3에서 파일 다운로드
-        file_data = download_from_s3(s3_key)
-        
-        # 파일 타입에 따라 처리
-        file_name = request_data.get('file_name', '')
-        if file_name.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')):
-            # 이미지 처리
-            request_data['file_data'] = base64.b64encode(file_data).decode('utf-8')
-            request_data['action'] = 'analyze_image'
-            return handle_analyze_image(request_data, user_id, analysis_id, headers)
-        else:
-            # 비디오 처리
-            request_data['file_data'] = base64.b64encode(file_data).decode('utf-8')
-            request_data['action'] = 'analyze_video'
-            return handle_analyze_video(request_data, user_id, analysis_id, headers)
+        last = [time.monotonic()]
+
+        def report(done: int, expected: int) -> None:
+            # 테이블 쓰기는 2초에 한 번까지 (분석 구간은 0~95%, 나머지는 업로드/저장)
+            now = time.monotonic()
+            if now - last[0] >= 2.0:
+                last[0] = now
+                # 진행률 갱신이 임대도 연장한다. 다른 호출이 넘겨받았으면 조건 실패로 여기서 멈춘다
+                _update_job(job_id, expect={'attempts': attempt}, progress=min(95, int(95 * done / max(1, expected))))
+
+        def complete(result_data: Dict[str, Any]) -> None:
+            # put_item 으로 항목을 바꾸면 video_path/parameters_json/attempts 가 사라지므로 필드만 갱신
+            _update_job(job_id, expect={'attempts': attempt}, status='completed', progress=100, results=result_data)
+
+        with VideoSpool(suffix=os.path.splitext(video_key)[1] or '.mp4') as spool:
+            download_s3_to_spool(video_key, spool)
+            video_cache_key = _video_cache_key(spool.digest(), user_id, opts, source=item.get('source'))
+            response = _analyze_video_file(
+                spool.path, video_key, opts, params, user_id, job_id, headers, video_cache_key,
+                progress=report, save_result=complete,
+            )
+        if response['statusCode'] != 200:
+            raise ValueError(json.loads(response['body']).get('error', 'analysis failed'))
+        return response
 
     except Exception as e:
+        try:
+            _update_job(job_id, expect={'attempts': attempt}, status='failed', error=str(e))
+        except Exception as e2:
+            if not _is_condition_failure(e2):  # 넘겨받은 호출의 상태는 덮어쓰지 않는다
+                raise
         return {
             'statusCode': 500,
             'headers': headers,
-            'body': json.dumps({'error': f'S3 file processing failed: {str(e)}'})
-        }
\ No newline at end of file
+            'body': json.dumps({'job_id': job_id, 'error': f'Video job failed: {str(e)}'})
+        }
+
+# ──────────────────────────────────────────────────────────────────────────────
+# init 단계 마무리: (옵션) 프리웜 + 단계별 소요 시간 로그
+# ──────────────────────────────────────────────────────────────────────────────
+if PREWARM:
+    _prewarm()
+INIT_MS = round((time.perf_counter() - _INIT_T0) * 1000.0, 2)
+INIT_PHASE_TIMINGS_MS = dict(INIT_TIMINGS_MS)
+_cold = True
+print(json.dumps({'init_metrics': {'prewarm': PREWARM, 'init_ms': INIT_MS, 'timings_ms': INIT_PHASE_TIMINGS_MS}}))
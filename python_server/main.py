@@ -2,20 +2,21 @@
 """
 FastAPI 서버 - 파킨슨병 진단 Eye Tracking API
 """
-from fastapi import FastAPI, File, UploadFile, HTTPException, Query
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import os
 import sys
-import tempfile
 import uuid
 import time
 import math
 import json
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Dict, Any, Optional, Tuple, List
 import cv2
 import numpy as np
-import pandas as pd
 import mediapipe as mp
 from mediapipe.solutions import face_mesh as mp_face_mesh
 from mediapipe.solutions.face_mesh_connections import (
@@ -23,6 +24,15 @@ from mediapipe.solutions.face_mesh_connections import (
     FACEMESH_RIGHT_IRIS,
 )
 
+# 공용 분석 엔진 (저장소 루트 eye_engine 패키지) 경로 추가
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from eye_engine import (
+    PROFILE_ENABLED, PROMETHEUS_CONTENT_TYPE, AdaptiveConfig, AdaptiveSampler, EyeMetricsEngine,
+    FaceLandmarkTracker, FrameBuffers, FramePipeline, MetricsRegistry, SPOOL_CHUNK, Segment, StreamingSummary,
+    TraceBuffer, VideoSpool, analyze_segment, decoder_info, frames_are_rgb, iter_sampled_frames, merge_segments,
+    new_timer, open_video, plan_segments, profile_call, profile_report,
+)
+
 # FastAPI 앱 초기화
 app = FastAPI(
     title="Parkinson's Disease Eye Tracking API",
@@ -49,85 +59,235 @@ def _uniq_indices(connections: List[Tuple[int, int]]) -> List[int]:
 LEFT_IRIS_IDXS  = _uniq_indices(FACEMESH_LEFT_IRIS)
 RIGHT_IRIS_IDXS = _uniq_indices(FACEMESH_RIGHT_IRIS)
 
-# 눈 모서리/윗/아랫눈꺼풀 대표 랜드마크
-L_CORNER_OUT, L_CORNER_IN = 33, 133
-L_LID_TOP,   L_LID_BOT    = 159, 145
-R_CORNER_OUT, R_CORNER_IN = 362, 263
-R_LID_TOP,   R_LID_BOT    = 386, 374
-
-def _px(landmark, w, h) -> Tuple[float, float]:
-    return landmark.x * w, landmark.y * h
-
-def _iris_center(landmarks, idxs, w, h) -> Tuple[float, float]:
-    xs, ys = [], []
-    for i in idxs:
-        x, y = _px(landmarks[i], w, h)
-        xs.append(x); ys.append(y)
-    if not xs:
-        return np.nan, np.nan
-    return float(np.mean(xs)), float(np.mean(ys))
-
-def _eye_metrics(landmarks, w, h, is_left=True) -> Dict[str, float]:
-    if is_left:
-        c_out, c_in = L_CORNER_OUT, L_CORNER_IN
-        lid_top, lid_bot = L_LID_TOP, L_LID_BOT
-        iris_idxs = LEFT_IRIS_IDXS
-    else:
-        c_out, c_in = R_CORNER_OUT, R_CORNER_IN
-        lid_top, lid_bot = R_LID_TOP, R_LID_BOT
-        iris_idxs = RIGHT_IRIS_IDXS
-
-    # 가로폭(정규화 기준)
-    x_out, y_out = _px(landmarks[c_out], w, h)
-    x_in,  y_in  = _px(landmarks[c_in],  w, h)
-    eye_width = max(1e-6, math.hypot(x_out - x_in, y_out - y_in))
-
-    # 세로 개폐도
-    x_t, y_t = _px(landmarks[lid_top], w, h)
-    x_b, y_b = _px(landmarks[lid_bot], w, h)
-    eye_open = math.hypot(x_t - x_b, y_t - y_b) / eye_width
-
-    # 홍채 중심과 눈 중앙/높이 기준 정규화 위치
-    ix, iy = _iris_center(landmarks, iris_idxs, w, h)
-    cx, cy = (x_out + x_in) / 2.0, (y_out + y_in) / 2.0
-    eye_height = max(1e-6, math.hypot(x_t - x_b, y_t - y_b))
-    v_offset_norm = (iy - cy) / eye_height
+# 좌/우 눈 지표는 공용 엔진으로 배치 계산 (사용하는 랜드마크만 배열로 추출)
+_metrics = EyeMetricsEngine(LEFT_IRIS_IDXS, RIGHT_IRIS_IDXS)
+# 응답 raw_data 에 담는 trace 컬럼
+RAW_DATA_KEYS = (
+    "frame_idx", "time_sec", "L_v_offset", "R_v_offset",
+    "L_eye_open", "R_eye_open", "v_offset", "eye_open",
+)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# 지표 (/metrics, Prometheus 텍스트 형식) — 요청마다 한 번씩만 기록하므로 계측 비용은 요청 단위
+# 단계별 시간(decode/inference/...)은 EYE_TIMING=0 이면 재지 않는다(추론/디코딩 히스토그램도 비게 됨).
+# ──────────────────────────────────────────────────────────────────────────────
+_registry = MetricsRegistry()
+_MS_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+_SEC_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+M_REQUESTS = _registry.counter("eye_requests_total", "eye-tracking 요청 수", ("status",))
+M_STAGE_SECONDS = _registry.histogram(
+    "eye_stage_seconds", "요청 하나의 단계별 소요 시간", _SEC_BUCKETS, ("stage",),
+)
+M_INFERENCE_MS = _registry.histogram(
+    "eye_inference_ms_per_frame", "프레임당 FaceMesh 추론 시간(요청 평균, ms)", _MS_BUCKETS,
+)
+M_FPS = _registry.histogram(
+    "eye_analysis_frames_per_second", "분석 처리 속도(분석 프레임 / 워커 분석 시간)",
+    (5, 10, 20, 30, 50, 75, 100, 150, 200, 300, 500),
+)
+M_DETECTION = _registry.histogram(
+    "eye_detection_rate", "얼굴이 검출된 프레임 비율", (0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 1.0),
+)
+M_QUEUE_WAIT = _registry.histogram(
+    "eye_queue_wait_seconds", "프로세스 풀에서 작업이 시작되기까지 기다린 시간", _SEC_BUCKETS,
+)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# FaceMesh 프로세스 풀 (워커 프로세스마다 FaceMesh 상주)
+# ──────────────────────────────────────────────────────────────────────────────
+# EYE_POOL_SIZE 미설정/0 이면 CPU 코어 수만큼 워커를 띄운다.
+EYE_POOL_SIZE = int(os.environ.get("EYE_POOL_SIZE", "0") or 0) or (os.cpu_count() or 1)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_worker_fm = None  # 워커 프로세스 전용 FaceMesh (메인 프로세스에서는 None)
+_worker_detector = None  # 워커 프로세스 전용 roi 재검출 FaceMesh (정지 영상 모드, 처음 roi 작업 때 생성)
+
+def _new_face_mesh():
+    return mp_face_mesh.FaceMesh(
+        static_image_mode=False,
+        max_num_faces=1,
+        refine_landmarks=True,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5,
+    )
+
+def _init_worker() -> None:
+    """워커 초기화: FaceMesh 생성 + 더미 추론으로 그래프/모델 로드를 미리 끝낸다."""
+    global _worker_fm
+    _worker_fm = _new_face_mesh()
+    _worker_fm.process(np.zeros((64, 64, 3), dtype=np.uint8))
+
+def _get_worker_detector():
+    """roi=True 작업의 재검출용 FaceMesh — 워커마다 하나를 작업들이 같이 쓴다."""
+    global _worker_detector
+    if _worker_detector is None:
+        _worker_detector = mp_face_mesh.FaceMesh(
+            static_image_mode=True,
+            max_num_faces=1,
+            refine_landmarks=True,
+            min_detection_confidence=0.5,
+        )
+    return _worker_detector
+
+def _warmup_job() -> int:
+    return os.getpid()
+
+def _analyze_video_job(
+    video_path: str, step: int, max_frames: int,
+    target_fps: Optional[float] = None, sampling: str = "grab", roi: bool = False,
+    blink_thresh: float = 0.18, submitted_at: Optional[float] = None,
+    adaptive: Optional[AdaptiveConfig] = None, vpp_thresh: Optional[float] = None,
+) -> Dict[str, Any]:
+    """워커 프로세스에서 실행: 동영상 디코딩 + FaceMesh 추론 → 프레임별 행.
+
+    stages: 워커 안의 단계별 ms (submitted_at(time.time()) 을 주면 queue_wait 포함).
+    adaptive 를 주면 눈 움직임에 따라 분석 간격을 바꾸고(수렴 시 중단) 그 보고를 "adaptive" 로 돌려준다.
+    """
+    timer = new_timer()
+    if submitted_at is not None:
+        timer.add("queue_wait", max(0.0, (time.time() - submitted_at) * 1000.0))
+    t_job = time.perf_counter()
+    fm = _worker_fm
+    if fm is None:  # initializer 없이 호출된 경우(단독 실행/디버깅)
+        _init_worker()
+        fm = _worker_fm
+    # 직전 작업의 추적 상태가 새 영상 첫 프레임에 이어지지 않도록 빈 프레임으로 끊어 준다.
+    fm.process(np.zeros((64, 64, 3), dtype=np.uint8))
+
+    # 디코더 백엔드는 배포 설정 (EYE_DECODER / EYE_DECODER_THREADS — eye_engine.decoder)
+    cap = open_video(video_path)
+    if not cap.isOpened():
+        return {"ok": False, "error": "비디오를 열 수 없습니다"}
+
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+
+    # 프레임별 랜드마크 점을 미리 잡아 둔 컬럼 배열에 기록 — 지표는 루프 뒤 한 번에 계산
+    trace = TraceBuffer.for_capture(
+        _metrics, cap, fps, step=step, target_fps=target_fps, max_frames=max_frames,
+        summary=StreamingSummary(blink_thresh=blink_thresh),
+    )
+    # 디코딩 → 추론 → trace 기록을 단계 스레드로 겹쳐 돌린다 (적응형 샘플링은 직전 결과가 필요해 inline)
+    # PyAV 디코더면 프레임이 이미 RGB 라 FaceMesh 입력 변환이 없다
+    rgb = frames_are_rgb(cap)
+    decoder = decoder_info(cap)
+    pipeline = FramePipeline(depth=0 if adaptive is not None else None, timer=timer, rgb=rgb)
+    buffers = pipeline.decode_buffers()
+    # roi=True 면 직전 얼굴 박스 주변만 잘라 축소 입력 (랜드마크는 원본 좌표로 복원)
+    tracker = FaceLandmarkTracker(
+        fm, roi=roi, buffers=FrameBuffers(rgb=rgb), detector=_get_worker_detector() if roi else None,
+    )
+    sampler = AdaptiveSampler(
+        adaptive, trace, step=step, target_fps=target_fps, blink_thresh=blink_thresh, vpp_thresh=vpp_thresh,
+    ) if adaptive is not None else None
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    try:
+        # 건너뛸 프레임은 grab()만(또는 seek) → 분석 프레임만 retrieve
+        if sampler is not None:
+            frames = sampler.frames(cap, max_frames=max_frames, mode=sampling, buffers=buffers)
+        else:
+            frames = iter_sampled_frames(
+                cap, fps, step=step, target_fps=target_fps, max_frames=max_frames, mode=sampling,
+                buffers=buffers,
+            )
+        # 얼굴이 감지되지 않은 프레임은 NaN 행 → 지표도 NaN
+        pipeline.run(frames, tracker, trace, sampler=sampler)
+    finally:
+        cap.release()
+
+    if len(trace):
+        # 남은 프레임의 좌/우 눈 메트릭 계산 + 요약 반영
+        with timer.stage("metrics"):
+            trace.finalize()
 
     return {
-        "eye_width": eye_width,
-        "eye_open": eye_open,
-        "iris_cx": ix,
-        "iris_cy": iy,
-        "eye_cx": cx,
-        "eye_cy": cy,
-        "v_offset_norm": v_offset_norm,
+        "ok": True, "trace": trace, "fps": fps, "width": width, "height": height,
+        "tracking": {**tracker.stats(), "decoder": decoder, "pipeline": pipeline.stats()},
+        "stages": timer.as_dict(),
+        "analysis_ms": (time.perf_counter() - t_job) * 1000.0,
+        "adaptive": sampler.report(frame_count) if sampler is not None else None,
     }
 
-def count_blinks(openness_series: List[float], thresh: float = 0.18, min_frames: int = 2) -> int:
-    closed = False
-    hold = 0
-    count = 0
-    for v in openness_series:
-        if np.isnan(v):
-            if closed and hold >= min_frames:
-                count += 1
-            closed, hold = False, 0
-            continue
-
-        if v < thresh:
-            if closed:
-                hold += 1
-            else:
-                closed = True
-                hold = 1
-        else:
-            if closed and hold >= min_frames:
-                count += 1
-            closed, hold = False, 0
+def _profiled_video_job(*args: Any) -> Dict[str, Any]:
+    """워커 프로세스에서 실행: _analyze_video_job 을 cProfile 로 감싸 통계 바이트를 함께 돌려준다."""
+    job, stats = profile_call(_analyze_video_job, *args)
+    job["profile_stats"] = stats
+    return job
+
+def _analyze_segment_job(
+    video_path: str, seg: Segment, fps: float, step: int,
+    target_fps: Optional[float] = None, sampling: str = "grab", roi: bool = False,
+) -> Dict[str, Any]:
+    """워커 프로세스에서 실행: 영상 구간 하나 분석 (eye_engine.segments.analyze_segment)."""
+    fm = _worker_fm
+    if fm is None:
+        _init_worker()
+        fm = _worker_fm
+    # 직전 작업의 추적 상태가 구간 첫 프레임에 이어지지 않도록 빈 프레임으로 끊어 준다.
+    fm.process(np.zeros((64, 64, 3), dtype=np.uint8))
+    return analyze_segment(
+        fm, video_path, seg, _metrics, fps, step, target_fps, sampling, roi,
+        detector=_get_worker_detector() if roi else None,
+    )
+
+async def _analyze_video_segments(
+    pool: ProcessPoolExecutor, video_path: str, segments: int, step: int, max_frames: int,
+    target_fps: Optional[float] = None, sampling: str = "grab", roi: bool = False,
+    blink_thresh: float = 0.18,
+) -> Optional[Dict[str, Any]]:
+    """영상을 시간 구간으로 나눠 풀 워커들에 동시에 맡기고 frame_idx 순으로 합친다.
+
+    영상이 짧아 구간이 하나뿐이면 None (호출 측이 _analyze_video_job 으로 순차 분석).
+    """
+    # 구간 계획/용량도 워커와 같은 디코더의 메타데이터로 (백엔드마다 프레임 수 추정이 다를 수 있다)
+    cap = open_video(video_path)
+    if not cap.isOpened():
+        return {"ok": False, "error": "비디오를 열 수 없습니다"}
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        plan = plan_segments(
+            int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0), fps, segments,
+            step=step, target_fps=target_fps, max_frames=max_frames,
+        )
+        if len(plan) < 2:
+            return None
+        trace = TraceBuffer.for_capture(
+            _metrics, cap, fps, step=step, target_fps=target_fps, max_frames=max_frames,
+            summary=StreamingSummary(blink_thresh=blink_thresh),
+        )
+    finally:
+        cap.release()
+
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*[
+        loop.run_in_executor(pool, _analyze_segment_job, video_path, seg, fps, step, target_fps, sampling, roi)
+        for seg in plan
+    ])
+    tracking = merge_segments(trace, results)
+    if len(trace):
+        trace.finalize()
+    return {
+        "ok": True, "trace": trace, "fps": fps, "width": trace.width, "height": trace.height,
+        "tracking": tracking,
+    }
+
+def _start_pool() -> ProcessPoolExecutor:
+    global _pool
+    _pool = ProcessPoolExecutor(max_workers=EYE_POOL_SIZE, initializer=_init_worker)
+    # 워커를 미리 띄워 첫 요청이 모델 로드 지연을 떠안지 않게 한다.
+    for _ in range(EYE_POOL_SIZE):
+        _pool.submit(_warmup_job)
+    return _pool
 
-    if closed and hold >= min_frames:
-        count += 1
-    return count
+@app.on_event("startup")
+async def _on_startup():
+    _start_pool()
+
+@app.on_event("shutdown")
+async def _on_shutdown():
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
 
 @app.get("/")
 async def root():
@@ -137,146 +297,139 @@ async def root():
 async def health_check():
     return {"status": "ok", "message": "서버가 정상 작동 중입니다"}
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus 스크레이프용 지표 (텍스트 형식)"""
+    return Response(_registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+def _record_metrics(timer, job: Dict[str, Any], frames: int, detected: int) -> None:
+    """요청 하나의 결과를 히스토그램에 반영 (요청당 한 번)."""
+    stages = timer.as_dict()
+    for stage, ms in stages.items():
+        M_STAGE_SECONDS.observe(ms / 1000.0, stage=stage)
+    if "queue_wait" in stages:
+        M_QUEUE_WAIT.observe(stages["queue_wait"] / 1000.0)
+    if frames:
+        if "inference" in stages:
+            M_INFERENCE_MS.observe(stages["inference"] / frames)
+        analysis_ms = job.get("analysis_ms")
+        if analysis_ms:
+            M_FPS.observe(frames / (analysis_ms / 1000.0))
+        M_DETECTION.observe(detected / frames)
+
 @app.post("/api/eye-tracking")
 async def analyze_eye_tracking(
+    http_response: Response,
     file: UploadFile = File(..., description="mp4 비디오 파일"),
     step: int = Query(1, description="프레임 샘플링 간격"),
+    target_fps: Optional[float] = Query(None, gt=0, description="초당 분석 프레임 수(지정 시 step 대신 사용)"),
+    sampling: str = Query("grab", pattern=r"^(grab|seek)$", description="건너뛸 프레임 처리: grab | seek"),
+    roi: bool = Query(False, description="얼굴 주변만 잘라 축소 입력으로 추적"),
     vpp_thresh: float = Query(0.06, description="PSP 의심 판정용 수직 임계값"),
     blink_thresh: float = Query(0.18, description="눈꺼풀 닫힘 판정 임계치"),
-    max_frames: int = Query(12000, description="최대 처리 프레임")
+    max_frames: int = Query(12000, description="최대 처리 프레임"),
+    segments: int = Query(1, ge=1, description="구간 병렬 분석 워커 수(1=순차, 풀 크기로 제한)"),
+    adaptive: bool = Query(False, description="적응형 샘플링: 눈 움직임 중에는 촘촘히, 고정 중에는 성기게 분석 (순차 분석)"),
+    early_stop: bool = Query(False, description="adaptive 에서 수직 피크투피크/블링크율 95% 구간이 허용오차 안이면 중단"),
+    vpp_tol: float = Query(0.01, gt=0, description="early_stop: vertical_peak_to_peak 구간 반폭 허용치"),
+    blink_tol: float = Query(3.0, gt=0, description="early_stop: blink_rate_per_min 구간 반폭 허용치"),
+    profile: bool = Query(False, description="워커 분석을 cProfile 로 실행해 상위 함수 반환 (EYE_PROFILE=1 일 때만)")
 ):
     """눈 추적 분석 API - Flutter 앱에서 호출"""
     
     # 파일 타입 검증
     if not file.content_type or not file.content_type.startswith('video/'):
+        M_REQUESTS.inc(status="rejected")
         raise HTTPException(400, detail="비디오 파일만 허용됩니다")
+    if profile:
+        if not PROFILE_ENABLED:
+            M_REQUESTS.inc(status="rejected")
+            raise HTTPException(403, detail="profile=true 가 허용되지 않았습니다 (EYE_PROFILE=1)")
+        segments = 1  # 구간 워커는 재지 않으므로 한 워커에서 순차 분석
     
+    # 단계별 소요(ms) → Server-Timing 헤더 + analysis_result.timings (EYE_TIMING=0 이면 끔)
+    timer = new_timer()
+    t_req = time.perf_counter()
     try:
-        # 업로드된 파일 읽기
-        content = await file.read()
-        if not content:
-            raise HTTPException(400, detail="빈 파일입니다")
-        
-        # 임시 파일 생성 및 비디오 처리
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tmp_file:
-            tmp_file.write(content)
-            tmp_file.flush()
-            
-            # OpenCV로 비디오 열기
-            cap = cv2.VideoCapture(tmp_file.name)
-            if not cap.isOpened():
-                raise HTTPException(400, detail="비디오를 열 수 없습니다")
-            
-            fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
-            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
-            
-            # MediaPipe FaceMesh 초기화
-            fm = mp_face_mesh.FaceMesh(
-                static_image_mode=False,
-                max_num_faces=1,
-                refine_landmarks=True,
-                min_detection_confidence=0.5,
-                min_tracking_confidence=0.5,
-            )
-            
-            # 프레임 처리
-            rows = []
-            fidx = 0
-            kept = 0
-            
-            while kept < max_frames:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                    
-                if fidx % step != 0:
-                    fidx += 1
-                    continue
-                
-                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                result = fm.process(rgb)
-                t_sec = fidx / max(1e-6, fps)
-                
-                if result.multi_face_landmarks:
-                    landmarks = result.multi_face_landmarks[0].landmark
-                    
-                    # 좌/우 눈 메트릭 계산
-                    L = _eye_metrics(landmarks, width, height, is_left=True)
-                    R = _eye_metrics(landmarks, width, height, is_left=False)
-                    
-                    # 평균 값 계산
-                    v_offset = np.nanmean([L["v_offset_norm"], R["v_offset_norm"]])
-                    eye_open = np.nanmean([L["eye_open"], R["eye_open"]])
-                    
-                    rows.append({
-                        "frame_idx": fidx,
-                        "time_sec": t_sec,
-                        "L_v_offset": L["v_offset_norm"],
-                        "R_v_offset": R["v_offset_norm"],
-                        "L_eye_open": L["eye_open"],
-                        "R_eye_open": R["eye_open"],
-                        "v_offset": v_offset,
-                        "eye_open": eye_open,
-                    })
-                else:
-                    # 얼굴이 감지되지 않은 프레임
-                    rows.append({
-                        "frame_idx": fidx,
-                        "time_sec": t_sec,
-                        "L_v_offset": np.nan,
-                        "R_v_offset": np.nan,
-                        "L_eye_open": np.nan,
-                        "R_eye_open": np.nan,
-                        "v_offset": np.nan,
-                        "eye_open": np.nan,
-                    })
-                
-                kept += 1
-                fidx += 1
-            
-            cap.release()
-            fm.close()
-            
-            # 임시 파일 삭제
-            os.unlink(tmp_file.name)
+        # 업로드를 메모리 파일(memfd, 큰 영상은 임시파일)에 조각씩 옮겨 담는다 — 전체 bytes 를 따로 들지 않는다.
+        # 워커 프로세스는 spool.path(/proc/<pid>/fd/N)로 같은 내용을 연다 (eye_engine.spool)
+        with VideoSpool() as spool:
+            with timer.stage("read_upload"):
+                while True:
+                    chunk = await file.read(SPOOL_CHUNK)
+                    if not chunk:
+                        break
+                    spool.write(chunk)
+            if not spool.size:
+                raise HTTPException(400, detail="빈 파일입니다")
+
+            # 프로세스 풀의 워커(상주 FaceMesh)에 동영상 작업 위임
+            pool = _pool or _start_pool()
+            loop = asyncio.get_running_loop()
+            try:
+                job = None
+                if segments > 1 and not adaptive:
+                    # 긴 영상은 구간별로 여러 워커에 나눠 병렬 분석
+                    with timer.stage("segments"):
+                        job = await _analyze_video_segments(
+                            pool, spool.path, min(segments, EYE_POOL_SIZE), step, max_frames,
+                            target_fps, sampling, roi, blink_thresh,
+                        )
+                if job is None:
+                    submitted_at = time.time() if timer.enabled else None
+                    job = await loop.run_in_executor(
+                        pool, _profiled_video_job if profile else _analyze_video_job,
+                        spool.path, step, max_frames, target_fps, sampling, roi, blink_thresh, submitted_at,
+                        AdaptiveConfig(early_stop, vpp_tol, blink_tol) if adaptive else None, vpp_thresh,
+                    )
+                    timer.merge(job.get("stages"))
+            except BrokenProcessPool:
+                # 워커 비정상 종료 시 다음 요청을 위해 풀을 새로 띄운다
+                _start_pool()
+                raise HTTPException(503, detail="분석 워커가 재시작되었습니다. 잠시 후 다시 시도하세요")
+
+        if not job["ok"]:
+            raise HTTPException(400, detail=job["error"])
+        trace = job["trace"]
         
-        if not rows:
+        if not len(trace):
             raise HTTPException(400, detail="유효한 프레임을 처리하지 못했습니다")
+        detected = int(np.count_nonzero(~np.isnan(trace.points[: len(trace), 0, 0])))
         
-        # 데이터 분석
-        df = pd.DataFrame(rows)
-        v_series = df["v_offset"].to_numpy(dtype=float)
-        eye_open_series = df["eye_open"].to_numpy(dtype=float)
-        
-        # NaN 제거
-        v_valid = v_series[~np.isnan(v_series)]
-        open_valid = eye_open_series[~np.isnan(eye_open_series)]
-        
-        # 수직 움직임 분석
-        def robust_ptp(x: np.ndarray) -> float:
-            if x.size == 0:
-                return float("nan")
-            lo, hi = np.percentile(x, [5, 95])
-            return float(hi - lo)
-        
-        v_ptp = robust_ptp(v_valid)
-        v_std = float(np.nanstd(v_valid)) if v_valid.size else float("nan")
-        
-        # 블링크 분석
-        blink_count = count_blinks(open_valid.tolist(), thresh=blink_thresh)
-        dur_sec = float(df["time_sec"].max() - df["time_sec"].min()) if len(df) > 1 else 0.0
+        # 데이터 분석 — 워커가 분석 중 누적한 스트리밍 요약 (수직 p5~p95, Welford 표준편차, 블링크)
+        streamed = trace.summary.result()
+        v_ptp = streamed["v_ptp"]
+        v_std = streamed["v_std"]
+        blink_count = streamed["blink_count"]
+        dur_sec = streamed["duration_sec"] if len(trace) > 1 else 0.0
         blink_rate_per_min = (blink_count / dur_sec * 60.0) if dur_sec > 0 else 0.0
         
         # PSP 의심 판정
         psp_suspected = bool(v_ptp < vpp_thresh) if not math.isnan(v_ptp) else False
         
+        with timer.stage("records"):
+            raw_data = trace.records(100, keys=RAW_DATA_KEYS)  # 처음 100프레임만 반환
+        profile_info = None
+        if profile:
+            # 워커에서 받은 통계를 EYE_PROFILE_DIR/<record_id>.prof 로 저장
+            record_id = str(uuid.uuid4())
+            profile_info = {"record_id": record_id, **profile_report(job.pop("profile_stats"), record_id)}
+        _record_metrics(timer, job, len(trace), detected)
+        M_REQUESTS.inc(status="ok")
+        if timer.enabled:
+            http_response.headers["Server-Timing"] = timer.server_timing()
+
         # 결과 반환
         return {
             "success": True,
             "analysis_result": {
-                "frames_processed": len(df),
+                "frames_processed": len(trace),
+                "frames_detected": detected,
                 "duration_sec": dur_sec,
+                "tracking": job["tracking"],
+                "trace_buffer": trace.stats(),
+                "summary_exact": streamed["exact"],
+                "adaptive_sampling": job.get("adaptive"),  # 분석/건너뛴 프레임 수와 이유, 조기 중단 여부
                 "vertical_movement": {
                     "peak_to_peak": v_ptp,
                     "std_deviation": v_std
@@ -289,17 +442,27 @@ async def analyze_eye_tracking(
                     "suspected": psp_suspected,
                     "threshold_used": vpp_thresh,
                     "vertical_ptp_measured": v_ptp
-                }
+                },
+                "timings": {
+                    "total_ms": (time.perf_counter() - t_req) * 1000.0,
+                    "stages": timer.as_dict(),  # Server-Timing 헤더와 같은 값
+                },
             },
-            "raw_data": rows[:100] if len(rows) > 100 else rows  # 처음 100프레임만 반환
+            "raw_data": raw_data,
+            "profile": profile_info,
         }
         
+    except HTTPException as e:
+        M_REQUESTS.inc(status=str(e.status_code))
+        raise
     except Exception as e:
+        M_REQUESTS.inc(status="500")
         raise HTTPException(500, detail=f"분석 중 오류 발생: {str(e)}")
 
 if __name__ == "__main__":
     print("🚀 파킨슨병 진단 Eye Tracking API 서버 시작")
     print("📊 MediaPipe 기반 눈 추적 분석")
+    print(f"🧵 FaceMesh 워커 프로세스: {EYE_POOL_SIZE}개 (EYE_POOL_SIZE)")
     print("🌐 서버 주소: http://localhost:8000")
     print("📖 API 문서: http://localhost:8000/docs")
     
@@ -0,0 +1,99 @@
+"""테스트 공용: eye.py 가 import 하는 app.core.* / firebase_admin 대역과 로컬 디렉터리 Storage 버킷.
+
+eye.py 는 상위 백엔드 앱(app.core.auth / app.core.firebase) 안에서 돌므로, 이 저장소만으로 import 할 수 있게
+없는 모듈만 가짜로 채운다 (설치돼 있으면 그대로 쓴다).
+"""
+import contextlib
+import importlib.util
+import json
+import os
+import sys
+import types
+from typing import Dict, Optional
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+class _FakeFirestoreNode:
+    """db.collection(..).document(..).set/update/collection 체인을 모두 받아 버린다."""
+
+    def collection(self, name):
+        return self
+
+    def document(self, name=None):
+        return self
+
+    def set(self, *a, **k):
+        pass
+
+    def update(self, *a, **k):
+        pass
+
+
+def _module_missing(name: str) -> bool:
+    return name not in sys.modules and importlib.util.find_spec(name.split(".")[0]) is None
+
+
+if _module_missing("app"):
+    auth = types.ModuleType("app.core.auth")
+    auth.get_current_user = lambda: {"uid": "test"}
+    fb = types.ModuleType("app.core.firebase")
+    fb.db, fb.bucket = _FakeFirestoreNode(), None  # 버킷은 local_bucket fixture 로 바꿔 낀다
+    app, core = types.ModuleType("app"), types.ModuleType("app.core")
+    app.core, core.auth, core.firebase = core, auth, fb
+    sys.modules.update({"app": app, "app.core": core, "app.core.auth": auth, "app.core.firebase": fb})
+if _module_missing("firebase_admin"):
+    fa = types.ModuleType("firebase_admin")
+    fs = types.ModuleType("firebase_admin.firestore")
+    fs.SERVER_TIMESTAMP = object()
+    fa.firestore = fs
+    sys.modules.update({"firebase_admin": fa, "firebase_admin.firestore": fs})
+
+
+class LocalBlob:
+    """로컬 디렉터리 blob (google.cloud.storage.Blob 에서 eye.py 가 쓰는 부분만)."""
+
+    def __init__(self, root: str, name: str):
+        self.name = name
+        self.metadata: Optional[Dict[str, str]] = None
+        self._file = os.path.join(root, name)
+
+    def upload_from_string(self, data, content_type: Optional[str] = None) -> None:
+        os.makedirs(os.path.dirname(self._file), exist_ok=True)
+        with open(self._file, "wb") as f:
+            f.write(data.encode("utf-8") if isinstance(data, str) else data)
+        with open(self._file + ".meta.json", "w", encoding="utf-8") as f:
+            json.dump({"content_type": content_type, "metadata": self.metadata}, f)
+
+    def download_as_bytes(self) -> bytes:
+        with open(self._file, "rb") as f:
+            return f.read()
+
+    def delete(self) -> None:
+        for fn in (self._file, self._file + ".meta.json"):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(fn)
+
+
+class LocalBucket:
+    """Firebase Storage 대신 로컬 디렉터리에 저장."""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.name = f"local:{self.root}"
+
+    def blob(self, path: str) -> LocalBlob:
+        return LocalBlob(self.root, path)
+
+
+@pytest.fixture
+def local_bucket(tmp_path, monkeypatch):
+    """eye.storage_bucket 을 tmp_path 의 LocalBucket 으로 바꿔 낀다."""
+    import eye
+
+    bucket = LocalBucket(str(tmp_path / "bucket"))
+    monkeypatch.setattr(eye, "storage_bucket", bucket)
+    return bucket
@@ -0,0 +1,130 @@
+"""eye.py Storage 업로드: 토큰 메타데이터는 첫 업로드에 함께, 독립 업로드는 동시에, 실패한 요청의 blob 은 삭제.
+
+Firebase 대신 conftest 의 LocalBucket(tmp_path) 에 올린다 (local_bucket fixture).
+"""
+import asyncio
+import io
+import json
+import os
+import threading
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("fastapi")
+pytest.importorskip("mediapipe")
+
+import numpy as np  # noqa: E402
+
+import eye  # noqa: E402
+
+TOKEN_KEY = "firebaseStorageDownloadTokens"
+
+
+def _stored(bucket) -> list:
+    out = []
+    for dirpath, _, files in os.walk(bucket.root):
+        out += [os.path.relpath(os.path.join(dirpath, f), bucket.root) for f in files]
+    return sorted(out)
+
+
+def _spy_uploads(monkeypatch, bucket, before=None) -> list:
+    """bucket blob 의 upload_from_string 호출마다 (경로, 그 시점 metadata) 기록."""
+    calls = []
+    blob_cls = type(bucket.blob("_"))
+    orig = blob_cls.upload_from_string
+
+    def spy(self, data, content_type=None):
+        calls.append((self.name, dict(self.metadata or {})))
+        if before is not None:
+            before()
+        orig(self, data, content_type)
+
+    monkeypatch.setattr(blob_cls, "upload_from_string", spy)
+    return calls
+
+
+def test_token_metadata_sent_with_first_upload(local_bucket, monkeypatch):
+    calls = _spy_uploads(monkeypatch, local_bucket)
+    up = eye.upload_bytes_to_storage(b"abc", "u/r/raw.bin", "application/octet-stream")
+
+    assert calls == [("u/r/raw.bin", {TOKEN_KEY: up["token"]})]  # 업로드 한 번, 그때 이미 토큰 포함
+    with open(os.path.join(local_bucket.root, "u/r/raw.bin.meta.json"), encoding="utf-8") as f:
+        assert json.load(f)["metadata"] == {TOKEN_KEY: up["token"]}
+    assert up["url"].endswith(f"token={up['token']}")
+
+
+def test_independent_uploads_run_concurrently(local_bucket, monkeypatch):
+    n = min(3, eye.UPLOAD_MAX_CONCURRENCY)
+    if n < 2:
+        pytest.skip("EYE_UPLOAD_MAX_CONCURRENCY=1")
+    # n 개가 동시에 업로드 중이어야 모두 통과 (순서대로 올리면 BrokenBarrierError)
+    barrier = threading.Barrier(n, timeout=10)
+    _spy_uploads(monkeypatch, local_bucket, before=barrier.wait)
+
+    async def run():
+        return await asyncio.gather(*(
+            eye.upload_in_background(b"x", f"u/r/{i}.bin", "application/octet-stream") for i in range(n)
+        ))
+
+    ups = asyncio.run(run())
+    assert sorted(u["path"] for u in ups) == [f"u/r/{i}.bin" for i in range(n)]
+
+
+def test_discard_uploads_removes_finished_and_ignores_failed(local_bucket):
+    def encode_fails() -> bytes:
+        raise RuntimeError("encode failed")
+
+    async def run():
+        ok = eye.upload_in_background(b"x", "u/r/ok.bin", "application/octet-stream")
+        bad = eye.upload_in_background(encode_fails, "u/r/bad.bin", "application/octet-stream")
+        await eye.discard_uploads(ok, bad, None)
+
+    asyncio.run(run())
+    assert _stored(local_bucket) == []
+
+
+class _FailingFirestore:
+    def collection(self, name):
+        raise RuntimeError("firestore unavailable")
+
+
+def _make_video(path: str, frames: int, width: int, height: int) -> None:
+    """움직이는 타원 + 노이즈 배경 mp4."""
+    rng = np.random.default_rng(9)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 30.0, (width, height))
+    if not writer.isOpened():
+        pytest.skip("cv2.VideoWriter(mp4v) 를 열 수 없습니다")
+    base = rng.integers(0, 255, size=(height, width, 3), dtype=np.uint8)
+    try:
+        for i in range(frames):
+            frame = np.roll(base, i * 3, axis=1)
+            cv2.ellipse(frame, (width // 2, height // 2), (width // 8, height // 4), 0, 0, 360, (160, 180, 210), -1)
+            writer.write(frame)
+    finally:
+        writer.release()
+
+
+def test_process_discards_uploads_when_firestore_write_fails(local_bucket, monkeypatch, tmp_path):
+    from fastapi import Response, UploadFile
+    from starlette.datastructures import Headers
+
+    video = str(tmp_path / "in.mp4")
+    _make_video(video, 30, 160, 120)
+    with open(video, "rb") as f:
+        data = f.read()
+    os.remove(video)
+    calls = _spy_uploads(monkeypatch, local_bucket)
+    monkeypatch.setattr(eye, "db", _FailingFirestore())
+
+    upload = UploadFile(io.BytesIO(data), filename="in.mp4", headers=Headers({"content-type": "video/mp4"}))
+    params = dict(
+        save=True, trace_format="csv", return_overlay=False, step=1, target_fps=None, sampling="grab", roi=False,
+        vpp_thresh=0.06, blink_thresh=0.18, blink_min_frames=2, max_frames=100, segments=1, profile=False,
+        adaptive=False, early_stop=False, vpp_tol=0.01, blink_tol=3.0,
+    )
+    with pytest.raises(RuntimeError, match="firestore unavailable"):
+        asyncio.run(eye.process_eye_video(Response(), upload, user={"uid": "u"}, **params))
+
+    assert len(calls) == 2  # 원본 영상 + trace 는 올라갔고
+    assert _stored(local_bucket) == []  # 문서 저장 실패로 둘 다 지워졌다
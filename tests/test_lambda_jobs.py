@@ -0,0 +1,189 @@
+"""lambda_eye_tracking 비동기 작업: submit_video → run_video_job → get_status 와 작업 임대(lease).
+
+EYE_TABLE=memory(MemoryTable), EYE_JOB_QUEUE=local(LocalJobQueue), S3 는 메모리 대역, 분석은 stub.
+"""
+import base64
+import json
+import os
+
+import pytest
+
+pytest.importorskip("cv2")
+
+os.environ.update(EYE_TABLE="memory", EYE_JOB_QUEUE="local", EYE_PREWARM="0")
+import lambda_eye_tracking as lam  # noqa: E402
+
+USER = "u1"
+VIDEO = b"not really an mp4"
+
+
+class _MemoryS3:
+    """boto3 S3 client 에서 작업 경로가 쓰는 부분만."""
+
+    def __init__(self):
+        self.objects = {}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self.objects[f"{Bucket}/{Key}"] = Body
+
+    def download_fileobj(self, bucket, key, fileobj):
+        fileobj.write(self.objects[f"{bucket}/{key}"])
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    """작업마다 새 MemoryTable / LocalJobQueue / S3, 진행률 갱신 2초 제한은 매번 통과."""
+    monkeypatch.setattr(lam, "_table", None)
+    monkeypatch.setattr(lam, "_job_queue", None)
+    monkeypatch.setattr(lam, "_s3_client", _MemoryS3())
+    clock = iter(range(0, 10 ** 6, 10))
+    monkeypatch.setattr(lam.time, "monotonic", lambda: float(next(clock)))
+    assert isinstance(lam.get_table(), lam.MemoryTable)
+    assert isinstance(lam.get_job_queue(), lam.LocalJobQueue)
+    return lam
+
+
+def _stub_analysis(monkeypatch, during=None):
+    """_analyze_video_file 대신: 진행률 두 번 보고 → (during 호출) → 결과 저장 → 200. 결과의 call 은 몇 번째 호출인지."""
+    calls = []
+
+    def analyze(video_path, video_key, opts, params, user_id, analysis_id, headers, video_cache_key,
+                progress=None, save_result=None):
+        calls.append(analysis_id)
+        call = len(calls)
+        with open(video_path, "rb") as f:
+            assert f.read() == VIDEO
+        progress(10, 100)
+        if during is not None:
+            during(call)
+        progress(50, 100)
+        save_result({"type": "video", "summary": {"frames_processed": 3}, "video_path": video_key, "call": call})
+        return {"statusCode": 200, "headers": headers, "body": json.dumps({"analysis_id": analysis_id})}
+
+    monkeypatch.setattr(lam, "_analyze_video_file", analyze)
+    return calls
+
+
+def _submit(job_id: str, params=None) -> dict:
+    r = lam.handle_submit_video(
+        {"file_data": base64.b64encode(VIDEO).decode(), "parameters": params or {"step": 2}}, USER, job_id, {},
+    )
+    assert r["statusCode"] == 202
+    return json.loads(r["body"])
+
+
+def _status(job_id: str) -> dict:
+    r = lam.handle_get_status({"job_id": job_id}, USER, {})
+    assert r["statusCode"] == 200
+    return json.loads(r["body"])
+
+
+def _make_stale(job_id: str) -> None:
+    lam.get_table().items[job_id]["updated_at"] -= lam.JOB_LEASE_SEC + 1
+
+
+def test_job_runs_pending_to_completed_and_keeps_item_fields(jobs, monkeypatch):
+    calls = _stub_analysis(monkeypatch)
+    body = _submit("j1")
+    assert body["status"] == "pending"
+    assert _status("j1")["status"] == "pending"
+
+    assert jobs.get_job_queue().drain() == 1
+    assert calls == ["j1"]
+    status = _status("j1")
+    assert (status["status"], status["progress"], status["attempts"]) == ("completed", 100, 1)
+    assert status["result"]["summary"] == {"frames_processed": 3}
+
+    item = jobs.get_table().items["j1"]
+    assert item["video_path"] == body["video_path"]
+    assert json.loads(item["parameters_json"]) == {"step": 2}
+    assert item["attempts"] == 1 and item["started_at"] > 0
+
+
+def test_duplicate_delivery_is_skipped(jobs, monkeypatch):
+    calls = _stub_analysis(monkeypatch)
+    _submit("j1")
+    jobs.get_job_queue().send({"job_id": "j1"})  # 최소 한 번 전달: 같은 메시지가 두 번
+    assert jobs.get_job_queue().drain() == 2
+    assert calls == ["j1"]
+    assert _status("j1")["attempts"] == 1
+
+    # 살아 있는 다른 워커가 맡은 running 작업도 건너뛴다
+    _submit("j2")
+    jobs.get_job_queue().pending.clear()
+    jobs._update_job("j2", expect={"status": "pending"}, status="running", attempts=1)
+    r = jobs.handle_run_video_job("j2", {})
+    assert json.loads(r["body"])["skipped"] is True
+    assert calls == ["j1"]
+
+
+def test_stale_lease_is_reported_failed_and_taken_over(jobs, monkeypatch):
+    calls = _stub_analysis(monkeypatch)
+    _submit("j1")
+    jobs.get_job_queue().pending.clear()
+    # 워커가 제한 시간 초과로 죽어 running 에서 멈춘 작업
+    jobs._update_job("j1", expect={"status": "pending"}, status="running", progress=40, attempts=1)
+    assert _status("j1")["status"] == "running"
+    _make_stale("j1")
+    stale = _status("j1")
+    assert stale["status"] == "failed" and "no update" in stale["error"]
+
+    r = jobs.handle_run_video_job("j1", {})  # 재전달
+    assert r["statusCode"] == 200
+    assert calls == ["j1"]
+    status = _status("j1")
+    assert (status["status"], status["attempts"]) == ("completed", 2)
+
+
+def test_stale_lease_after_max_attempts_fails_the_job(jobs, monkeypatch):
+    calls = _stub_analysis(monkeypatch)
+    _submit("j1")
+    jobs.get_job_queue().pending.clear()
+    jobs._update_job("j1", expect={"status": "pending"}, status="running", attempts=jobs.JOB_MAX_ATTEMPTS)
+    _make_stale("j1")
+
+    r = jobs.handle_run_video_job("j1", {})
+    assert json.loads(r["body"])["skipped"] is True
+    assert calls == []
+    item = jobs.get_table().items["j1"]
+    assert item["status"] == "failed" and f"{jobs.JOB_MAX_ATTEMPTS} attempts" in item["error"]
+
+
+def test_worker_that_lost_its_lease_does_not_overwrite(jobs, monkeypatch):
+    def during(call: int) -> None:
+        if call == 1:
+            # 첫 워커가 멈춘 사이 임대가 끝나 재전달된 호출이 넘겨받아 끝낸다
+            _make_stale("j1")
+            assert jobs.handle_run_video_job("j1", {})["statusCode"] == 200
+
+    calls = _stub_analysis(monkeypatch, during=during)
+    _submit("j1")
+    jobs.get_job_queue().pending.clear()
+    r = jobs.handle_run_video_job("j1", {})
+    assert calls == ["j1", "j1"]
+
+    # 첫 워커의 다음 진행률 갱신은 조건(attempts=1) 실패 → 결과도, failed 도 쓰지 않는다
+    assert r["statusCode"] == 500
+    item = jobs.get_table().items["j1"]
+    assert (item["status"], item["attempts"], item["progress"]) == ("completed", 2, 100)
+    assert item["results"]["call"] == 2
+    assert "error" not in item
+
+
+def test_submit_cache_hit_records_a_completed_job(jobs, monkeypatch):
+    calls = _stub_analysis(monkeypatch)
+    opts, _ = jobs._video_options({"step": 2})
+    key = jobs._video_cache_key(jobs.content_hash(VIDEO), USER, opts)
+    monkeypatch.setattr(jobs, "result_cache", jobs.ResultCache())
+    jobs.result_cache.put(key, {
+        "analysis_id": "earlier", "summary": {"frames_processed": 7}, "video_path": "users/u1/eye/earlier/raw.mp4",
+        "csv_path": None, "trace_path": "t.csv", "trace_format": "csv", "cached": False, "status": "success",
+    })
+
+    body = _submit("j1")
+    assert (body["job_id"], body["status"]) == ("j1", "completed")
+    assert jobs.get_job_queue().pending == []
+    status = _status("j1")
+    assert (status["status"], status["progress"]) == ("completed", 100)
+    assert status["result"]["summary"] == {"frames_processed": 7}
+    assert calls == []
@@ -0,0 +1,92 @@
+"""구간 분할 분석: plan_segments + iter_sampled_frames(start_frame/end_frame) + merge_segments 로 이어 붙인
+frame_idx 가 순차 분석과 같은지 (디코더/FaceMesh 없이 프레임 번호를 담은 가짜 캡처로).
+"""
+import itertools
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from eye_engine import EyeMetricsEngine, TraceBuffer, iter_sampled_frames, merge_segments, plan_segments  # noqa: E402
+
+
+class _FakeCapture:
+    """cv2.VideoCapture 대역: 프레임 i 의 모든 픽셀 값이 i. grab/read/set(CAP_PROP_POS_FRAMES) 만."""
+
+    def __init__(self, frame_count: int):
+        self.frame_count = frame_count
+        self.pos = 0
+
+    def grab(self) -> bool:
+        if self.pos >= self.frame_count:
+            return False
+        self.pos += 1
+        return True
+
+    def read(self):
+        if self.pos >= self.frame_count:
+            return False, None
+        frame = np.full((2, 2, 3), self.pos, dtype=np.int32)
+        self.pos += 1
+        return True, frame
+
+    def set(self, prop: int, value: float) -> bool:
+        assert prop == cv2.CAP_PROP_POS_FRAMES
+        self.pos = int(value)
+        return True
+
+
+def _sampled(frame_count, fps, step, target_fps, mode, max_frames=None, start_frame=0, end_frame=None):
+    out = []
+    for fidx, frame in iter_sampled_frames(
+        _FakeCapture(frame_count), fps, step=step, target_fps=target_fps, max_frames=max_frames, mode=mode,
+        start_frame=start_frame, end_frame=end_frame,
+    ):
+        assert int(frame[0, 0, 0]) == fidx  # frame_idx 와 실제로 읽은 프레임이 같다
+        out.append(fidx)
+    return out
+
+
+def _segmented(engine, frame_count, fps, step, target_fps, mode, max_frames, workers):
+    """analyze_segment 와 같은 방식으로 구간별 frame_idx 를 모아 merge_segments 로 합친다."""
+    plan = plan_segments(frame_count, fps, workers, step=step, target_fps=target_fps, max_frames=max_frames,
+                         min_segment_sec=0.5)
+    results = []
+    for seg in plan:
+        idxs = _sampled(frame_count, fps, step, target_fps, mode, start_frame=seg.warmup, end_frame=seg.end)
+        kept = [i for i in idxs if i >= seg.start]
+        results.append({
+            "frame_idx": np.asarray(kept, dtype=np.int32),
+            "points": np.full((len(kept), engine.n_points, 3), np.nan, dtype=np.float32),
+            "tracking": {"mode": "full", "roi_frames": 0, "redetections": 0},
+            "warmup_frames": len(idxs) - len(kept),
+        })
+    trace = TraceBuffer(engine, 2, 2, fps)
+    tracking = merge_segments(trace, results)
+    assert tracking["segments"] == len(plan)
+    return trace.frame_idx[:len(trace)].tolist(), len(plan)
+
+
+@pytest.mark.parametrize("frame_count", [1, 37, 301, 1001])
+@pytest.mark.parametrize("workers", [2, 3, 5])
+def test_merged_frame_idx_matches_sequential(frame_count, workers):
+    engine = EyeMetricsEngine()
+    split = False
+    for fps, step, target_fps, max_frames, mode in itertools.product(
+        [24.0, 29.97, 60.0], [1, 3], [None, 7.5, 29.97, 100.0], [None, 1, 50], ["grab", "seek"],
+    ):
+        expected = _sampled(frame_count, fps, step, target_fps, mode, max_frames=max_frames)
+        merged, n_segments = _segmented(engine, frame_count, fps, step, target_fps, mode, max_frames, workers)
+        assert merged == expected, (fps, step, target_fps, max_frames, mode)
+        split = split or n_segments > 1
+    # 짧은 영상 말고는 실제로 여러 구간으로 나눠 본 경우가 있어야 한다
+    assert split or frame_count < 60
+
+
+def test_segment_resume_keeps_the_sampling_grid():
+    # target_fps 격자 (30/7 프레임 간격) 위 분석 프레임: 경계 앞뒤에서 하나도 빠지거나 겹치지 않는다
+    full = _sampled(300, 30.0, 1, 7.0, "grab")
+    for start in range(1, 60):
+        tail = _sampled(300, 30.0, 1, 7.0, "grab", start_frame=start)
+        assert tail == [i for i in full if i >= start], start
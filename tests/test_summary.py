@@ -0,0 +1,126 @@
+"""스트리밍 요약(eye_engine.summary)이 기존 방식과 같은지 / 문서화한 오차 한계 안인지.
+
+기준값은 기존 엔드포인트의 np.percentile p5/p95, np.nanstd, count_blinks.
+"""
+import itertools
+
+import numpy as np
+import pytest
+
+from eye_engine.summary import BlinkCounter, QuantileSketch, RunningStats
+
+
+def count_blinks(openness_series, thresh: float = 0.18, min_frames: int = 2) -> int:
+    """기존 엔드포인트의 블링크 카운트 (기준값)."""
+    closed = False
+    hold = 0
+    count = 0
+    for v in openness_series:
+        if np.isnan(v):
+            if closed and hold >= min_frames:
+                count += 1
+            closed, hold = False, 0
+            continue
+        if v < thresh:
+            if closed:
+                hold += 1
+            else:
+                closed = True
+                hold = 1
+        else:
+            if closed and hold >= min_frames:
+                count += 1
+            closed, hold = False, 0
+    if closed and hold >= min_frames:
+        count += 1
+    return count
+
+
+def _v_offset(n: int, seed: int, scale: float = 1.0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(n) / 30.0
+    return scale * (-0.2 + 0.05 * np.sin(2 * np.pi * 0.3 * t) + rng.normal(0, 0.02, n))
+
+
+def _eye_open(n: int, seed: int) -> np.ndarray:
+    """블링크(짧은/긴 닫힘) + 얼굴 미검출 NaN 구간이 섞인 눈 뜸 정도."""
+    rng = np.random.default_rng(seed)
+    o = 0.35 + rng.normal(0, 0.02, n)
+    phase = np.arange(n) % 97
+    o[phase < rng.integers(1, 5)] = 0.05
+    o[rng.random(n) < 0.05] = np.nan
+    o[(np.arange(n) % 211) == 1] = np.nan  # 닫힘 구간 한가운데 NaN
+    return o
+
+
+@pytest.mark.parametrize("n, seed, scale", [(20000, 0, 1.0), (50000, 1, 1.0), (30000, 2, 1e-3), (25000, 3, 40.0)])
+def test_sketch_ptp_within_documented_bound_after_spill(n, seed, scale):
+    v = _v_offset(n, seed, scale)
+    s = QuantileSketch(exact_limit=1024)
+    for i in range(0, n, 777):
+        s.add_many(v[i:i + 777])
+    assert s.spilled and len(s) == n
+
+    lo, hi = np.percentile(v, [5, 95])
+    bound = s.rel_err * (abs(lo) + abs(hi)) + 2 * s.min_value
+    assert abs(s.ptp() - (hi - lo)) <= bound
+    for q in (0.0, 0.05, 0.5, 0.95, 1.0):
+        x = np.percentile(v, 100 * q)
+        assert abs(s.quantile(q) - x) <= s.rel_err * np.abs(v).max() + s.min_value
+
+
+def test_sketch_handles_zero_and_negative_values_after_spill():
+    v = np.concatenate([np.zeros(300), -np.linspace(0.01, 1, 500), np.linspace(0.01, 1, 500)])
+    np.random.default_rng(4).shuffle(v)
+    s = QuantileSketch(exact_limit=100)
+    s.add_many(v)
+    lo, hi = np.percentile(v, [5, 95])
+    assert abs(s.ptp() - (hi - lo)) <= s.rel_err * (abs(lo) + abs(hi)) + 2 * s.min_value
+
+
+def test_sketch_exact_mode_equals_np_percentile():
+    v = _v_offset(5000, 5)
+    s = QuantileSketch(exact_limit=5000)
+    for i in range(0, len(v), 333):
+        s.add_many(v[i:i + 333])
+    assert not s.spilled
+    lo, hi = np.percentile(v, [5, 95])
+    assert s.ptp() == float(hi - lo)
+    for q in (0.0, 0.05, 0.37, 0.95, 1.0):
+        assert s.quantile(q) == float(np.percentile(v, 100 * q))
+
+
+@pytest.mark.parametrize("chunk", [1, 2, 7, 64, 10000])
+@pytest.mark.parametrize("thresh, min_frames", [(0.18, 1), (0.18, 2), (0.2, 3)])
+def test_blink_counter_chunked_equals_count_blinks(chunk, thresh, min_frames):
+    o = _eye_open(6000, 6)
+    b = BlinkCounter(thresh, min_frames)
+    for i in range(0, len(o), chunk):
+        b.update_many(o[i:i + chunk])
+    assert b.count == count_blinks(o.tolist(), thresh, min_frames)
+
+
+def test_blink_counter_count_matches_every_prefix():
+    # 진행 중인 닫힘 구간을 포함한 중간 count 도 같은 접두어의 count_blinks 와 같다
+    o = np.array([0.3, 0.1, 0.1, np.nan, 0.1, 0.1, 0.1, 0.3, 0.1, np.nan, np.nan, 0.1, 0.1])
+    for min_frames, k in itertools.product((1, 2, 3), range(len(o) + 1)):
+        b = BlinkCounter(0.18, min_frames)
+        b.update_many(o[:k])
+        assert b.count == count_blinks(o[:k].tolist(), 0.18, min_frames), (min_frames, k)
+
+
+@pytest.mark.parametrize("chunk", [1, 5, 1000, 20000])
+def test_running_stats_equals_nanstd(chunk):
+    v = _v_offset(20000, 7)
+    v[np.random.default_rng(8).random(len(v)) < 0.05] = np.nan
+    valid = v[~np.isnan(v)]
+    r = RunningStats()
+    if chunk == 1:
+        for x in valid.tolist():
+            r.add(x)
+    else:
+        for i in range(0, len(valid), chunk):
+            r.add_many(valid[i:i + chunk])
+    assert r.n == len(valid)
+    assert r.std() == pytest.approx(float(np.nanstd(v)), rel=1e-9, abs=1e-12)
+    assert np.isnan(RunningStats().std())